@@ -1,33 +1,114 @@
-import asyncio
+from collections.abc import AsyncIterator
 
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
+from anthropic.types import Usage
+
+from app.protocols import LLMResult
+
+_EPHEMERAL_CACHE = {"type": "ephemeral"}
 
 
 class ClaudeClient:
-    def __init__(self, api_key: str, model: str, system_prompt: str):
-        self._client = Anthropic(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        system_prompt: str,
+        prompt_caching: bool = True,
+    ):
+        # Retries are handled by ResilientLLMClient, within the request deadline
+        self._client = AsyncAnthropic(api_key=api_key, max_retries=0)
         self._model = model
         self._system_prompt = system_prompt
+        self._prompt_caching = prompt_caching
 
-    async def get_response(
-        self, message: str, history: list[dict] | None = None
-    ) -> str:
+    async def init(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    def _build_system(self, system_context: str | None = None) -> str | list[dict]:
+        if not self._prompt_caching:
+            if system_context:
+                return f"{self._system_prompt}\n\n{system_context}"
+            return self._system_prompt
+        # Cache breakpoint 1: the system prompt never changes between turns. The
+        # per-turn context goes after the history instead (see _build_messages)
+        return [{"type": "text", "text": self._system_prompt, "cache_control": _EPHEMERAL_CACHE}]
+
+    def _build_messages(
+        self, message: str, history: list[dict] | None, system_context: str | None = None
+    ) -> list[dict]:
         messages = []
 
         if history:
             for msg in history:
                 messages.append({"role": msg["role"], "content": msg["content"]})
 
-        messages.append({"role": "user", "content": message})
-
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: self._client.messages.create(
-                model=self._model,
-                max_tokens=1024,
-                system=self._system_prompt,
-                messages=messages,
-            ),
+            if self._prompt_caching:
+                # Cache breakpoint 2: end of the history prefix, which the next
+                # turn resends unchanged before its own new messages
+                last = messages[-1]
+                last["content"] = [
+                    {"type": "text", "text": last["content"], "cache_control": _EPHEMERAL_CACHE}
+                ]
+
+        if system_context and self._prompt_caching:
+            # After the history breakpoint, so the summary and recalled memories,
+            # which change from turn to turn, don't invalidate the cached prefix
+            messages.append({
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": system_context},
+                    {"type": "text", "text": message},
+                ],
+            })
+        else:
+            messages.append({"role": "user", "content": message})
+        return messages
+
+    @staticmethod
+    def _to_result(text: str, usage: Usage) -> LLMResult:
+        cache_read = usage.cache_read_input_tokens or 0
+        cache_write = usage.cache_creation_input_tokens or 0
+        return LLMResult(
+            text=text,
+            # input_tokens only counts the uncached part of the prompt
+            prompt_tokens=usage.input_tokens + cache_read + cache_write,
+            completion_tokens=usage.output_tokens,
+            cache_read_tokens=cache_read,
+            cache_write_tokens=cache_write,
+        )
+
+    async def get_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> LLMResult:
+        messages = self._build_messages(message, history, system_context)
+
+        response = await self._client.messages.create(
+            model=self._model,
+            max_tokens=1024,
+            system=self._build_system(system_context),
+            messages=messages,
+        )
+        return self._to_result(response.content[0].text, response.usage)
+
+    async def stream_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> AsyncIterator[str | LLMResult]:
+        messages = self._build_messages(message, history, system_context)
+
+        async with self._client.messages.stream(
+            model=self._model,
+            max_tokens=1024,
+            system=self._build_system(system_context),
+            messages=messages,
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+            final = await stream.get_final_message()
+        yield self._to_result(
+            "".join(block.text for block in final.content if block.type == "text"),
+            final.usage,
         )
-        return response.content[0].text
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key, and remembers results for a TTL.
+
+    The first caller for a key starts the work as its own task; every caller
+    (including the first) awaits that task through a shield, so a caller that
+    disconnects does not cancel the work the others are waiting on. Completed
+    results can be kept for `ttl_seconds` so retries get the stored value.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 1000):
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._done: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        """Return the stored result for `key`, or None if absent or expired."""
+        entry = self._done.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._done[key]
+            return None
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        self._done[key] = (time.monotonic() + self._ttl_seconds, value)
+        self._done.move_to_end(key)
+        while len(self._done) > self._max_entries:
+            self._done.popitem(last=False)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], remember: bool = False) -> Any:
+        """Run `fn` once for all concurrent callers of `key`.
+
+        With `remember=True` a successful result is also stored for later callers.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t, remember))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task, remember: bool) -> None:
+        self._inflight.pop(key, None)
+        if remember and not task.cancelled() and task.exception() is None:
+            self.put(key, task.result())
@@ -18,36 +18,170 @@ class Settings(BaseSettings):
     anthropic_api_key: str = ""
     anthropic_model: str = "claude-sonnet-4-20250514"
     anthropic_system_prompt: str = _DEFAULT_SYSTEM_PROMPT
+    anthropic_max_concurrency: int = 32  # Max in-flight Anthropic requests
+    anthropic_max_queue: int = 64  # Callers allowed to wait for a slot before 429s
+    anthropic_context_tokens: int = 8000  # Prompt token budget (system + history + message)
+    anthropic_prompt_caching: bool = True  # cache_control on system prompt + history prefix
 
     # Gemini settings
     gemini_api_key: str = ""
     gemini_model: str = "gemini-2.0-flash"
     gemini_system_prompt: str = _DEFAULT_SYSTEM_PROMPT
+    gemini_max_concurrency: int = 32  # Max in-flight Gemini requests
+    gemini_max_queue: int = 64  # Callers allowed to wait for a slot before 429s
+    gemini_context_tokens: int = 8000  # Prompt token budget (system + history + message)
+    # Explicit context caching once history reaches this many tokens (0 disables)
+    gemini_cache_min_tokens: int = 4096
+    gemini_cache_ttl_seconds: int = 600
 
     # Ollama settings (local inference)
     ollama_model: str = "llama3.2:8b"
     ollama_base_url: str = "http://localhost:11434"
     ollama_system_prompt: str = _DEFAULT_SYSTEM_PROMPT
+    ollama_context_tokens: int = 3000  # Prompt token budget; keep below the model's num_ctx
+    # Max in-flight generations; match the server's OLLAMA_NUM_PARALLEL
+    ollama_max_concurrency: int = 4
+    ollama_max_queue: int = 32  # Callers allowed to wait for a slot before 429s
+    # Pooled HTTP client shared by every Ollama call
+    ollama_max_connections: int = 10
+    ollama_max_keepalive_connections: int = 10
+    ollama_keepalive_expiry_seconds: float = 60.0
+    ollama_connect_timeout_seconds: float = 5.0
+    ollama_read_timeout_seconds: float = 120.0
+    # How long Ollama keeps the model resident after each request ("30m", "-1" = forever)
+    ollama_keep_alive: str = "30m"
+    ollama_warm_up: bool = True  # Preload the model during app startup
+    # Keep the prompt prefix stable across turns so Ollama reuses its KV cache
+    ollama_prefix_reuse: bool = True
+
+    # Extra "provider:model" pairs kept warm alongside the default client, so
+    # chat requests can pick them per request, e.g. ["ollama:qwen2.5:7b"]
+    llm_models: list[str] = []
+
+    # Hedging: if the primary provider is slower than hedge_after_ms, the same
+    # request is also sent to fallback_provider and the first answer wins ("" = off)
+    fallback_provider: str = ""
+    hedge_after_ms: float = 2000.0
+
+    # Resilience: a chat request's LLM calls (hedges, queueing, retries and backoff
+    # included) must finish within llm_deadline_seconds; streams only until their
+    # first token.
+    # Transient failures are retried with jittered exponential backoff.
+    llm_deadline_seconds: float = 60.0
+    llm_max_attempts: int = 3  # 1 disables retries
+    llm_retry_base_ms: float = 250.0
+    llm_retry_max_ms: float = 4000.0
+    # Consecutive transient failures that open a provider's circuit, and how
+    # long it stays open before a probe request is let through
+    circuit_failure_threshold: int = 5
+    circuit_reset_seconds: float = 30.0
 
     # Context settings
-    context_messages: int = 20  # Number of recent messages to pass to LLM
+    # History is windowed by the provider's token budget; this caps the message count
+    context_messages: int = 20  # Max recent messages to pass to LLM
+    # The window's oldest message moves this many messages at a time rather than
+    # every turn, so the history prefix stays cacheable (1 = slide every turn)
+    context_window_step: int = 10
+    context_cache_size: int = 200  # Recent messages kept in memory by the message store
+    # Messages older than the context window are folded into a running summary
+    # in the background, this many at a time (0 = off)
+    summary_batch_messages: int = 20
+    summary_max_words: int = 250
+
+    # Long-term memory: relevant past messages from any session or archive are
+    # retrieved by embedding similarity and added to the system context
+    memory_embedder: Literal["hashing", "ollama", ""] = "hashing"  # "" = off
+    memory_index_path: str = "./data/memory_index.npz"
+    memory_embed_model: str = "nomic-embed-text"  # For the ollama embedder
+    memory_hashing_dim: int = 1024
+    memory_top_k: int = 5
+    memory_min_score: float = 0.2
+    memory_max_tokens: int = 600  # Share of the context budget reserved for memories
+
+    # Chat idempotency: completed responses for requests with an idempotency_key
+    idempotency_ttl_seconds: float = 300.0
+    idempotency_max_entries: int = 1000
 
     # Database
     database_path: str = "./data/future_asif.db"
     trace_db_path: str = "./data/traces.duckdb"
+    # How long /admin/messages reuses a search total unless exact_total is requested
+    search_count_ttl_seconds: float = 30.0
+    # Read-only SQLite connections for history, search, session and stats reads,
+    # alongside the single writer. 0 runs every query on the writer.
+    sqlite_read_pool_size: int = 4
+    # Message writes that queue up together share one transaction (and fsync); such a
+    # group waits up to this long for more. A lone write commits at once.
+    sqlite_commit_window_ms: float = 2.0
+    # FULL fsyncs every commit; NORMAL (WAL) can lose the last commits on power
+    # loss but never corrupts the database
+    sqlite_synchronous: Literal["FULL", "NORMAL"] = "FULL"
+
+    # Trace writer: traces are queued and persisted in background batches
+    trace_queue_size: int = 1000
+    trace_batch_size: int = 100
 
     model_config = {"env_file": ".env"}
 
-    @property
-    def active_system_prompt(self) -> str:
-        """Get the system prompt for the currently configured provider."""
-        if self.llm_provider == "anthropic":
+    def model_for(self, provider: str) -> str:
+        """Get the default model for a provider."""
+        if provider == "anthropic":
+            return self.anthropic_model
+        elif provider == "gemini":
+            return self.gemini_model
+        elif provider == "ollama":
+            return self.ollama_model
+        return "unknown"
+
+    def system_prompt_for(self, provider: str) -> str:
+        """Get the system prompt for a provider."""
+        if provider == "anthropic":
             return self.anthropic_system_prompt
-        elif self.llm_provider == "gemini":
+        elif provider == "gemini":
             return self.gemini_system_prompt
-        elif self.llm_provider == "ollama":
+        elif provider == "ollama":
             return self.ollama_system_prompt
         return _DEFAULT_SYSTEM_PROMPT
 
+    def max_concurrency_for(self, provider: str) -> int:
+        """Get the in-flight request limit for a provider."""
+        if provider == "anthropic":
+            return self.anthropic_max_concurrency
+        elif provider == "gemini":
+            return self.gemini_max_concurrency
+        elif provider == "ollama":
+            return self.ollama_max_concurrency
+        return 8
+
+    def max_queue_for(self, provider: str) -> int:
+        """Get how many callers may wait for a provider slot."""
+        if provider == "anthropic":
+            return self.anthropic_max_queue
+        elif provider == "gemini":
+            return self.gemini_max_queue
+        elif provider == "ollama":
+            return self.ollama_max_queue
+        return 16
+
+    def context_tokens_for(self, provider: str) -> int:
+        """Get the prompt token budget for a provider."""
+        if provider == "anthropic":
+            return self.anthropic_context_tokens
+        elif provider == "gemini":
+            return self.gemini_context_tokens
+        elif provider == "ollama":
+            return self.ollama_context_tokens
+        return 4000
+
+    @property
+    def active_system_prompt(self) -> str:
+        """Get the system prompt for the currently configured provider."""
+        return self.system_prompt_for(self.llm_provider)
+
+    @property
+    def active_context_tokens(self) -> int:
+        """Get the prompt token budget for the currently configured provider."""
+        return self.context_tokens_for(self.llm_provider)
+
 
 settings = Settings()
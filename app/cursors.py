@@ -0,0 +1,26 @@
+import base64
+import binascii
+import json
+
+
+def encode_cursor(*values: str | int | float) -> str:
+    """Pack the sort key of the last row on a page into an opaque, URL-safe cursor."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type | tuple[type, ...]) -> list:
+    """Unpack a cursor from `encode_cursor` holding one value of each of `types`.
+
+    Raises ValueError if it is malformed or its values have the wrong types.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Invalid cursor")
+    if not all(isinstance(v, t) for v, t in zip(values, types)):
+        raise ValueError("Invalid cursor")
+    return values
@@ -1,38 +1,116 @@
+import asyncio
+import logging
 import os
-from datetime import datetime, timezone
+import re
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from uuid import uuid4
 
 import aiosqlite
 
+from app.cursors import decode_cursor, encode_cursor
+from app.tokens import estimate_message_tokens, estimate_tokens, fit_token_budget, step_window
+
+logger = logging.getLogger(__name__)
+
+# Full-text index for each message table, in relevance-ranking order:
+# (table, fts table, session_id expr, source)
+_SEARCH_TABLES = [
+    ("messages", "messages_fts", "NULL", "active"),
+    ("session_history", "session_history_fts", "t.session_id", "session"),
+    ("archived_messages", "archived_messages_fts", "NULL", "archived"),
+]
+
+_SEARCH_TOKEN_RE = re.compile(r"\w+")
+
+# Queue marker telling the writer task to commit what it has and exit
+_STOP = object()
+# Most write operations merged into one transaction
+_MAX_GROUP = 256
+
+
+def _history_rows(rows: list) -> list[dict]:
+    return [
+        {"id": r[0], "role": r[1], "content": r[2], "timestamp": r[3], "token_count": r[4]}
+        for r in rows
+    ]
+
+
+def _fts_query(query: str) -> str | None:
+    """Turn free text into an FTS5 query matching every word as a prefix.
+
+    Each word is quoted, so FTS5 operators and stray quotes in user input are
+    matched literally instead of raising a syntax error.
+    """
+    words = _SEARCH_TOKEN_RE.findall(query)
+    return " ".join(f'"{w}"*' for w in words) or None
+
 
 class SqliteMessageStore:
-    def __init__(self, db_path: str):
+    def __init__(
+        self,
+        db_path: str,
+        cache_size: int = 200,
+        count_ttl_seconds: float = 30.0,
+        read_pool_size: int = 4,
+        synchronous: str = "FULL",
+        commit_window_ms: float = 2.0,
+    ):
         self._db_path = db_path
-        self._conn: aiosqlite.Connection | None = None
+        self._conn: aiosqlite.Connection | None = None  # The only writer
+        # Writes are queued to one task that group-commits them: writes already
+        # queued together share a transaction and its fsync, and the commit
+        # window lets such a group wait briefly for more (a lone write commits
+        # at once). The write-through caches change only after that commit.
+        self._synchronous = synchronous
+        self._commit_window_s = commit_window_ms / 1000
+        self._writes: asyncio.Queue = asyncio.Queue()
+        self._writer: asyncio.Task | None = None
+        # Read-only connections for queries that don't need the writer. Each
+        # aiosqlite connection runs on its own thread, so under WAL a slow admin
+        # search no longer queues chat reads and writes behind it.
+        self._read_pool_size = read_pool_size
+        self._readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        # Write-through cache of the newest active messages (oldest → newest) and
+        # the active session id. This process is the only writer, so both stay
+        # exact without re-reading the database.
+        self._recent: deque[dict] = deque(maxlen=cache_size)
+        self._recent_complete = False  # True when _recent holds every row in `messages`
+        self._active_count = 0  # Rows in `messages`
+        self._active_session_id: str | None = None
+        self._summary: dict | None = None
+        # Recent search totals keyed by (role, fts query): (count, expires_at)
+        self._count_ttl_seconds = count_ttl_seconds
+        self._search_counts: dict[tuple, tuple[int, float]] = {}
 
     async def init(self) -> None:
         os.makedirs(os.path.dirname(self._db_path), exist_ok=True)
         self._conn = await aiosqlite.connect(self._db_path)
         await self._conn.execute("PRAGMA journal_mode=WAL")
+        await self._conn.execute(f"PRAGMA synchronous={self._synchronous}")
         await self._conn.execute("""
             CREATE TABLE IF NOT EXISTS messages (
-                id TEXT PRIMARY KEY,
+                seq INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
                 role TEXT NOT NULL CHECK(role IN ('user', 'assistant')),
                 content TEXT NOT NULL,
-                timestamp TEXT NOT NULL
+                timestamp TEXT NOT NULL,
+                token_count INTEGER
             )
         """)
-        await self._conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_messages_timestamp
-            ON messages(timestamp DESC)
-        """)
         await self._conn.execute("""
             CREATE TABLE IF NOT EXISTS archived_messages (
-                id TEXT PRIMARY KEY,
+                seq INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
                 role TEXT NOT NULL CHECK(role IN ('user', 'assistant')),
                 content TEXT NOT NULL,
                 timestamp TEXT NOT NULL,
-                archived_at TEXT NOT NULL
+                archived_at TEXT NOT NULL,
+                token_count INTEGER
             )
         """)
         await self._conn.execute("""
@@ -47,81 +125,695 @@ class SqliteMessageStore:
                 note TEXT,
                 provider TEXT NOT NULL,
                 model TEXT NOT NULL,
-                context_messages INTEGER NOT NULL
+                context_messages INTEGER NOT NULL,
+                message_count INTEGER
             )
         """)
+        await self._conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_sessions_started
+            ON sessions(started_at DESC, id DESC)
+        """)
         await self._conn.execute("""
             CREATE TABLE IF NOT EXISTS session_history (
-                id TEXT PRIMARY KEY,
+                seq INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
                 session_id TEXT NOT NULL,
                 role TEXT NOT NULL CHECK(role IN ('user', 'assistant')),
                 content TEXT NOT NULL,
                 timestamp TEXT NOT NULL,
+                token_count INTEGER,
                 FOREIGN KEY (session_id) REFERENCES sessions(id)
             )
         """)
+        # Newest-first browsing across sessions in /admin/messages
         await self._conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_session_history_session
-            ON session_history(session_id, timestamp DESC)
+            CREATE INDEX IF NOT EXISTS idx_session_history_timestamp
+            ON session_history(timestamp DESC)
+        """)
+        # Running summary of active messages that have aged out of the context window
+        await self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS conversation_summary (
+                id INTEGER PRIMARY KEY CHECK(id = 1),
+                content TEXT NOT NULL,
+                covered_until TEXT NOT NULL,
+                token_count INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            )
         """)
+        await self._migrate_stable_rowids()
+        await self._migrate_history_indexes()
+        await self._migrate_token_counts()
+        await self._migrate_session_counts()
+        await self._init_search()
+        await self._init_daily_counts()
         await self._conn.commit()
+        await self._load_cache()
+        await self._open_readers()
+        self._writer = asyncio.create_task(self._run_writer())
+
+    async def _migrate_stable_rowids(self) -> None:
+        """Give message tables written before `seq` existed an INTEGER PRIMARY KEY.
+
+        The search indexes address rows by rowid, which VACUUM may renumber in
+        a table without one. Each table is rebuilt with `seq` set to the old
+        rowid, so existing search indexes stay valid; its indexes and triggers
+        are recreated from their stored SQL.
+        """
+        assert self._conn is not None
+        for table, _, _, _ in _SEARCH_TABLES:
+            cur = await self._conn.execute(f"PRAGMA table_info({table})")
+            cols = [row[1] for row in await cur.fetchall()]
+            if "seq" in cols:
+                continue
+            cur = await self._conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            )
+            (schema,) = await cur.fetchone()
+            cur = await self._conn.execute(
+                "SELECT sql FROM sqlite_master "
+                "WHERE type IN ('index', 'trigger') AND tbl_name = ? AND sql IS NOT NULL",
+                (table,),
+            )
+            dependents = [row[0] for row in await cur.fetchall()]
+            # Same columns, with the id demoted from primary key to a unique key
+            body = schema[schema.index("(") + 1 : schema.rindex(")")]
+            body = body.replace("id TEXT PRIMARY KEY", "id TEXT NOT NULL UNIQUE", 1)
+            column_list = ", ".join(cols)
+            await self._conn.execute(
+                f"CREATE TABLE {table}_rebuild (seq INTEGER PRIMARY KEY, {body})"
+            )
+            await self._conn.execute(
+                f"INSERT INTO {table}_rebuild (seq, {column_list}) "
+                f"SELECT rowid, {column_list} FROM {table}"
+            )
+            await self._conn.execute(f"DROP TABLE {table}")
+            await self._conn.execute(f"ALTER TABLE {table}_rebuild RENAME TO {table}")
+            for sql in dependents:
+                await self._conn.execute(sql)
+
+    async def _migrate_history_indexes(self) -> None:
+        """Create the (timestamp, id) history indexes, replacing timestamp-only versions.
+
+        The id column makes each index key unique, so history cursors can
+        resume exactly after the last row of a page.
+        """
+        assert self._conn is not None
+        await self._conn.execute("DROP INDEX IF EXISTS idx_messages_timestamp")
+        await self._conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_messages_timestamp_id
+            ON messages(timestamp DESC, id DESC)
+        """)
+        cur = await self._conn.execute("PRAGMA index_info(idx_session_history_session)")
+        if len(await cur.fetchall()) == 2:
+            await self._conn.execute("DROP INDEX idx_session_history_session")
+        await self._conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_session_history_session
+            ON session_history(session_id, timestamp DESC, id DESC)
+        """)
+
+    async def _migrate_token_counts(self) -> None:
+        """Add token_count to databases created before it existed and backfill it."""
+        assert self._conn is not None
+        await self._conn.create_function(
+            "estimate_message_tokens", 1, estimate_message_tokens, deterministic=True
+        )
+        for table in ("messages", "archived_messages", "session_history"):
+            cur = await self._conn.execute(f"PRAGMA table_info({table})")
+            cols = {row[1] for row in await cur.fetchall()}
+            if "token_count" not in cols:
+                await self._conn.execute(f"ALTER TABLE {table} ADD COLUMN token_count INTEGER")
+            await self._conn.execute(
+                f"UPDATE {table} SET token_count = estimate_message_tokens(content) "
+                "WHERE token_count IS NULL"
+            )
+
+    async def _migrate_session_counts(self) -> None:
+        """Add sessions.message_count and backfill it for ended sessions.
+
+        An ended session's messages never change, so the count is stored when
+        the session closes instead of being recounted on every listing. The
+        active session's count is left NULL and read live.
+        """
+        assert self._conn is not None
+        cur = await self._conn.execute("PRAGMA table_info(sessions)")
+        if "message_count" not in {row[1] for row in await cur.fetchall()}:
+            await self._conn.execute("ALTER TABLE sessions ADD COLUMN message_count INTEGER")
+        await self._conn.execute("""
+            UPDATE sessions SET message_count = (
+                SELECT count(*) FROM session_history WHERE session_id = sessions.id
+            )
+            WHERE ended_at IS NOT NULL AND message_count IS NULL
+        """)
+
+    async def _init_search(self) -> None:
+        """Create the FTS5 indexes and the triggers that keep them in sync.
+
+        Each index is external-content: it stores only the inverted index and
+        reads text from its table by rowid, which aliases the table's `seq`
+        INTEGER PRIMARY KEY so VACUUM can't renumber it. An index created for an
+        existing database is backfilled with a rebuild.
+        """
+        assert self._conn is not None
+        for table, fts, _, _ in _SEARCH_TABLES:
+            cur = await self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+            )
+            exists = await cur.fetchone() is not None
+            await self._conn.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                    content, content='{table}', tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+            await self._conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {fts}(rowid, content) VALUES (new.rowid, new.content);
+                END
+            """)
+            await self._conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, content)
+                    VALUES ('delete', old.rowid, old.content);
+                END
+            """)
+            await self._conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_fts_update
+                AFTER UPDATE OF content ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, content)
+                    VALUES ('delete', old.rowid, old.content);
+                    INSERT INTO {fts}(rowid, content) VALUES (new.rowid, new.content);
+                END
+            """)
+            if not exists:
+                await self._conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+    async def _init_daily_counts(self) -> None:
+        """Create the per-day, per-role message counts behind the stats endpoints.
+
+        Triggers keep the counts in step with `messages` and `session_history`,
+        so a session rotation nets to zero and archiving subtracts what it
+        moves out. A table created for an existing database is backfilled.
+        """
+        assert self._conn is not None
+        cur = await self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'message_daily_counts'"
+        )
+        exists = await cur.fetchone() is not None
+        await self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS message_daily_counts (
+                day TEXT NOT NULL,
+                role TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (day, role)
+            ) WITHOUT ROWID
+        """)
+        increment = """
+            INSERT INTO message_daily_counts (day, role, count)
+            VALUES (substr(new.timestamp, 1, 10), new.role, 1)
+            ON CONFLICT (day, role) DO UPDATE SET count = count + 1;
+        """
+        decrement = """
+            UPDATE message_daily_counts SET count = count - 1
+            WHERE day = substr(old.timestamp, 1, 10) AND role = old.role;
+        """
+        for table in ("messages", "session_history"):
+            await self._conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_daily_insert AFTER INSERT ON {table} BEGIN
+                    {increment}
+                END
+            """)
+            await self._conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_daily_delete AFTER DELETE ON {table} BEGIN
+                    {decrement}
+                END
+            """)
+            await self._conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_daily_update
+                AFTER UPDATE OF role, timestamp ON {table} BEGIN
+                    {decrement}
+                    {increment}
+                END
+            """)
+        if not exists:
+            await self._conn.execute("""
+                INSERT INTO message_daily_counts (day, role, count)
+                SELECT substr(timestamp, 1, 10), role, count(*) FROM (
+                    SELECT role, timestamp FROM messages
+                    UNION ALL
+                    SELECT role, timestamp FROM session_history
+                )
+                GROUP BY 1, 2
+            """)
+
+    async def _open_readers(self) -> None:
+        uri = f"{Path(self._db_path).resolve().as_uri()}?mode=ro"
+        for _ in range(self._read_pool_size):
+            self._readers.put_nowait(await aiosqlite.connect(uri, uri=True))
+
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a pooled read-only connection (the writer if the pool is empty).
+
+        Readers see every committed write, which is all the write-through
+        cache ever reflects, so reads stay consistent with it.
+        """
+        assert self._conn is not None
+        if not self._read_pool_size:
+            yield self._conn
+            return
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    async def _load_cache(self) -> None:
+        assert self._conn is not None
+        maxlen = self._recent.maxlen or 0
+        cursor = await self._conn.execute(
+            "SELECT id, role, content, timestamp, token_count FROM messages "
+            "ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (maxlen + 1,),
+        )
+        rows = await cursor.fetchall()
+        self._recent_complete = len(rows) <= maxlen
+        self._recent.clear()
+        for r in reversed(rows[:maxlen]):
+            self._recent.append(
+                {"id": r[0], "role": r[1], "content": r[2], "timestamp": r[3], "token_count": r[4]}
+            )
+
+        cur = await self._conn.execute("SELECT count(*) FROM messages")
+        self._active_count = (await cur.fetchone())[0]
+
+        cur = await self._conn.execute("SELECT id FROM sessions WHERE ended_at IS NULL")
+        row = await cur.fetchone()
+        self._active_session_id = row[0] if row else None
+
+        cur = await self._conn.execute(
+            "SELECT content, covered_until, token_count FROM conversation_summary"
+        )
+        row = await cur.fetchone()
+        self._summary = (
+            {"content": row[0], "covered_until": row[1], "token_count": row[2]} if row else None
+        )
+
+    def _cache_append(self, msg: dict) -> None:
+        """Record a committed message in the recent-messages cache."""
+        if len(self._recent) == self._recent.maxlen:
+            self._recent_complete = False  # The oldest cached row is about to be evicted
+        self._recent.append(msg)
+        self._active_count += 1
+        prev = self._recent[-2] if len(self._recent) > 1 else None
+        if prev and (prev["timestamp"], prev["id"]) > (msg["timestamp"], msg["id"]):
+            # Concurrent writers can commit out of order; keep the (timestamp, id) order
+            self._recent = deque(
+                sorted(self._recent, key=lambda m: (m["timestamp"], m["id"])),
+                maxlen=self._recent.maxlen,
+            )
+
+    def _cache_reset(self) -> None:
+        """The `messages` table was emptied; the cache is now trivially complete."""
+        self._recent.clear()
+        self._recent_complete = True
+        self._active_count = 0
+        self._summary = None
+
+    async def _write[T](
+        self,
+        op: Callable[[aiosqlite.Connection], Awaitable[T]],
+        on_commit: Callable[[T], None] | None = None,
+    ) -> T:
+        """Run `op` on the writer inside the next group commit and return its result.
+
+        Each operation gets its own savepoint, so one that raises is rolled
+        back alone and its exception re-raised here. `on_commit` updates the
+        in-memory caches once the shared transaction is durable, before this
+        call returns.
+        """
+        assert self._writer is not None, "store is not initialized"
+        done: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._writes.put_nowait((op, on_commit, done))
+        return await done
+
+    async def _run_writer(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._writes.get()]
+            deadline = loop.time() + self._commit_window_s
+            while batch[-1] is not _STOP and len(batch) < _MAX_GROUP:
+                if self._writes.empty():
+                    # Linger only while writes are arriving together; a lone
+                    # write commits straight away
+                    remaining = deadline - loop.time()
+                    if len(batch) == 1 or remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._writes.get(), remaining))
+                    except TimeoutError:
+                        break
+                else:
+                    batch.append(self._writes.get_nowait())
+
+            stopping = batch[-1] is _STOP
+            writes = [w for w in batch if w is not _STOP]
+            try:
+                await self._commit(writes)
+            except Exception as exc:
+                # Keep the writer alive, or every later write would wait forever
+                logger.exception(f"[db] Group commit of {len(writes)} writes failed")
+                for _, _, done in writes:
+                    if not done.done():
+                        done.set_exception(exc)
+            if stopping:
+                return
+
+    async def _commit(self, batch: list[tuple]) -> None:
+        """Apply a group of write operations in one transaction and settle their futures."""
+        assert self._conn is not None
+        if not batch:
+            return
+        if self._conn.in_transaction:
+            # A failed rollback left the previous group's transaction open
+            await self._conn.rollback()
+        outcomes: list[tuple[bool, object]] = []
+        try:
+            await self._conn.execute("BEGIN")
+            for op, _, _ in batch:
+                await self._conn.execute("SAVEPOINT write_op")
+                try:
+                    result = await op(self._conn)
+                except Exception as exc:
+                    await self._conn.execute("ROLLBACK TO write_op")
+                    outcomes.append((False, exc))
+                else:
+                    outcomes.append((True, result))
+                await self._conn.execute("RELEASE write_op")
+            await self._conn.commit()
+        except Exception as exc:
+            for _, _, done in batch:
+                if not done.done():
+                    done.set_exception(exc)
+            await self._conn.rollback()
+            return
+
+        for (_, on_commit, done), (ok, value) in zip(batch, outcomes):
+            if ok and on_commit:
+                on_commit(value)
+            if done.done():
+                continue  # The caller was cancelled; the write still stands
+            if ok:
+                done.set_result(value)
+            else:
+                done.set_exception(value)
 
     async def close(self) -> None:
+        if self._writer:
+            # Commit every queued write before the connection goes away
+            self._writes.put_nowait(_STOP)
+            await self._writer
+            self._writer = None
+        while not self._readers.empty():
+            await self._readers.get_nowait().close()
         if self._conn:
             await self._conn.close()
             self._conn = None
 
     async def save_message(self, role: str, content: str) -> tuple[str, str]:
         assert self._conn is not None
-        msg_id = uuid4().hex
-        timestamp = datetime.now(timezone.utc).isoformat()
-        await self._conn.execute(
-            "INSERT INTO messages (id, role, content, timestamp) VALUES (?, ?, ?, ?)",
-            (msg_id, role, content, timestamp),
-        )
-        await self._conn.commit()
-        return msg_id, timestamp
+        msg = {
+            "id": uuid4().hex,
+            "role": role,
+            "content": content,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "token_count": estimate_message_tokens(content),
+        }
+
+        async def insert(conn: aiosqlite.Connection) -> None:
+            await conn.execute(
+                "INSERT INTO messages (id, role, content, timestamp, token_count) "
+                "VALUES (:id, :role, :content, :timestamp, :token_count)",
+                msg,
+            )
+
+        await self._write(insert, lambda _: self._cache_append(msg))
+        return msg["id"], msg["timestamp"]
+
+    async def save_exchange(
+        self, user_content: str, assistant_content: str
+    ) -> tuple[tuple[str, str], tuple[str, str]]:
+        """Save a user message and its reply atomically in one transaction.
+
+        The reply's timestamp is strictly after the user message's, so the pair
+        always reads back in order. Returns ((user_id, user_ts), (assistant_id, assistant_ts)).
+        """
+        assert self._conn is not None
+        now = datetime.now(timezone.utc)
+        user = (uuid4().hex, now.isoformat())
+        assistant = (uuid4().hex, (now + timedelta(microseconds=1)).isoformat())
+        rows = [
+            {
+                "id": user[0],
+                "role": "user",
+                "content": user_content,
+                "timestamp": user[1],
+                "token_count": estimate_message_tokens(user_content),
+            },
+            {
+                "id": assistant[0],
+                "role": "assistant",
+                "content": assistant_content,
+                "timestamp": assistant[1],
+                "token_count": estimate_message_tokens(assistant_content),
+            },
+        ]
+
+        async def insert(conn: aiosqlite.Connection) -> None:
+            await conn.executemany(
+                "INSERT INTO messages (id, role, content, timestamp, token_count) "
+                "VALUES (:id, :role, :content, :timestamp, :token_count)",
+                rows,
+            )
+
+        def cache(_) -> None:
+            for row in rows:
+                self._cache_append(row)
+
+        await self._write(insert, cache)
+        return user, assistant
 
     async def get_history(
-        self, limit: int, before: str | None
+        self,
+        limit: int,
+        before: tuple[str, str] | None = None,
+        session_id: str | None = None,
     ) -> list[dict]:
+        """Messages older than the (timestamp, id) key `before`, newest first.
+
+        Ordering by (timestamp, id) makes the key unique, so rows sharing a
+        timestamp are never skipped at a page boundary; each page is a range
+        scan of idx_messages_timestamp_id. With the id of an ended session,
+        pages come from its session_history instead, via
+        idx_session_history_session.
+        """
         assert self._conn is not None
-        if before:
-            cursor = await self._conn.execute(
-                "SELECT id, role, content, timestamp FROM messages "
-                "WHERE timestamp < ? ORDER BY timestamp DESC LIMIT ?",
-                (before, limit),
+        if session_id is not None and session_id != self._active_session_id:
+            async with self._reader() as conn:
+                if before:
+                    cursor = await conn.execute(
+                        "SELECT id, role, content, timestamp, token_count FROM session_history "
+                        "WHERE session_id = ? AND (timestamp, id) < (?, ?) "
+                        "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                        (session_id, *before, limit),
+                    )
+                else:
+                    cursor = await conn.execute(
+                        "SELECT id, role, content, timestamp, token_count FROM session_history "
+                        "WHERE session_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+                        (session_id, limit),
+                    )
+                return _history_rows(await cursor.fetchall())
+
+        # Pages that fall within the cached newest messages skip the database
+        newest = [
+            m for m in reversed(self._recent)
+            if before is None or (m["timestamp"], m["id"]) < before
+        ]
+        if limit <= len(newest) or self._recent_complete:
+            return [dict(m) for m in newest[:limit]]
+
+        async with self._reader() as conn:
+            if before:
+                cursor = await conn.execute(
+                    "SELECT id, role, content, timestamp, token_count FROM messages "
+                    "WHERE (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT ?",
+                    (*before, limit),
+                )
+            else:
+                cursor = await conn.execute(
+                    "SELECT id, role, content, timestamp, token_count FROM messages "
+                    "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                    (limit,),
+                )
+            return _history_rows(await cursor.fetchall())
+
+    async def get_context(
+        self, token_budget: int, max_messages: int, step: int = 1
+    ) -> list[dict]:
+        """Newest-first messages that fit within `token_budget` (at most `max_messages`).
+
+        Uses the token counts stored at write time, so no history is re-tokenized.
+        With `step` > 1 the window's start moves in steps (see `step_window`).
+        """
+        assert self._conn is not None
+        cached = list(reversed(self._recent))[:max_messages]
+        selected = fit_token_budget(cached, token_budget)
+        # The cache answers unless the window would extend past its oldest entry
+        if len(selected) < len(cached) or len(cached) == max_messages or self._recent_complete:
+            return [dict(m) for m in step_window(selected, self._active_count, step)]
+
+        async with self._reader() as conn:
+            cursor = await conn.execute(
+                """
+                SELECT id, role, content, timestamp, token_count FROM (
+                    SELECT id, role, content, timestamp, token_count,
+                        sum(token_count) OVER (ORDER BY timestamp DESC, id DESC) AS running_tokens
+                    FROM messages
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                )
+                WHERE running_tokens <= ?
+                ORDER BY timestamp DESC, id DESC
+                """,
+                (max_messages, token_budget),
             )
-        else:
-            cursor = await self._conn.execute(
-                "SELECT id, role, content, timestamp FROM messages "
-                "ORDER BY timestamp DESC LIMIT ?",
-                (limit,),
+            rows = await cursor.fetchall()
+        window = [
+            {"id": r[0], "role": r[1], "content": r[2], "timestamp": r[3], "token_count": r[4]}
+            for r in rows
+        ]
+        return step_window(window, self._active_count, step)
+
+    async def get_messages_after(self, after: str | None, limit: int) -> list[dict]:
+        """Oldest-first active messages with a timestamp after `after` (all if None)."""
+        assert self._conn is not None
+        async with self._reader() as conn:
+            cursor = await conn.execute(
+                "SELECT id, role, content, timestamp, token_count FROM messages "
+                "WHERE timestamp > ? ORDER BY timestamp LIMIT ?",
+                (after or "", limit),
             )
-        rows = await cursor.fetchall()
+            rows = await cursor.fetchall()
         return [
-            {"id": r[0], "role": r[1], "content": r[2], "timestamp": r[3]}
+            {"id": r[0], "role": r[1], "content": r[2], "timestamp": r[3], "token_count": r[4]}
             for r in rows
         ]
 
+    async def get_all_messages_after(self, after: str | None, limit: int) -> list[dict]:
+        """Oldest-first messages from every table (active, archived, sessions) after `after`."""
+        assert self._conn is not None
+        async with self._reader() as conn:
+            cursor = await conn.execute(
+                """
+                SELECT id, role, content, timestamp FROM (
+                    SELECT id, role, content, timestamp FROM messages
+                    WHERE timestamp > :after
+                    UNION ALL
+                    SELECT id, role, content, timestamp FROM archived_messages
+                    WHERE timestamp > :after
+                    UNION ALL
+                    SELECT id, role, content, timestamp FROM session_history
+                    WHERE timestamp > :after
+                )
+                ORDER BY timestamp
+                LIMIT :limit
+                """,
+                {"after": after or "", "limit": limit},
+            )
+            rows = await cursor.fetchall()
+        return [{"id": r[0], "role": r[1], "content": r[2], "timestamp": r[3]} for r in rows]
+
+    async def get_messages_by_ids(self, ids: list[str]) -> list[dict]:
+        """Messages from every table (active, archived, sessions) with the given ids, in any order."""
+        assert self._conn is not None
+        if not ids:
+            return []
+        marks = ", ".join("?" * len(ids))
+        async with self._reader() as conn:
+            cursor = await conn.execute(
+                f"""
+                SELECT id, role, content, timestamp FROM messages WHERE id IN ({marks})
+                UNION ALL
+                SELECT id, role, content, timestamp FROM archived_messages WHERE id IN ({marks})
+                UNION ALL
+                SELECT id, role, content, timestamp FROM session_history WHERE id IN ({marks})
+                """,
+                ids * 3,
+            )
+            rows = await cursor.fetchall()
+        return [{"id": r[0], "role": r[1], "content": r[2], "timestamp": r[3]} for r in rows]
+
+    async def get_summary(self) -> dict | None:
+        """The running summary of older active messages, or None if there isn't one.
+
+        Returns {"content", "covered_until", "token_count"}, where `covered_until`
+        is the timestamp of the newest message folded into the summary.
+        """
+        assert self._conn is not None
+        return dict(self._summary) if self._summary else None
+
+    async def save_summary(self, content: str, covered_until: str) -> bool:
+        """Replace the running summary; returns False if it is stale.
+
+        A summary is stale when the message at `covered_until` has meanwhile been
+        archived or moved to a session, so a compaction that raced with either
+        never resurrects a summary of a conversation that was reset.
+        """
+        assert self._conn is not None
+        summary = {
+            "content": content,
+            "covered_until": covered_until,
+            "token_count": estimate_tokens(content),
+        }
+
+        async def replace(conn: aiosqlite.Connection) -> bool:
+            cursor = await conn.execute(
+                "INSERT OR REPLACE INTO conversation_summary "
+                "(id, content, covered_until, token_count, updated_at) "
+                "SELECT 1, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM messages WHERE timestamp = ?)",
+                (
+                    content,
+                    covered_until,
+                    summary["token_count"],
+                    datetime.now(timezone.utc).isoformat(),
+                    covered_until,
+                ),
+            )
+            return cursor.rowcount > 0
+
+        def cache(saved: bool) -> None:
+            if saved:
+                self._summary = summary
+
+        return await self._write(replace, cache)
+
     async def archive_messages(self) -> tuple[int, str]:
         assert self._conn is not None
         archived_at = datetime.now(timezone.utc).isoformat()
-        await self._conn.execute("BEGIN")
-        try:
-            await self._conn.execute(
-                "INSERT INTO archived_messages (id, role, content, timestamp, archived_at) "
-                "SELECT id, role, content, timestamp, ? FROM messages",
+
+        async def archive(conn: aiosqlite.Connection) -> int:
+            await conn.execute(
+                "INSERT INTO archived_messages "
+                "(id, role, content, timestamp, archived_at, token_count) "
+                "SELECT id, role, content, timestamp, ?, token_count FROM messages",
                 (archived_at,),
             )
-            cursor = await self._conn.execute("SELECT count(*) FROM messages")
+            cursor = await conn.execute("SELECT count(*) FROM messages")
             row = await cursor.fetchone()
-            count = row[0] if row else 0
-            await self._conn.execute("DELETE FROM messages")
-            await self._conn.commit()
-        except Exception:
-            await self._conn.rollback()
-            raise
+            await conn.execute("DELETE FROM messages")
+            await conn.execute("DELETE FROM conversation_summary")
+            return row[0] if row else 0
+
+        count = await self._write(archive, lambda _: self._cache_reset())
         return count, archived_at
 
     async def create_session(
@@ -135,12 +827,9 @@ class SqliteMessageStore:
         now = datetime.now(timezone.utc).isoformat()
         new_session_id = uuid4().hex
 
-        await self._conn.execute("BEGIN")
-        try:
+        async def rotate(conn: aiosqlite.Connection) -> dict | None:
             # Find and close the active session
-            cur = await self._conn.execute(
-                "SELECT id, started_at FROM sessions WHERE ended_at IS NULL"
-            )
+            cur = await conn.execute("SELECT id, started_at FROM sessions WHERE ended_at IS NULL")
             active_row = await cur.fetchone()
             ended_session = None
 
@@ -148,23 +837,25 @@ class SqliteMessageStore:
                 prev_id = active_row[0]
                 prev_started = active_row[1]
                 # Count messages being moved
-                cur = await self._conn.execute("SELECT count(*) FROM messages")
+                cur = await conn.execute("SELECT count(*) FROM messages")
                 row = await cur.fetchone()
                 msg_count = row[0] if row else 0
 
                 # Close the previous session
-                await self._conn.execute(
-                    "UPDATE sessions SET ended_at = ? WHERE id = ?",
-                    (now, prev_id),
+                await conn.execute(
+                    "UPDATE sessions SET ended_at = ?, message_count = ? WHERE id = ?",
+                    (now, msg_count, prev_id),
                 )
 
                 # Move messages to session_history
-                await self._conn.execute(
-                    "INSERT INTO session_history (id, session_id, role, content, timestamp) "
-                    "SELECT id, ?, role, content, timestamp FROM messages",
+                await conn.execute(
+                    "INSERT INTO session_history "
+                    "(id, session_id, role, content, timestamp, token_count) "
+                    "SELECT id, ?, role, content, timestamp, token_count FROM messages",
                     (prev_id,),
                 )
-                await self._conn.execute("DELETE FROM messages")
+                await conn.execute("DELETE FROM messages")
+                await conn.execute("DELETE FROM conversation_summary")
 
                 ended_session = {
                     "id": prev_id,
@@ -174,16 +865,19 @@ class SqliteMessageStore:
                 }
 
             # Create new session
-            await self._conn.execute(
+            await conn.execute(
                 "INSERT INTO sessions (id, started_at, note, provider, model, context_messages) "
                 "VALUES (?, ?, ?, ?, ?, ?)",
                 (new_session_id, now, note, provider, model, context_messages),
             )
-            await self._conn.commit()
-        except Exception:
-            await self._conn.rollback()
-            raise
+            return ended_session
 
+        def cache(ended_session: dict | None) -> None:
+            if ended_session:
+                self._cache_reset()
+            self._active_session_id = new_session_id
+
+        ended_session = await self._write(rotate, cache)
         return {
             "session_id": new_session_id,
             "ended_session": ended_session,
@@ -194,30 +888,36 @@ class SqliteMessageStore:
             },
         }
 
-    async def get_sessions(self) -> list[dict]:
+    async def get_sessions(self, limit: int, cursor: str | None = None) -> dict:
+        """Newest-first page of sessions with their message counts.
+
+        One range scan over idx_sessions_started per page; ended sessions carry
+        their stored count, and only the active one is counted live. Pass the
+        previous page's `next_cursor` to continue.
+        """
         assert self._conn is not None
-        cur = await self._conn.execute(
-            "SELECT id, started_at, ended_at, note, provider, model, context_messages "
-            "FROM sessions ORDER BY started_at DESC"
-        )
-        rows = await cur.fetchall()
+        params: tuple = (limit + 1,)
+        keyset = ""
+        if cursor:
+            started_at, session_id = decode_cursor(cursor, str, str)
+            keyset = "WHERE (started_at, id) < (?, ?) "
+            params = (started_at, session_id, limit + 1)
+        async with self._reader() as conn:
+            cur = await conn.execute(
+                "SELECT id, started_at, ended_at, note, provider, model, context_messages, "
+                f"message_count FROM sessions {keyset}"
+                "ORDER BY started_at DESC, id DESC LIMIT ?",
+                params,
+            )
+            rows = await cur.fetchall()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
         sessions = []
         for r in rows:
-            session_id = r[0]
             is_active = r[2] is None
-            # Count messages: active session uses messages table, ended uses session_history
-            if is_active:
-                cnt_cur = await self._conn.execute("SELECT count(*) FROM messages")
-            else:
-                cnt_cur = await self._conn.execute(
-                    "SELECT count(*) FROM session_history WHERE session_id = ?",
-                    (session_id,),
-                )
-            cnt_row = await cnt_cur.fetchone()
-            msg_count = cnt_row[0] if cnt_row else 0
-
             sessions.append({
-                "id": session_id,
+                "id": r[0],
                 "started_at": r[1],
                 "ended_at": r[2],
                 "note": r[3],
@@ -226,106 +926,254 @@ class SqliteMessageStore:
                     "model": r[5],
                     "context_messages": r[6],
                 },
-                "message_count": msg_count,
+                "message_count": (self._active_count if is_active else r[7]) or 0,
                 "is_active": is_active,
             })
-        return sessions
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0]) if has_more else None
+        return {"sessions": sessions, "next_cursor": next_cursor}
 
     async def get_active_session_id(self) -> str | None:
         assert self._conn is not None
-        cur = await self._conn.execute(
-            "SELECT id FROM sessions WHERE ended_at IS NULL"
-        )
-        row = await cur.fetchone()
-        return row[0] if row else None
+        return self._active_session_id
 
     async def search_messages(
         self,
         limit: int,
-        offset: int,
+        offset: int = 0,
         role: str | None = None,
         query: str | None = None,
-    ) -> tuple[list[dict], int]:
-        """Search across both active messages and session_history."""
+        sort: str = "recent",
+        cursor: str | None = None,
+        exact_total: bool = False,
+    ) -> dict:
+        """Search active, session-history and archived messages.
+
+        With a `query`, matches come from the FTS5 indexes with a highlighted
+        snippet, ordered by bm25 (`sort="relevance"`) or newest first. Each
+        source has its own index, and bm25 scores from different indexes aren't
+        comparable, so relevance ranks within a source: active messages, then
+        session history, then archived.
+
+        Pages are keyset-paginated: pass the previous page's `next_cursor` to
+        continue after its last row, so a deep page costs the same as the first.
+        Each table is read only up to the page size, along its timestamp index
+        when browsing. `offset` still works but scans the skipped rows.
+
+        The total is served from a short-lived cache unless `exact_total`;
+        `total_exact` says which one the caller got.
+        """
         assert self._conn is not None
+        match = None
+        if query:
+            match = _fts_query(query)
+            if match is None:
+                return {"messages": [], "total": 0, "total_exact": True, "next_cursor": None}
 
-        # Build WHERE clauses
+        params: dict[str, str | int | float] = {"limit": limit + 1, "offset": offset}
         conditions = []
-        params: list[str | int] = []
         if role:
-            conditions.append("role = ?")
-            params.append(role)
-        if query:
-            conditions.append("content LIKE ?")
-            params.append(f"%{query}%")
+            conditions.append("t.role = :role")
+            params["role"] = role
+        if match:
+            params["match"] = match
+
+        relevance = match is not None and sort == "relevance"
+        order = "src, rank, timestamp DESC, id DESC" if relevance else "timestamp DESC, id DESC"
+        keyset = ""
+        if cursor:
+            if relevance:
+                params["src"], params["rank"], params["ts"], params["id"] = decode_cursor(
+                    cursor, int, (int, float), str, str
+                )
+                keyset = (
+                    "WHERE src > :src OR (src = :src AND (rank > :rank OR (rank = :rank "
+                    "AND (timestamp < :ts OR (timestamp = :ts AND id < :id)))))"
+                )
+            else:
+                params["ts"], params["id"] = decode_cursor(cursor, str, str)
+                keyset = "WHERE timestamp <= :ts AND (timestamp < :ts OR id < :id)"
+            params["offset"] = 0
+
+        # The global page is within the union of each table's own first page
+        branches = []
+        for src, (table, fts, session_id, source) in enumerate(_SEARCH_TABLES):
+            if match:
+                from_clause = f"{fts} JOIN {table} t ON t.rowid = {fts}.rowid"
+                where = [f"{fts} MATCH :match", *conditions]
+                rank = f"bm25({fts})"
+            else:
+                from_clause, where, rank = f"{table} t", conditions, "NULL"
+            branches.append(
+                f"SELECT * FROM (SELECT * FROM ("
+                f"SELECT t.id, t.role, t.content, t.timestamp, {session_id} AS session_id, "
+                f"'{source}' AS source, {rank} AS rank, t.rowid AS rid, {src} AS src "
+                f"FROM {from_clause} "
+                f"{'WHERE ' + ' AND '.join(where) if where else ''}"
+                f") {keyset} ORDER BY {order} LIMIT :limit + :offset)"
+            )
+        async with self._reader() as conn:
+            cur = await conn.execute(
+                f"SELECT id, role, content, timestamp, session_id, source, rank, rid, src "
+                f"FROM ({' UNION ALL '.join(branches)}) "
+                f"ORDER BY {order} LIMIT :limit OFFSET :offset",
+                params,
+            )
+            rows = await cur.fetchall()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
 
-        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            next_cursor = None
+            if has_more:
+                last = rows[-1]
+                next_cursor = (
+                    encode_cursor(last[8], last[6], last[3], last[0])
+                    if relevance
+                    else encode_cursor(last[3], last[0])
+                )
+
+            total, total_exact = await self._search_count(conn, role, match, exact_total)
+            snippets = await self._snippets(conn, rows, match) if match else {}
+        messages = [
+            {
+                "id": r[0],
+                "role": r[1],
+                "content": r[2],
+                "timestamp": r[3],
+                "session_id": r[4],
+                "source": r[5],
+                "snippet": snippets.get((r[5], r[7])),
+            }
+            for r in rows
+        ]
+        return {
+            "messages": messages,
+            "total": total,
+            "total_exact": total_exact,
+            "next_cursor": next_cursor,
+        }
+
+    async def _search_count(
+        self, conn: aiosqlite.Connection, role: str | None, match: str | None, exact: bool
+    ) -> tuple[int, bool]:
+        """Count search results, reusing a recent count unless `exact`.
 
-        # Union active messages and session_history
-        union_query = f"""
-            SELECT id, role, content, timestamp, NULL as session_id FROM messages {where}
-            UNION ALL
-            SELECT id, role, content, timestamp, session_id FROM session_history {where}
+        Returns (total, whether it was just counted).
         """
-        # For the union, params are used twice (once per SELECT)
-        union_params = params + params
+        key = (role, match)
+        cached = self._search_counts.get(key)
+        if not exact and cached and time.monotonic() < cached[1]:
+            return cached[0], False
 
-        # Count total
-        count_sql = f"SELECT count(*) FROM ({union_query})"
-        cur = await self._conn.execute(count_sql, union_params)
+        params = {"role": role, "match": match}
+        role_filter = "AND t.role = :role" if role else ""
+        if match:
+            union_query = " UNION ALL ".join(
+                f"SELECT 1 FROM {fts} JOIN {table} t ON t.rowid = {fts}.rowid "
+                f"WHERE {fts} MATCH :match {role_filter}"
+                for table, fts, _, _ in _SEARCH_TABLES
+            )
+        else:
+            union_query = " UNION ALL ".join(
+                f"SELECT 1 FROM {table} t WHERE 1 {role_filter}"
+                for table, _, _, _ in _SEARCH_TABLES
+            )
+        cur = await conn.execute(f"SELECT count(*) FROM ({union_query})", params)
         row = await cur.fetchone()
         total = row[0] if row else 0
 
-        # Fetch page
-        page_sql = f"""
-            SELECT id, role, content, timestamp, session_id FROM ({union_query})
-            ORDER BY timestamp DESC
-            LIMIT ? OFFSET ?
-        """
-        cur = await self._conn.execute(page_sql, union_params + [limit, offset])
-        rows = await cur.fetchall()
+        if len(self._search_counts) >= 256:
+            self._search_counts.clear()
+        self._search_counts[key] = (total, time.monotonic() + self._count_ttl_seconds)
+        return total, True
 
-        messages = [
-            {"id": r[0], "role": r[1], "content": r[2], "timestamp": r[3], "session_id": r[4]}
-            for r in rows
-        ]
-        return messages, total
+    async def _snippets(
+        self, conn: aiosqlite.Connection, rows: list, match: str
+    ) -> dict[tuple[str, int], str]:
+        """Highlighted excerpts for one page of search hits, keyed by (source, rowid).
+
+        Built per page rather than inside the search query, where they would be
+        computed for every match before LIMIT.
+        """
+        snippets = {}
+        for _, fts, _, source in _SEARCH_TABLES:
+            rowids = [r[7] for r in rows if r[5] == source]
+            if not rowids:
+                continue
+            cur = await conn.execute(
+                f"SELECT rowid, snippet({fts}, 0, '**', '**', '…', 16) FROM {fts} "
+                f"WHERE {fts} MATCH ? AND rowid IN ({', '.join('?' * len(rowids))})",
+                [match, *rowids],
+            )
+            for rowid, snippet in await cur.fetchall():
+                snippets[(source, rowid)] = snippet
+        return snippets
 
     async def get_message_stats(self) -> dict:
-        """Get message counts across active + session_history."""
+        """Message counts across active + session_history, from the daily counts.
+
+        Costs one row per day with messages plus four index lookups for the
+        first and last timestamps, however many messages are stored.
+        """
         assert self._conn is not None
         today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
-        # Total from both tables
-        cur = await self._conn.execute("""
-            SELECT
-                count(*) as total,
-                count(CASE WHEN role = 'user' THEN 1 END) as user_count,
-                count(CASE WHEN role = 'assistant' THEN 1 END) as assistant_count,
-                min(timestamp) as first_ts,
-                max(timestamp) as last_ts
-            FROM (
-                SELECT role, timestamp FROM messages
-                UNION ALL
-                SELECT role, timestamp FROM session_history
+        async with self._reader() as conn:
+            cur = await conn.execute(
+                """
+                SELECT
+                    coalesce(sum(count), 0),
+                    coalesce(sum(CASE WHEN role = 'user' THEN count END), 0),
+                    coalesce(sum(CASE WHEN role = 'assistant' THEN count END), 0),
+                    coalesce(sum(CASE WHEN day = ? THEN count END), 0)
+                FROM message_daily_counts
+                """,
+                (today,),
             )
-        """)
-        row = await cur.fetchone()
-        total, user_count, assistant_count, first_ts, last_ts = row if row else (0, 0, 0, None, None)
+            row = await cur.fetchone()
+            total, user_count, assistant_count, today_count = row if row else (0, 0, 0, 0)
 
-        # Today's messages (active table only — session_history is historical)
-        cur = await self._conn.execute(
-            "SELECT count(*) FROM messages WHERE timestamp >= ?",
-            (today,),
-        )
-        today_row = await cur.fetchone()
-        today_count = today_row[0] if today_row else 0
+            cur = await conn.execute("""
+                SELECT
+                    (SELECT min(timestamp) FROM messages),
+                    (SELECT min(timestamp) FROM session_history),
+                    (SELECT max(timestamp) FROM messages),
+                    (SELECT max(timestamp) FROM session_history)
+            """)
+            row = await cur.fetchone()
+            firsts = [ts for ts in (row[0], row[1]) if ts] if row else []
+            lasts = [ts for ts in (row[2], row[3]) if ts] if row else []
 
         return {
             "total_messages": total,
             "user_messages": user_count,
             "assistant_messages": assistant_count,
             "messages_today": today_count,
-            "first_message_at": first_ts,
-            "last_message_at": last_ts,
+            "first_message_at": min(firsts, default=None),
+            "last_message_at": max(lasts, default=None),
         }
+
+    async def get_daily_message_counts(self, since: str) -> list[dict]:
+        """Per-day user/assistant counts from `since` (YYYY-MM-DD), oldest first.
+
+        Days without messages are left out.
+        """
+        assert self._conn is not None
+        async with self._reader() as conn:
+            cur = await conn.execute(
+                """
+                SELECT
+                    day,
+                    sum(CASE WHEN role = 'user' THEN count ELSE 0 END),
+                    sum(CASE WHEN role = 'assistant' THEN count ELSE 0 END)
+                FROM message_daily_counts
+                WHERE day >= ?
+                GROUP BY day
+                HAVING sum(count) > 0
+                ORDER BY day
+                """,
+                (since,),
+            )
+            return [
+                {"day": r[0], "user_messages": r[1], "assistant_messages": r[2]}
+                for r in await cur.fetchall()
+            ]
@@ -1,8 +1,21 @@
-from app.protocols import LLMClient, MessageStore, TraceStore
+from app.coalescing import SingleFlight
+from app.limiter import ConcurrencyLimiter
+from app.memory_index import VectorMemoryIndex
+from app.protocols import LLMClient, MessageStore, TraceStore, TraceWriter
+from app.registry import LLMRegistry
+from app.resilience import CircuitBreaker
+from app.summarizer import Summarizer
 
 _message_store: MessageStore | None = None
 _llm_client: LLMClient | None = None
+_llm_registry: LLMRegistry | None = None
 _trace_store: TraceStore | None = None
+_trace_writer: TraceWriter | None = None
+_chat_flights: SingleFlight | None = None
+_summarizer: Summarizer | None = None
+_memory_index: VectorMemoryIndex | None = None
+_limiters: dict[str, ConcurrencyLimiter] | None = None
+_breakers: dict[str, CircuitBreaker] | None = None
 
 
 def set_message_store(store: MessageStore) -> None:
@@ -15,11 +28,46 @@ def set_llm_client(client: LLMClient) -> None:
     _llm_client = client
 
 
+def set_llm_registry(registry: LLMRegistry) -> None:
+    global _llm_registry
+    _llm_registry = registry
+
+
 def set_trace_store(store: TraceStore) -> None:
     global _trace_store
     _trace_store = store
 
 
+def set_trace_writer(writer: TraceWriter) -> None:
+    global _trace_writer
+    _trace_writer = writer
+
+
+def set_chat_flights(flights: SingleFlight) -> None:
+    global _chat_flights
+    _chat_flights = flights
+
+
+def set_summarizer(summarizer: Summarizer) -> None:
+    global _summarizer
+    _summarizer = summarizer
+
+
+def set_memory_index(index: VectorMemoryIndex) -> None:
+    global _memory_index
+    _memory_index = index
+
+
+def set_limiters(limiters: dict[str, ConcurrencyLimiter]) -> None:
+    global _limiters
+    _limiters = limiters
+
+
+def set_breakers(breakers: dict[str, CircuitBreaker]) -> None:
+    global _breakers
+    _breakers = breakers
+
+
 def get_message_store() -> MessageStore:
     assert _message_store is not None, "MessageStore not initialized"
     return _message_store
@@ -30,6 +78,41 @@ def get_llm_client() -> LLMClient:
     return _llm_client
 
 
+def get_llm_registry() -> LLMRegistry:
+    assert _llm_registry is not None, "LLMRegistry not initialized"
+    return _llm_registry
+
+
 def get_trace_store() -> TraceStore:
     assert _trace_store is not None, "TraceStore not initialized"
     return _trace_store
+
+
+def get_trace_writer() -> TraceWriter:
+    assert _trace_writer is not None, "TraceWriter not initialized"
+    return _trace_writer
+
+
+def get_chat_flights() -> SingleFlight:
+    assert _chat_flights is not None, "SingleFlight not initialized"
+    return _chat_flights
+
+
+def get_summarizer() -> Summarizer:
+    assert _summarizer is not None, "Summarizer not initialized"
+    return _summarizer
+
+
+def get_memory_index() -> VectorMemoryIndex:
+    assert _memory_index is not None, "VectorMemoryIndex not initialized"
+    return _memory_index
+
+
+def get_limiters() -> dict[str, ConcurrencyLimiter]:
+    assert _limiters is not None, "Limiters not initialized"
+    return _limiters
+
+
+def get_breakers() -> dict[str, CircuitBreaker]:
+    assert _breakers is not None, "Circuit breakers not initialized"
+    return _breakers
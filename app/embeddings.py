@@ -0,0 +1,87 @@
+import re
+import zlib
+
+import httpx
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Function words carry no topic signal and would dominate short messages
+_STOP_WORDS = frozenset(
+    "a an and are as at be but by do does did for from had has have i if in is it its "
+    "me my of on or so that the their them they this to was we were what when where "
+    "which who why will with you your".split()
+)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so a dot product is cosine similarity."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class HashingEmbedder:
+    """Local, dependency-free embeddings via the signed hashing trick.
+
+    Words (minus stop words) and adjacent word pairs are hashed into `dim`
+    buckets with log-scaled counts. It only captures lexical overlap, but needs
+    no model and is stable across processes (crc32, not the salted built-in hash).
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    async def init(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def _features(self, text: str) -> list[str]:
+        words = [w for w in _TOKEN_RE.findall(text.lower()) if w not in _STOP_WORDS]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode())
+                # The top bit picks the sign so colliding features tend to cancel out
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        return _normalize(vectors)
+
+
+class OllamaEmbedder:
+    """Embeddings from Ollama's /api/embed endpoint (e.g. nomic-embed-text)."""
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str,
+        timeout: float = 30.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self._model = model
+        self._base_url = base_url.rstrip("/")
+        self._timeout = timeout
+        self._transport = transport
+        self._http: httpx.AsyncClient | None = None
+
+    async def init(self) -> None:
+        self._http = httpx.AsyncClient(
+            base_url=self._base_url, timeout=self._timeout, transport=self._transport
+        )
+
+    async def close(self) -> None:
+        if self._http:
+            await self._http.aclose()
+            self._http = None
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        assert self._http is not None, "OllamaEmbedder not initialized"
+        response = await self._http.post(
+            "/api/embed", json={"model": self._model, "input": texts}
+        )
+        response.raise_for_status()
+        return _normalize(np.asarray(response.json()["embeddings"], dtype=np.float32))
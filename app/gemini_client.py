@@ -1,24 +1,158 @@
 import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections.abc import AsyncIterator
 
 from google import genai
+from google.genai import errors
+
+from app.protocols import LLMResult
+from app.tokens import estimate_message_tokens
+
+logger = logging.getLogger(__name__)
 
 # Models that don't support system instructions
 NO_SYSTEM_INSTRUCTION_MODELS = ["gemma-3-1b-it", "gemma-3-4b-it"]
 
+# First backoff after a failed context cache create; doubles per failure up to the TTL
+_CACHE_RETRY_BASE_S = 30.0
+
 
 class GeminiClient:
-    def __init__(self, api_key: str, model: str, system_prompt: str):
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        system_prompt: str,
+        cache_min_tokens: int = 4096,
+        cache_ttl_seconds: int = 600,
+    ):
         self._client = genai.Client(api_key=api_key)
         self._model = model
         self._system_prompt = system_prompt
         self._supports_system = not any(
             m in model for m in NO_SYSTEM_INSTRUCTION_MODELS
         )
+        # Explicit context cache holding the system prompt + a history prefix.
+        # cache_min_tokens=0 disables caching.
+        self._cache_min_tokens = cache_min_tokens
+        self._cache_ttl_seconds = cache_ttl_seconds
+        self._cache_lock = asyncio.Lock()
+        self._cache_name: str | None = None
+        self._cache_prefix_len = 0
+        self._cache_prefix_key: str | None = None
+        self._cache_expires_at = 0.0
+        self._cache_failures = 0  # Consecutive failed creates
+        self._cache_retry_at = 0.0
+        self._cache_deletes: set[asyncio.Task] = set()
 
-    async def get_response(
-        self, message: str, history: list[dict] | None = None
-    ) -> str:
-        loop = asyncio.get_event_loop()
+    async def init(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        await asyncio.gather(*self._cache_deletes)
+        await self._client.aio.aclose()
+
+    @staticmethod
+    def _prefix_key(system: str, contents: list[dict]) -> str:
+        return hashlib.sha256(json.dumps([system, contents], sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def _estimate_tokens(contents: list[dict]) -> int:
+        return sum(estimate_message_tokens(c["parts"][0]["text"]) for c in contents)
+
+    async def _resolve_cache(
+        self, system: str, history: list[dict]
+    ) -> tuple[str | None, int, int]:
+        """Find or create a context cache holding `system` and a prefix of `history`.
+
+        The current cache is reused while it is unexpired, was built for the same
+        system instruction, `history` still starts with the cached prefix, and
+        the uncached tail stays below the caching threshold. Otherwise, once the
+        history is long enough, a new cache is created over all of it and the
+        superseded one is deleted. Requests arriving while a cache is being
+        created don't wait for it, and a failed create is retried only after
+        an exponential backoff.
+
+        Returns (cache_name, cached_prefix_len, cache_write_tokens).
+        """
+        n = self._cache_prefix_len
+        usable = (
+            self._cache_name is not None
+            and time.monotonic() < self._cache_expires_at
+            and n <= len(history)
+            and self._prefix_key(system, history[:n]) == self._cache_prefix_key
+        )
+        current = (self._cache_name, n, 0) if usable else (None, 0, 0)
+        if usable and self._estimate_tokens(history[n:]) < self._cache_min_tokens:
+            return current
+        if (
+            self._estimate_tokens(history) < self._cache_min_tokens
+            or self._cache_lock.locked()
+            or time.monotonic() < self._cache_retry_at
+        ):
+            return current
+
+        async with self._cache_lock:
+            try:
+                cache = await self._client.aio.caches.create(
+                    model=self._model,
+                    config=genai.types.CreateCachedContentConfig(
+                        contents=history,
+                        system_instruction=system,
+                        ttl=f"{self._cache_ttl_seconds}s",
+                    ),
+                )
+            except errors.APIError as exc:
+                self._cache_failures += 1
+                backoff = min(
+                    _CACHE_RETRY_BASE_S * 2 ** (self._cache_failures - 1), self._cache_ttl_seconds
+                )
+                self._cache_retry_at = time.monotonic() + backoff
+                logger.warning(
+                    f"[gemini] Context cache creation failed, sending uncached "
+                    f"for {backoff:.0f}s: {exc}"
+                )
+                return current
+
+            superseded = self._cache_name
+            self._cache_failures = 0
+            self._cache_name = cache.name
+            self._cache_prefix_len = len(history)
+            self._cache_prefix_key = self._prefix_key(system, history)
+            # Stop using the cache a little before Gemini expires it
+            self._cache_expires_at = time.monotonic() + self._cache_ttl_seconds * 0.9
+            write_tokens = cache.usage_metadata.total_token_count if cache.usage_metadata else 0
+            logger.info(
+                f"[gemini] Created context cache {cache.name}: "
+                f"{len(history)} msgs, {write_tokens} tokens"
+            )
+            if superseded:
+                # Stop paying storage for it; in-flight requests using it already hold it
+                task = asyncio.create_task(self._delete_cache(superseded))
+                self._cache_deletes.add(task)
+                task.add_done_callback(self._cache_deletes.discard)
+            return cache.name, len(history), write_tokens or 0
+
+    async def _delete_cache(self, name: str) -> None:
+        try:
+            await self._client.aio.caches.delete(name=name)
+        except errors.APIError as exc:
+            logger.warning(f"[gemini] Failed to delete context cache {name}, left to TTL: {exc}")
+
+    async def _build_request(
+        self, message: str, history: list[dict] | None, system_context: str | None = None
+    ) -> tuple[list[dict], genai.types.GenerateContentConfig, int]:
+        """Build contents and config, using a context cache for long histories.
+
+        Returns (contents, config, cache_write_tokens).
+        """
+        caching = self._supports_system and self._cache_min_tokens > 0
+        system = self._system_prompt
+        if system_context and not caching:
+            system = f"{system}\n\n{system_context}"
 
         # Build conversation contents
         contents = []
@@ -27,11 +161,28 @@ class GeminiClient:
                 # Gemini uses "model" instead of "assistant"
                 role = "model" if msg["role"] == "assistant" else msg["role"]
                 contents.append({"role": role, "parts": [{"text": msg["content"]}]})
-        contents.append({"role": "user", "parts": [{"text": message}]})
+        parts = [{"text": message}]
+        if system_context and caching:
+            # In the new turn rather than the system instruction, so the summary and
+            # recalled memories, which change from turn to turn, don't force a new cache
+            parts.insert(0, {"text": system_context})
+        contents.append({"role": "user", "parts": parts})
+
+        if caching and history:
+            cache_name, cached_len, write_tokens = await self._resolve_cache(
+                system, contents[:-1]
+            )
+            if cache_name:
+                # The system prompt and cached prefix live in the cache
+                config = genai.types.GenerateContentConfig(
+                    cached_content=cache_name,
+                    max_output_tokens=1024,
+                )
+                return contents[cached_len:], config, write_tokens
 
         if self._supports_system:
             config = genai.types.GenerateContentConfig(
-                system_instruction=self._system_prompt,
+                system_instruction=system,
                 max_output_tokens=1024,
             )
         else:
@@ -41,14 +192,57 @@ class GeminiClient:
             )
             if contents and contents[0]["role"] == "user":
                 original_text = contents[0]["parts"][0]["text"]
-                contents[0]["parts"][0]["text"] = f"{self._system_prompt}\n\n{original_text}"
-
-        response = await loop.run_in_executor(
-            None,
-            lambda: self._client.models.generate_content(
-                model=self._model,
-                contents=contents,
-                config=config,
-            ),
+                contents[0]["parts"][0]["text"] = f"{system}\n\n{original_text}"
+
+        return contents, config, 0
+
+    @staticmethod
+    def _to_result(
+        text: str,
+        usage: genai.types.GenerateContentResponseUsageMetadata | None,
+        cache_write_tokens: int,
+    ) -> LLMResult:
+        if usage is None:
+            return LLMResult(text=text, cache_write_tokens=cache_write_tokens or None)
+        return LLMResult(
+            text=text,
+            prompt_tokens=usage.prompt_token_count,
+            completion_tokens=usage.candidates_token_count,
+            cache_read_tokens=usage.cached_content_token_count,
+            cache_write_tokens=cache_write_tokens or None,
+        )
+
+    async def get_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> LLMResult:
+        contents, config, write_tokens = await self._build_request(
+            message, history, system_context
+        )
+        response = await self._client.aio.models.generate_content(
+            model=self._model,
+            contents=contents,
+            config=config,
+        )
+        return self._to_result(response.text or "", response.usage_metadata, write_tokens)
+
+    async def stream_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> AsyncIterator[str | LLMResult]:
+        contents, config, write_tokens = await self._build_request(
+            message, history, system_context
+        )
+        stream = await self._client.aio.models.generate_content_stream(
+            model=self._model,
+            contents=contents,
+            config=config,
         )
-        return response.text
+        chunks: list[str] = []
+        usage = None
+        async for chunk in stream:
+            if chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
+            # Usage is cumulative; the last chunk carries the final counts
+            if chunk.usage_metadata:
+                usage = chunk.usage_metadata
+        yield self._to_result("".join(chunks), usage, write_tokens)
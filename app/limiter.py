@@ -0,0 +1,116 @@
+import asyncio
+import math
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from app.protocols import LLMClient, LLMResult
+
+
+class ProviderOverloaded(Exception):
+    """A provider's wait queue is full; the caller should retry after `retry_after` seconds."""
+
+    def __init__(self, provider: str, retry_after: int):
+        super().__init__(f"{provider} is at capacity, retry in {retry_after}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight calls to one provider, with a bounded queue of waiting callers.
+
+    Callers beyond `max_concurrent` wait their turn; once `max_queue` callers
+    are already waiting, new ones are rejected immediately with
+    ProviderOverloaded instead of piling up behind a saturated provider.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        # Moving average of how long a call holds its slot, for Retry-After
+        self._avg_service_ms: float | None = None
+
+    def _retry_after(self) -> int:
+        service_s = (self._avg_service_ms or 1000.0) / 1000
+        return max(1, math.ceil(service_s * (self.queued + 1) / self.max_concurrent))
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise ProviderOverloaded(self.name, self._retry_after())
+
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        wait_ms = (time.perf_counter() - start) * 1000
+        self.admitted += 1
+        self._total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+        self.in_flight += 1
+        acquired_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            service_ms = (time.perf_counter() - acquired_at) * 1000
+            self._avg_service_ms = (
+                service_ms
+                if self._avg_service_ms is None
+                else 0.8 * self._avg_service_ms + 0.2 * service_ms
+            )
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": self._total_wait_ms / self.admitted if self.admitted else 0.0,
+            "max_wait_ms": self.max_wait_ms,
+        }
+
+
+class LimitedLLMClient:
+    """Runs every call to `inner` inside a slot of a (possibly shared) ConcurrencyLimiter.
+
+    A streamed response holds its slot until the stream finishes.
+    """
+
+    def __init__(self, inner: LLMClient, limiter: ConcurrencyLimiter):
+        self.inner = inner
+        self._limiter = limiter
+
+    async def init(self) -> None:
+        await self.inner.init()
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+    async def get_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> LLMResult:
+        async with self._limiter.slot():
+            return await self.inner.get_response(message, history, system_context)
+
+    async def stream_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> AsyncIterator[str | LLMResult]:
+        async with self._limiter.slot():
+            async for chunk in self.inner.stream_response(message, history, system_context):
+                yield chunk
@@ -1,8 +1,15 @@
+import hashlib
+import json
 import logging
 import time
+from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Literal
 
+import httpx
 from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 
 logging.basicConfig(
     level=logging.INFO,
@@ -12,29 +19,66 @@ logging.basicConfig(
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.claude_client import ClaudeClient
+from app.coalescing import SingleFlight
 from app.config import settings
+from app.cursors import decode_cursor, encode_cursor
 from app.db import SqliteMessageStore
 from app.dependencies import (
+    get_breakers,
+    get_chat_flights,
+    get_limiters,
     get_llm_client,
+    get_llm_registry,
+    get_memory_index,
     get_message_store,
+    get_summarizer,
     get_trace_store,
+    get_trace_writer,
+    set_breakers,
+    set_chat_flights,
+    set_limiters,
     set_llm_client,
+    set_llm_registry,
+    set_memory_index,
     set_message_store,
+    set_summarizer,
     set_trace_store,
+    set_trace_writer,
 )
+from app.embeddings import HashingEmbedder, OllamaEmbedder
 from app.gemini_client import GeminiClient
+from app.limiter import ConcurrencyLimiter, LimitedLLMClient, ProviderOverloaded
+from app.memory_index import VectorMemoryIndex
 from app.ollama_client import OllamaClient
-from app.protocols import LLMClient, MessageStore, TraceStore
+from app.protocols import Embedder, LLMClient, LLMResult, MessageStore, TraceStore, TraceWriter
+from app.registry import LLMRegistry
+from app.resilience import (
+    CircuitBreaker,
+    CircuitOpen,
+    DeadlineExceeded,
+    ResilientLLMClient,
+    request_deadline,
+)
+from app.routing import HedgedLLMClient
 from app.schemas import (
     AdminMessage,
     AdminMessagesResponse,
     ArchiveResponse,
     ChatRequest,
     ChatResponse,
+    CircuitStats,
+    CircuitsResponse,
     ConfigSnapshot,
+    DailyMessageCount,
+    DailyMessageStats,
     HistoryMessage,
     HistoryResponse,
+    LimiterStats,
+    LimitsResponse,
     MessageStats,
+    ModelInfo,
+    ModelsResponse,
+    OllamaStatus,
     PerformanceStats,
     RateRequest,
     RateResponse,
@@ -45,40 +89,164 @@ from app.schemas import (
     Trace,
     TracesResponse,
 )
+from app.summarizer import Summarizer
+from app.tokens import estimate_message_tokens, estimate_tokens
 from app.trace_store import DuckDBTraceStore
+from app.trace_writer import BatchingTraceWriter
 
+logger = logging.getLogger(__name__)
 
-def create_llm_client() -> LLMClient | None:
-    """Factory function to create the appropriate LLM client based on config."""
-    if settings.llm_provider == "gemini" and settings.gemini_api_key:
+
+_limiters: dict[str, ConcurrencyLimiter] = {}
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def _limiter_for(provider: str) -> ConcurrencyLimiter:
+    """The limiter shared by every client of `provider`."""
+    if provider not in _limiters:
+        _limiters[provider] = ConcurrencyLimiter(
+            provider,
+            max_concurrent=settings.max_concurrency_for(provider),
+            max_queue=settings.max_queue_for(provider),
+        )
+    return _limiters[provider]
+
+
+def _breaker_for(provider: str) -> CircuitBreaker:
+    """The circuit breaker shared by every client of `provider`."""
+    if provider not in _breakers:
+        _breakers[provider] = CircuitBreaker(
+            provider,
+            failure_threshold=settings.circuit_failure_threshold,
+            reset_after_s=settings.circuit_reset_seconds,
+        )
+    return _breakers[provider]
+
+
+def _build_client(provider: str, model: str | None = None) -> LLMClient | None:
+    """Construct the rate-limited, retrying client for `provider`, or None if it isn't configured.
+
+    `model` defaults to the provider's configured model.
+    """
+    client = _build_provider_client(provider, model or settings.model_for(provider))
+    if client is None:
+        return None
+    return ResilientLLMClient(
+        LimitedLLMClient(client, _limiter_for(provider)),
+        _breaker_for(provider),
+        deadline_s=settings.llm_deadline_seconds,
+        max_attempts=settings.llm_max_attempts,
+        base_delay_ms=settings.llm_retry_base_ms,
+        max_delay_ms=settings.llm_retry_max_ms,
+    )
+
+
+def _build_provider_client(provider: str, model: str) -> LLMClient | None:
+    if provider == "gemini" and settings.gemini_api_key:
         return GeminiClient(
-            settings.gemini_api_key, settings.gemini_model, settings.gemini_system_prompt
+            settings.gemini_api_key,
+            model,
+            settings.gemini_system_prompt,
+            cache_min_tokens=settings.gemini_cache_min_tokens,
+            cache_ttl_seconds=settings.gemini_cache_ttl_seconds,
         )
-    elif settings.llm_provider == "anthropic" and settings.anthropic_api_key:
+    elif provider == "anthropic" and settings.anthropic_api_key:
         return ClaudeClient(
-            settings.anthropic_api_key, settings.anthropic_model, settings.anthropic_system_prompt
+            settings.anthropic_api_key,
+            model,
+            settings.anthropic_system_prompt,
+            prompt_caching=settings.anthropic_prompt_caching,
         )
-    elif settings.llm_provider == "ollama":
+    elif provider == "ollama":
         return OllamaClient(
-            settings.ollama_model, settings.ollama_base_url, settings.ollama_system_prompt
+            model,
+            settings.ollama_base_url,
+            settings.ollama_system_prompt,
+            max_connections=settings.ollama_max_connections,
+            max_keepalive_connections=settings.ollama_max_keepalive_connections,
+            keepalive_expiry=settings.ollama_keepalive_expiry_seconds,
+            connect_timeout=settings.ollama_connect_timeout_seconds,
+            read_timeout=settings.ollama_read_timeout_seconds,
+            keep_alive=settings.ollama_keep_alive,
+            prefix_reuse=settings.ollama_prefix_reuse,
         )
     return None
 
 
+def create_llm_client() -> LLMClient | None:
+    """Factory function to create the appropriate LLM client based on config.
+
+    With a fallback provider configured, the primary client is wrapped in a
+    HedgedLLMClient that races the fallback when the primary is slow.
+    """
+    primary = _build_client(settings.llm_provider)
+    if primary is None or settings.fallback_provider in ("", settings.llm_provider):
+        return primary
+    secondary = _build_client(settings.fallback_provider)
+    if secondary is None:
+        logger.warning(f"[hedge] Fallback provider {settings.fallback_provider} not configured")
+        return primary
+    return HedgedLLMClient(
+        primary,
+        settings.llm_provider,
+        settings.model_for(settings.llm_provider),
+        secondary,
+        settings.fallback_provider,
+        settings.model_for(settings.fallback_provider),
+        hedge_after_ms=settings.hedge_after_ms,
+    )
+
+
+def create_llm_registry() -> LLMRegistry:
+    """Build the default client plus one client per extra `llm_models` entry."""
+    registry = LLMRegistry()
+    default = create_llm_client()
+    if default:
+        registry.register(settings.llm_provider, get_current_model(), default, default=True)
+    for spec in settings.llm_models:
+        # Split on the first colon only: Ollama tags contain colons
+        provider, _, model = spec.partition(":")
+        if (provider, model) in registry:
+            continue
+        client = _build_client(provider, model)
+        if client is None:
+            logger.warning(f"[llm] Skipping {spec}: provider not configured")
+            continue
+        registry.register(provider, model, client)
+    return registry
+
+
+def create_embedder() -> Embedder:
+    """Embedder for the long-term memory index."""
+    if settings.memory_embedder == "ollama":
+        return OllamaEmbedder(settings.memory_embed_model, settings.ollama_base_url)
+    return HashingEmbedder(settings.memory_hashing_dim)
+
+
 def get_current_model() -> str:
     """Get the current model name based on provider."""
-    if settings.llm_provider == "gemini":
-        return settings.gemini_model
-    elif settings.llm_provider == "anthropic":
-        return settings.anthropic_model
-    elif settings.llm_provider == "ollama":
-        return settings.ollama_model
-    return "unknown"
+    return settings.model_for(settings.llm_provider)
+
+
+def _find_ollama(llm: LLMClient) -> OllamaClient | None:
+    """The OllamaClient behind `llm`, looking inside retry, limiting and hedging wrappers."""
+    if isinstance(llm, (ResilientLLMClient, LimitedLLMClient)):
+        return _find_ollama(llm.inner)
+    if isinstance(llm, HedgedLLMClient):
+        return _find_ollama(llm.primary) or _find_ollama(llm.secondary)
+    return llm if isinstance(llm, OllamaClient) else None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    store = SqliteMessageStore(settings.database_path)
+    store = SqliteMessageStore(
+        settings.database_path,
+        cache_size=settings.context_cache_size,
+        count_ttl_seconds=settings.search_count_ttl_seconds,
+        read_pool_size=settings.sqlite_read_pool_size,
+        synchronous=settings.sqlite_synchronous,
+        commit_window_ms=settings.sqlite_commit_window_ms,
+    )
     await store.init()
     set_message_store(store)
 
@@ -86,12 +254,64 @@ async def lifespan(app: FastAPI):
     trace_store.init()
     set_trace_store(trace_store)
 
-    llm = create_llm_client()
-    if llm:
+    trace_writer = BatchingTraceWriter(
+        trace_store,
+        max_queue=settings.trace_queue_size,
+        batch_size=settings.trace_batch_size,
+    )
+    trace_writer.start()
+    set_trace_writer(trace_writer)
+
+    set_chat_flights(
+        SingleFlight(
+            ttl_seconds=settings.idempotency_ttl_seconds,
+            max_entries=settings.idempotency_max_entries,
+        )
+    )
+
+    embedder = create_embedder()
+    memory = VectorMemoryIndex(settings.memory_index_path, store, embedder)
+    if settings.memory_embedder:
+        await embedder.init()
+        memory.load()
+        memory.start()
+    set_memory_index(memory)
+
+    registry = create_llm_registry()
+    await registry.init()
+    set_llm_registry(registry)
+    set_limiters(_limiters)
+    set_breakers(_breakers)
+    summarizer: Summarizer | None = None
+    if registry.entries():
+        llm, _, _ = registry.resolve()
         set_llm_client(llm)
+        ollama = _find_ollama(llm)
+        if ollama and settings.ollama_warm_up:
+            try:
+                await ollama.warm_up()
+            except httpx.HTTPError as exc:
+                logger.warning(f"[ollama] Warm-up failed, first chat will cold-load: {exc}")
+
+        summarizer = Summarizer(
+            store,
+            llm,
+            keep_recent=settings.context_messages,
+            batch_messages=settings.summary_batch_messages,
+            max_summary_words=settings.summary_max_words,
+        )
+        if settings.summary_batch_messages > 0:
+            summarizer.start()
+        set_summarizer(summarizer)
 
     yield
 
+    if summarizer:
+        await summarizer.stop()
+    await registry.close()
+    await memory.stop()
+    await embedder.close()
+    await trace_writer.stop()
     await store.close()
     trace_store.close()
 
@@ -115,23 +335,101 @@ app.add_middleware(
 )
 
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(
-    request: ChatRequest,
-    store: MessageStore = Depends(get_message_store),
-    llm: LLMClient = Depends(get_llm_client),
-    traces: TraceStore = Depends(get_trace_store),
-) -> ChatResponse:
+@app.exception_handler(ProviderOverloaded)
+async def provider_overloaded_handler(request, exc: ProviderOverloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(CircuitOpen)
+async def circuit_open_handler(request, exc: CircuitOpen) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request, exc: DeadlineExceeded) -> JSONResponse:
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+def _resolve_llm(registry: LLMRegistry, request: ChatRequest) -> tuple[LLMClient, str, str]:
+    """Pick the client for a chat request's provider/model overrides (400 if unknown)."""
+    try:
+        return registry.resolve(request.provider, request.model)
+    except LookupError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+async def _recall_memories(
+    memory: VectorMemoryIndex, message: str, exclude_ids: set[str]
+) -> str | None:
+    """Format the past messages most relevant to `message` for the system context."""
+    try:
+        hits = await memory.search(
+            message, settings.memory_top_k, settings.memory_min_score, exclude_ids
+        )
+    except httpx.HTTPError as exc:
+        logger.warning(f"[memory] Retrieval failed, continuing without memories: {exc}")
+        return None
+
+    lines = []
+    used = 0
+    for hit in hits:
+        line = f"- ({hit['timestamp'][:10]}) {hit['role']}: {hit['content']}"
+        used += estimate_message_tokens(line)
+        if used > settings.memory_max_tokens:
+            break
+        lines.append(line)
+    if not lines:
+        return None
+    return "Relevant memories from past conversations:\n" + "\n".join(lines)
+
+
+async def _build_chat_context(
+    store: MessageStore, memory: VectorMemoryIndex, message: str, provider: str
+) -> tuple[list[dict] | None, str | None, list[dict] | None, dict, list[dict]]:
+    """Load recent history, the running summary and relevant memories for a turn.
+
+    Returns (history, system_context, context_messages, trigger_message, raw_messages_in).
+    """
+    # Older messages reach the model through the running summary
+    summary = await store.get_summary()
+    system_context = None
+    if summary:
+        system_context = f"Summary of the earlier conversation:\n{summary['content']}"
+
+    # Whatever the system prompt, summary, memories and new message leave of the
+    # budget goes to history
+    history_budget = (
+        settings.context_tokens_for(provider)
+        - estimate_tokens(settings.system_prompt_for(provider))
+        - (estimate_tokens(system_context) if system_context else 0)
+        - (settings.memory_max_tokens if len(memory) else 0)
+        - estimate_message_tokens(message)
+    )
+
     # Fetch recent history for context (newest-first, so reverse for chronological order)
-    history_rows = await store.get_history(settings.context_messages, before=None)
+    history_rows = await store.get_context(
+        max(history_budget, 0), settings.context_messages, settings.context_window_step
+    )
     history = list(reversed(history_rows)) if history_rows else None
 
+    memories = await _recall_memories(memory, message, {m["id"] for m in history_rows})
+    if memories:
+        system_context = f"{system_context}\n\n{memories}" if system_context else memories
+
     # Build normalized trace fields
     context_messages = None
     if history:
         context_messages = [{"role": msg["role"], "content": msg["content"]} for msg in history]
 
-    trigger_message = {"role": "user", "content": request.message}
+    trigger_message = {"role": "user", "content": message}
 
     # Build raw_messages_in (full conversation sent to LLM)
     raw_messages_in = []
@@ -140,43 +438,290 @@ async def chat(
             raw_messages_in.append({"role": msg["role"], "content": msg["content"]})
     raw_messages_in.append(trigger_message)
 
-    # Call LLM with timing
-    start_time = time.perf_counter()
-    response_text = await llm.get_response(request.message, history=history)
-    latency_ms = (time.perf_counter() - start_time) * 1000
-
-    # Get active session
-    session_id = await store.get_active_session_id()
-
-    # Save trace with normalized fields
-    trace_id = traces.save_trace(
-        provider=settings.llm_provider,
-        model=get_current_model(),
+    return history, system_context, context_messages, trigger_message, raw_messages_in
+
+
+def _save_chat_trace(
+    traces: TraceWriter,
+    result: LLMResult,
+    provider: str,
+    model: str,
+    system_context: str | None,
+    latency_ms: float,
+    raw_messages_in: list[dict],
+    context_messages: list[dict] | None,
+    trigger_message: dict,
+    session_id: str | None,
+    ttft_ms: float | None = None,
+) -> str | None:
+    """Queue the trace for one chat turn, including provider-reported usage.
+
+    Returns None if the trace was dropped, so no unratable id reaches the client.
+    """
+    system_prompt = settings.system_prompt_for(provider)
+    if system_context:
+        system_prompt = f"{system_prompt}\n\n{system_context}"
+    return traces.submit(
+        # Routing clients report which provider actually answered
+        provider=result.provider or provider,
+        model=result.model or model,
         messages_in=raw_messages_in,
-        response_out=response_text,
+        response_out=result.text,
         latency_ms=latency_ms,
-        system_prompt=settings.active_system_prompt,
+        prompt_tokens=result.prompt_tokens,
+        completion_tokens=result.completion_tokens,
+        system_prompt=system_prompt,
         context_messages=context_messages,
         trigger_message=trigger_message,
         session_id=session_id,
+        ttft_ms=ttft_ms,
+        load_ms=result.load_ms,
+        prompt_eval_ms=result.prompt_eval_ms,
+        eval_ms=result.eval_ms,
+        cache_read_tokens=result.cache_read_tokens,
+        cache_write_tokens=result.cache_write_tokens,
+        prompt_reused_tokens=result.prompt_reused_tokens,
+        hedge_loser_provider=result.hedge_loser_provider,
+        hedge_loser_latency_ms=result.hedge_loser_latency_ms,
     )
 
-    await store.save_message("user", request.message)
-    msg_id, timestamp = await store.save_message("assistant", response_text)
-    return ChatResponse(id=msg_id, response=response_text, timestamp=timestamp, trace_id=trace_id)
+
+def _flight_key(request: ChatRequest) -> str:
+    """Key under which identical chat requests are coalesced.
+
+    Requests without an idempotency key only share an in-flight call when the
+    message text matches; a key is scoped to its message so reusing it for a
+    different message never returns the wrong reply.
+    """
+    digest = hashlib.sha256(
+        f"{request.provider}\0{request.model}\0{request.message}".encode()
+    ).hexdigest()
+    if request.idempotency_key:
+        return f"key:{request.idempotency_key}:{digest}"
+    return f"msg:{digest}"
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a single Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(
+    request: ChatRequest,
+    store: MessageStore = Depends(get_message_store),
+    registry: LLMRegistry = Depends(get_llm_registry),
+    traces: TraceWriter = Depends(get_trace_writer),
+    flights: SingleFlight = Depends(get_chat_flights),
+    summarizer: Summarizer = Depends(get_summarizer),
+    memory: VectorMemoryIndex = Depends(get_memory_index),
+) -> ChatResponse:
+    llm, provider, model = _resolve_llm(registry, request)
+
+    async def run_turn() -> ChatResponse:
+        (
+            history,
+            system_context,
+            context_messages,
+            trigger_message,
+            raw_messages_in,
+        ) = await _build_chat_context(store, memory, request.message, provider)
+
+        # Call LLM with timing
+        start_time = time.perf_counter()
+        with request_deadline(settings.llm_deadline_seconds):
+            result = await llm.get_response(
+                request.message, history=history, system_context=system_context
+            )
+        latency_ms = (time.perf_counter() - start_time) * 1000
+
+        # Get active session
+        session_id = await store.get_active_session_id()
+
+        # Save trace with normalized fields
+        trace_id = _save_chat_trace(
+            traces,
+            result,
+            provider,
+            model,
+            system_context,
+            latency_ms,
+            raw_messages_in,
+            context_messages,
+            trigger_message,
+            session_id,
+        )
+
+        (user_id, user_ts), (msg_id, timestamp) = await store.save_exchange(
+            request.message, result.text
+        )
+        summarizer.notify(history[0]["timestamp"] if history else user_ts)
+        memory.submit([
+            {"id": user_id, "role": "user", "content": request.message, "timestamp": user_ts},
+            {"id": msg_id, "role": "assistant", "content": result.text, "timestamp": timestamp},
+        ])
+        return ChatResponse(id=msg_id, response=result.text, timestamp=timestamp, trace_id=trace_id)
+
+    # Duplicates share one turn: one provider call, one saved exchange, one trace
+    return await flights.do(
+        _flight_key(request), run_turn, remember=request.idempotency_key is not None
+    )
+
+
+@app.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    store: MessageStore = Depends(get_message_store),
+    registry: LLMRegistry = Depends(get_llm_registry),
+    traces: TraceWriter = Depends(get_trace_writer),
+    flights: SingleFlight = Depends(get_chat_flights),
+    summarizer: Summarizer = Depends(get_summarizer),
+    memory: VectorMemoryIndex = Depends(get_memory_index),
+) -> StreamingResponse:
+    """Stream the assistant reply as Server-Sent Events.
+
+    Emits one `token` event per text delta, then a final `done` event carrying
+    the same payload as POST /chat. Messages and the trace are only persisted
+    once the stream completes; a provider error emits an `error` event instead.
+    A retry whose idempotency key already completed replays the stored reply.
+    """
+    flight_key = _flight_key(request)
+    if request.idempotency_key and (stored := flights.get(flight_key)) is not None:
+
+        async def replay_stream() -> AsyncIterator[str]:
+            yield _sse_event("token", {"content": stored.response})
+            yield _sse_event("done", stored.model_dump())
+
+        return StreamingResponse(
+            replay_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    llm, provider, model = _resolve_llm(registry, request)
+    (
+        history,
+        system_context,
+        context_messages,
+        trigger_message,
+        raw_messages_in,
+    ) = await _build_chat_context(store, memory, request.message, provider)
+
+    # Call LLM with timing. The first chunk is pulled before the response
+    # starts so overload, an open circuit or a missed deadline can still be
+    # answered with a 429/503/504 instead of an SSE error event.
+    start_time = time.perf_counter()
+    stream = llm.stream_response(request.message, history=history, system_context=system_context)
+    try:
+        with request_deadline(settings.llm_deadline_seconds):
+            first = await anext(stream, None)
+    except (ProviderOverloaded, CircuitOpen, DeadlineExceeded):
+        raise
+    except Exception as exc:
+        first, first_error = None, exc
+    else:
+        first_error = None
+
+    async def chunks() -> AsyncIterator[str | LLMResult]:
+        if first_error is not None:
+            raise first_error
+        try:
+            if first is None:
+                return
+            yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    async def event_stream() -> AsyncIterator[str]:
+        result: LLMResult | None = None
+        ttft_ms: float | None = None
+
+        try:
+            async for chunk in chunks():
+                if isinstance(chunk, LLMResult):
+                    result = chunk
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start_time) * 1000
+                yield _sse_event("token", {"content": chunk})
+        except Exception as exc:
+            logger.exception("[chat/stream] LLM stream failed")
+            yield _sse_event("error", {"detail": str(exc)})
+            return
+        latency_ms = (time.perf_counter() - start_time) * 1000
+        if result is None:
+            yield _sse_event("error", {"detail": "LLM stream ended without a result"})
+            return
+
+        # Get active session
+        session_id = await store.get_active_session_id()
+
+        # Save trace with normalized fields
+        trace_id = _save_chat_trace(
+            traces,
+            result,
+            provider,
+            model,
+            system_context,
+            latency_ms,
+            raw_messages_in,
+            context_messages,
+            trigger_message,
+            session_id,
+            ttft_ms=ttft_ms,
+        )
+
+        (user_id, user_ts), (msg_id, timestamp) = await store.save_exchange(
+            request.message, result.text
+        )
+        summarizer.notify(history[0]["timestamp"] if history else user_ts)
+        memory.submit([
+            {"id": user_id, "role": "user", "content": request.message, "timestamp": user_ts},
+            {"id": msg_id, "role": "assistant", "content": result.text, "timestamp": timestamp},
+        ])
+        done = ChatResponse(
+            id=msg_id, response=result.text, timestamp=timestamp, trace_id=trace_id
+        )
+        if request.idempotency_key:
+            flights.put(flight_key, done)
+        yield _sse_event("done", done.model_dump())
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/chat/history", response_model=HistoryResponse)
 async def get_history(
     limit: int = Query(default=20, ge=1, le=100),
     before: str | None = Query(default=None),
+    session_id: str | None = Query(default=None),
     store: MessageStore = Depends(get_message_store),
 ) -> HistoryResponse:
-    rows = await store.get_history(limit + 1, before)
+    """Page backwards through the conversation, or an ended session's messages.
+
+    `before` takes the previous page's `next_cursor`. A bare timestamp from
+    older clients is still accepted and resumes before that instant.
+    """
+    after = None
+    if before:
+        try:
+            after = tuple(decode_cursor(before, str, str))
+        except ValueError:
+            try:
+                datetime.fromisoformat(before)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor") from None
+            after = (before, "")  # Sorts before every id at that timestamp
+    rows = await store.get_history(limit + 1, before=after, session_id=session_id)
     has_more = len(rows) > limit
     if has_more:
         rows = rows[:limit]
-    next_cursor = rows[-1]["timestamp"] if has_more else None
+    next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"]) if has_more else None
     messages = [HistoryMessage(**row) for row in rows]
     return HistoryResponse(messages=messages, has_more=has_more, next_cursor=next_cursor)
 
@@ -208,10 +753,76 @@ async def create_session(
 
 @app.get("/admin/sessions", response_model=SessionsResponse)
 async def list_sessions(
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: str | None = Query(default=None),
     store: MessageStore = Depends(get_message_store),
 ) -> SessionsResponse:
-    sessions = await store.get_sessions()
-    return SessionsResponse(sessions=[Session(**s) for s in sessions])
+    """Newest-first sessions; page with the returned `next_cursor`."""
+    try:
+        result = await store.get_sessions(limit=limit, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return SessionsResponse(
+        sessions=[Session(**s) for s in result["sessions"]],
+        next_cursor=result["next_cursor"],
+    )
+
+
+# --- Models ---
+
+
+@app.get("/admin/models", response_model=ModelsResponse)
+async def list_models(
+    registry: LLMRegistry = Depends(get_llm_registry),
+) -> ModelsResponse:
+    default = registry.default if registry.entries() else None
+    return ModelsResponse(
+        models=[
+            ModelInfo(provider=provider, model=model, default=(provider, model) == default)
+            for provider, model in registry.entries()
+        ]
+    )
+
+
+@app.get("/admin/limits", response_model=LimitsResponse)
+async def list_limits(
+    limiters: dict[str, ConcurrencyLimiter] = Depends(get_limiters),
+) -> LimitsResponse:
+    return LimitsResponse(
+        limits=[
+            LimiterStats(provider=provider, **limiter.stats())
+            for provider, limiter in limiters.items()
+        ]
+    )
+
+
+@app.get("/admin/circuits", response_model=CircuitsResponse)
+async def list_circuits(
+    breakers: dict[str, CircuitBreaker] = Depends(get_breakers),
+) -> CircuitsResponse:
+    return CircuitsResponse(
+        circuits=[
+            CircuitStats(provider=provider, **breaker.stats())
+            for provider, breaker in breakers.items()
+        ]
+    )
+
+
+# --- Ollama ---
+
+
+@app.get("/admin/ollama/status", response_model=OllamaStatus)
+async def ollama_status(
+    llm: LLMClient = Depends(get_llm_client),
+) -> OllamaStatus:
+    ollama = _find_ollama(llm)
+    if ollama is None:
+        raise HTTPException(status_code=409, detail="Active provider is not ollama")
+    try:
+        status = await ollama.get_model_status()
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=502, detail=f"Ollama unreachable: {exc}")
+    return OllamaStatus(**status)
 
 
 # --- Traces ---
@@ -249,14 +860,36 @@ async def admin_messages(
     offset: int = Query(default=0, ge=0),
     role: str | None = Query(default=None),
     q: str | None = Query(default=None),
+    sort: Literal["relevance", "recent"] | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    exact_total: bool = Query(default=False),
     store: MessageStore = Depends(get_message_store),
 ) -> AdminMessagesResponse:
-    messages, total = await store.search_messages(
-        limit=limit, offset=offset, role=role, query=q
-    )
+    """Browse or full-text search every stored message, archived ones included.
+
+    Searches are ranked by relevance within each source (active, session,
+    archived) unless `sort=recent`. Page with the
+    returned `next_cursor`; `offset` is kept for older clients and ignored
+    when a cursor is given. `total` is a recently cached count unless
+    `exact_total` is set.
+    """
+    try:
+        result = await store.search_messages(
+            limit=limit,
+            offset=offset,
+            role=role,
+            query=q,
+            sort=sort or ("relevance" if q else "recent"),
+            cursor=cursor,
+            exact_total=exact_total,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     return AdminMessagesResponse(
-        messages=[AdminMessage(**m) for m in messages],
-        total=total,
+        messages=[AdminMessage(**m) for m in result["messages"]],
+        total=result["total"],
+        total_exact=result["total_exact"],
+        next_cursor=result["next_cursor"],
     )
 
 
@@ -271,6 +904,30 @@ async def message_stats(
     return MessageStats(**stats)
 
 
+@app.get("/admin/stats/messages/daily", response_model=DailyMessageStats)
+async def daily_message_stats(
+    days: int = Query(default=30, ge=1, le=366),
+    store: MessageStore = Depends(get_message_store),
+) -> DailyMessageStats:
+    """Messages per UTC day for the last `days` days, quiet days included as zeros."""
+    today = datetime.now(timezone.utc).date()
+    start = today - timedelta(days=days - 1)
+    counts = {c["day"]: c for c in await store.get_daily_message_counts(start.isoformat())}
+    series = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        c = counts.get(day, {"user_messages": 0, "assistant_messages": 0})
+        series.append(
+            DailyMessageCount(
+                day=day,
+                user_messages=c["user_messages"],
+                assistant_messages=c["assistant_messages"],
+                total_messages=c["user_messages"] + c["assistant_messages"],
+            )
+        )
+    return DailyMessageStats(days=series)
+
+
 @app.get("/admin/stats/performance", response_model=PerformanceStats)
 def performance_stats(
     traces: TraceStore = Depends(get_trace_store),
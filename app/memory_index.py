@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.protocols import Embedder, MessageStore
+
+logger = logging.getLogger(__name__)
+
+# Queue marker telling the indexing loop to persist and exit
+_STOP = object()
+
+
+class VectorMemoryIndex:
+    """Embedding index over every stored message, for retrieving relevant old memories.
+
+    Vectors are kept in memory as one contiguous float32 matrix (grown by
+    doubling) and persisted in an .npz file next to their message ids; content
+    stays in the MessageStore and is fetched for the hits. New messages are
+    queued by `submit()` and embedded by a background task; on start the task
+    first backfills anything stored after the newest indexed message, which
+    also recovers additions lost since the last save.
+    Search is a single matrix-vector product over normalized vectors.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        store: MessageStore,
+        embedder: Embedder,
+        save_every: int = 100,
+        batch_size: int = 64,
+    ):
+        self._path = Path(path)
+        self._store = store
+        self._embedder = embedder
+        self._save_every = save_every
+        self._batch_size = batch_size
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._ids: list[str] = []
+        self._indexed_until: str | None = None  # Timestamp of the newest indexed message
+        self._id_set: set[str] = set()
+        self._unsaved = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def load(self) -> None:
+        """Read the persisted index, if there is one."""
+        if not self._path.exists():
+            return
+        with np.load(self._path) as data:
+            self._vectors = data["vectors"]
+            self._ids = data["ids"].tolist()
+            self._indexed_until = str(data["indexed_until"]) or None
+        self._size = len(self._ids)
+        self._id_set = set(self._ids)
+        logger.info(f"[memory] Loaded {self._size} vectors from {self._path}")
+
+    def _save(self) -> None:
+        """Atomically write the index. Runs in a worker thread while the indexing loop waits."""
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        n = self._size
+        tmp = self._path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp,
+            vectors=self._vectors[:n],
+            ids=np.array(self._ids[:n]),
+            indexed_until=np.array(self._indexed_until or ""),
+        )
+        os.replace(tmp, self._path)
+
+    async def add(self, messages: list[dict]) -> int:
+        """Embed and index messages not already indexed; returns how many were added."""
+        new = [m for m in messages if m["id"] not in self._id_set]
+        if not new:
+            return 0
+        vectors = await self._embedder.embed([m["content"] for m in new])
+
+        if self._vectors.shape[1] != vectors.shape[1]:
+            if self._size:
+                raise ValueError(
+                    f"Embedding dim changed from {self._vectors.shape[1]} to {vectors.shape[1]}; "
+                    f"delete {self._path} to rebuild the index"
+                )
+            self._vectors = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        needed = self._size + len(new)
+        if needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors), 256)
+            grown = np.zeros((capacity, vectors.shape[1]), dtype=np.float32)
+            grown[: self._size] = self._vectors[: self._size]
+            self._vectors = grown
+        self._vectors[self._size : needed] = vectors
+        self._size = needed
+
+        for m in new:
+            self._ids.append(m["id"])
+            self._id_set.add(m["id"])
+        self._indexed_until = max(
+            [m["timestamp"] for m in new] + [self._indexed_until or ""]
+        )
+        self._unsaved += len(new)
+        return len(new)
+
+    async def search(
+        self, query: str, k: int, min_score: float = 0.0, exclude_ids: set[str] | None = None
+    ) -> list[dict]:
+        """Top-`k` indexed messages by cosine similarity to `query`, best first."""
+        if not self._size or k <= 0:
+            return []
+        start_time = time.perf_counter()
+        q = (await self._embedder.embed([query]))[0]
+        scores = self._vectors[: self._size] @ q
+
+        # Over-fetch so excluded messages don't shrink the result below k
+        exclude_ids = exclude_ids or set()
+        top = min(k + len(exclude_ids), self._size)
+        candidates = np.argpartition(-scores, top - 1)[:top]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        hit_scores: dict[str, float] = {}
+        for i in candidates:
+            if scores[i] < min_score or len(hit_scores) == k:
+                break
+            if self._ids[i] in exclude_ids:
+                continue
+            hit_scores[self._ids[i]] = float(scores[i])
+        rows = await self._store.get_messages_by_ids(list(hit_scores))
+        results = sorted(
+            ({**row, "score": hit_scores[row["id"]]} for row in rows),
+            key=lambda r: r["score"],
+            reverse=True,
+        )
+        logger.info(
+            f"[memory] Searched {self._size} vectors in "
+            f"{(time.perf_counter() - start_time) * 1000:.1f}ms, {len(results)} hits"
+        )
+        return results
+
+    async def backfill(self) -> int:
+        """Index stored messages newer than the newest indexed one."""
+        added = 0
+        after = self._indexed_until
+        while True:
+            rows = await self._store.get_all_messages_after(after, self._batch_size)
+            if not rows:
+                return added
+            added += await self.add(rows)
+            after = rows[-1]["timestamp"]
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Index everything queued, persist, and stop the background task."""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    def submit(self, messages: list[dict]) -> None:
+        """Queue newly saved messages for indexing; a no-op unless started."""
+        if self._task is not None:
+            self._queue.put_nowait(messages)
+
+    async def _run(self) -> None:
+        try:
+            added = await self.backfill()
+            if added:
+                logger.info(f"[memory] Backfilled {added} messages")
+        except Exception:
+            logger.exception("[memory] Backfill failed")
+
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            stopping = any(b is _STOP for b in batch)
+            messages = [m for b in batch if b is not _STOP for m in b]
+            try:
+                await self.add(messages)
+            except Exception:
+                logger.exception(f"[memory] Failed to index {len(messages)} messages")
+            if self._unsaved >= self._save_every or (stopping and self._unsaved):
+                self._unsaved = 0
+                await asyncio.to_thread(self._save)
+            if stopping:
+                return
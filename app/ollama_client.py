@@ -1,7 +1,12 @@
+import json
 import logging
+from collections.abc import AsyncIterator
 
 import httpx
 
+from app.protocols import LLMResult
+from app.tokens import estimate_message_tokens
+
 logger = logging.getLogger(__name__)
 
 
@@ -11,66 +16,237 @@ def _ns_to_ms(ns: int) -> float:
 
 
 class OllamaClient:
-    def __init__(self, model: str, base_url: str, system_prompt: str):
+    """Chat client for a local Ollama server.
+
+    With `prefix_reuse`, requests are laid out so consecutive turns share the
+    longest possible prompt prefix: the per-turn system context (summary,
+    recalled memories) goes in a system message just before the new user
+    message instead of at the top. Ollama keeps the KV cache of the previous
+    request and only re-evaluates the prompt after the first difference, so a
+    turn re-evaluates the last exchange, the context and the new message
+    rather than the whole history.
+    The client tracks what Ollama last saw to report an estimate of the reused
+    prefix as `prompt_reused_tokens`, apart from the provider-counted
+    `cache_read_tokens`; a diverged history (archive, new session, a window
+    whose start stepped forward) simply shares a shorter prefix.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str,
+        system_prompt: str,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 120.0,
+        keep_alive: str = "30m",
+        prefix_reuse: bool = True,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
         self._model = model
         self._base_url = base_url.rstrip("/")
         self._system_prompt = system_prompt
+        self._keep_alive = keep_alive
+        self._prefix_reuse = prefix_reuse
+        # The last prompt plus its reply, i.e. what Ollama's KV cache now holds
+        self._cached_messages: list[dict] = []
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._transport = transport
+        self._http: httpx.AsyncClient | None = None
+
+    async def init(self) -> None:
+        # One long-lived pooled client so every call reuses keep-alive connections
+        self._http = httpx.AsyncClient(
+            base_url=self._base_url,
+            limits=self._limits,
+            timeout=self._timeout,
+            transport=self._transport,
+        )
 
-    async def get_response(
-        self, message: str, history: list[dict] | None = None
-    ) -> str:
-        messages = [{"role": "system", "content": self._system_prompt}]
+    async def close(self) -> None:
+        if self._http:
+            await self._http.aclose()
+            self._http = None
+
+    def _build_messages(
+        self, message: str, history: list[dict] | None, system_context: str | None = None
+    ) -> list[dict]:
+        system = self._system_prompt
+        if system_context and not self._prefix_reuse:
+            system = f"{system}\n\n{system_context}"
+        messages = [{"role": "system", "content": system}]
 
         if history:
             for msg in history:
                 messages.append({"role": msg["role"], "content": msg["content"]})
 
+        if system_context and self._prefix_reuse:
+            # After the history, so a changing context doesn't invalidate the cached prefix
+            messages.append({"role": "system", "content": system_context})
         messages.append({"role": "user", "content": message})
 
         logger.info(
             f"[ollama] Request: model={self._model}, "
             f"context_msgs={len(history) if history else 0}, prompt_len={len(message)}"
         )
+        return messages
+
+    def _reused_tokens(self, messages: list[dict]) -> int | None:
+        """Estimated prompt tokens shared with the previous request, which Ollama can skip."""
+        if not self._prefix_reuse:
+            return None
+        reused = 0
+        for sent, cached in zip(messages, self._cached_messages):
+            if sent != cached:
+                break
+            reused += estimate_message_tokens(sent["content"])
+        return reused
+
+    def _remember(self, messages: list[dict], reply: str) -> None:
+        if self._prefix_reuse:
+            self._cached_messages = [*messages, {"role": "assistant", "content": reply}]
+
+    def _to_result(self, text: str, data: dict, reused_tokens: int | None = None) -> LLMResult:
+        """Build an LLMResult from Ollama's final response payload, logging its metrics.
+
+        `prompt_eval_count` only covers tokens Ollama actually evaluated, so with
+        a reused prefix it excludes `reused_tokens`.
+        """
+        total_ms = _ns_to_ms(data.get("total_duration", 0))
+        load_ms = _ns_to_ms(data.get("load_duration", 0))
+        prompt_eval_ms = _ns_to_ms(data.get("prompt_eval_duration", 0))
+        eval_ms = _ns_to_ms(data.get("eval_duration", 0))
+        prompt_tokens = data.get("prompt_eval_count", 0)
+        output_tokens = data.get("eval_count", 0)
+
+        # Calculate tokens per second
+        tokens_per_sec = (output_tokens / (eval_ms / 1000)) if eval_ms > 0 else 0
+
+        logger.info(
+            f"[ollama] Response: "
+            f"total={total_ms:.0f}ms, "
+            f"load={load_ms:.0f}ms, "
+            f"prompt_eval={prompt_eval_ms:.0f}ms, "
+            f"eval={eval_ms:.0f}ms | "
+            f"tokens: in={prompt_tokens}, reused~{reused_tokens or 0}, out={output_tokens} | "
+            f"speed: {tokens_per_sec:.1f} tok/s"
+        )
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                f"{self._base_url}/api/chat",
-                json={
-                    "model": self._model,
-                    "messages": messages,
-                    "stream": False,
-                },
-            )
+        return LLMResult(
+            text=text,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=output_tokens,
+            load_ms=load_ms,
+            prompt_eval_ms=prompt_eval_ms,
+            eval_ms=eval_ms,
+            prompt_reused_tokens=reused_tokens,
+        )
+
+    async def get_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> LLMResult:
+        assert self._http is not None, "OllamaClient not initialized"
+        messages = self._build_messages(message, history, system_context)
+        reused_tokens = self._reused_tokens(messages)
+
+        response = await self._http.post(
+            "/api/chat",
+            json={
+                "model": self._model,
+                "messages": messages,
+                "stream": False,
+                "keep_alive": self._keep_alive,
+            },
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        text = data["message"]["content"]
+        self._remember(messages, text)
+        return self._to_result(text, data, reused_tokens)
+
+    async def stream_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> AsyncIterator[str | LLMResult]:
+        assert self._http is not None, "OllamaClient not initialized"
+        messages = self._build_messages(message, history, system_context)
+        reused_tokens = self._reused_tokens(messages)
+
+        async with self._http.stream(
+            "POST",
+            "/api/chat",
+            json={
+                "model": self._model,
+                "messages": messages,
+                "stream": True,
+                "keep_alive": self._keep_alive,
+            },
+        ) as response:
             response.raise_for_status()
-            data = response.json()
-
-            # Log performance metrics from Ollama
-            total_ms = _ns_to_ms(data.get("total_duration", 0))
-            load_ms = _ns_to_ms(data.get("load_duration", 0))
-            prompt_eval_ms = _ns_to_ms(data.get("prompt_eval_duration", 0))
-            eval_ms = _ns_to_ms(data.get("eval_duration", 0))
-            prompt_tokens = data.get("prompt_eval_count", 0)
-            output_tokens = data.get("eval_count", 0)
-
-            # Calculate tokens per second
-            tokens_per_sec = (output_tokens / (eval_ms / 1000)) if eval_ms > 0 else 0
-
-            logger.info(
-                f"[ollama] Response: "
-                f"total={total_ms:.0f}ms, "
-                f"load={load_ms:.0f}ms, "
-                f"prompt_eval={prompt_eval_ms:.0f}ms, "
-                f"eval={eval_ms:.0f}ms | "
-                f"tokens: in={prompt_tokens}, out={output_tokens} | "
-                f"speed: {tokens_per_sec:.1f} tok/s"
-            )
-
-            return data["message"]["content"]
+            chunks: list[str] = []
+            # Ollama streams newline-delimited JSON objects
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if "error" in data:
+                    raise RuntimeError(f"Ollama stream error: {data['error']}")
+
+                content = data.get("message", {}).get("content")
+                if content:
+                    chunks.append(content)
+                    yield content
+
+                if data.get("done"):
+                    # The final object carries the timing and token counters
+                    text = "".join(chunks)
+                    self._remember(messages, text)
+                    yield self._to_result(text, data, reused_tokens)
+                    break
+
+    async def warm_up(self) -> float:
+        """Load the model into memory ahead of the first chat.
+
+        An empty message list makes Ollama load the model (and refresh its
+        keep_alive) without generating anything. Returns the load time in ms,
+        which is ~0 when the model was already resident.
+        """
+        assert self._http is not None, "OllamaClient not initialized"
+        response = await self._http.post(
+            "/api/chat",
+            json={"model": self._model, "messages": [], "keep_alive": self._keep_alive},
+        )
+        response.raise_for_status()
+        load_ms = _ns_to_ms(response.json().get("load_duration", 0))
+        logger.info(f"[ollama] Warm-up: model={self._model}, load={load_ms:.0f}ms")
+        return load_ms
+
+    async def get_model_status(self) -> dict:
+        """Report whether the configured model is resident and its memory footprint."""
+        models = await self.get_running_models()
+        loaded = next(
+            (m for m in models if self._model in (m.get("name"), m.get("model"))), None
+        )
+        return {
+            "model": self._model,
+            "resident": loaded is not None,
+            "size_bytes": loaded.get("size") if loaded else None,
+            "size_vram_bytes": loaded.get("size_vram") if loaded else None,
+            "expires_at": loaded.get("expires_at") if loaded else None,
+            "keep_alive": self._keep_alive,
+        }
 
     async def get_running_models(self) -> list[dict]:
         """Get list of currently loaded models and their memory usage."""
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{self._base_url}/api/ps")
-            response.raise_for_status()
-            data = response.json()
-            return data.get("models", [])
+        assert self._http is not None, "OllamaClient not initialized"
+        response = await self._http.get("/api/ps", timeout=10.0)
+        response.raise_for_status()
+        data = response.json()
+        return data.get("models", [])
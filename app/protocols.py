@@ -1,42 +1,122 @@
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
 from typing import Protocol
 
+import numpy as np
+
+
+@dataclass
+class LLMResult:
+    """A completed LLM call: the reply text plus provider-reported usage and timings.
+
+    Timing fields are only set by providers that report them (currently Ollama);
+    token counts are set by every provider that returns usage.
+    """
+
+    text: str
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    load_ms: float | None = None  # Model load time (cold start)
+    prompt_eval_ms: float | None = None  # Time spent processing the prompt
+    eval_ms: float | None = None  # Time spent generating the completion
+    cache_read_tokens: int | None = None  # Prompt tokens served from a provider cache
+    cache_write_tokens: int | None = None  # Prompt tokens written to a provider cache
+    # Estimated prompt tokens a local server reused from the previous request
+    # instead of re-evaluating; kept apart from the provider-counted cache fields
+    prompt_reused_tokens: int | None = None
+    # Set by routing clients to record which provider actually answered
+    provider: str | None = None
+    model: str | None = None
+    hedge_loser_provider: str | None = None  # Provider that lost a hedged race
+    hedge_loser_latency_ms: float | None = None  # How long the loser ran before being dropped
+
 
 class MessageStore(Protocol):
     async def save_message(self, role: str, content: str) -> tuple[str, str]: ...
 
+    async def save_exchange(
+        self, user_content: str, assistant_content: str
+    ) -> tuple[tuple[str, str], tuple[str, str]]: ...
+
     async def get_history(
-        self, limit: int, before: str | None
+        self,
+        limit: int,
+        before: tuple[str, str] | None = None,
+        session_id: str | None = None,
     ) -> list[dict]: ...
 
+    async def get_context(
+        self, token_budget: int, max_messages: int, step: int = 1
+    ) -> list[dict]: ...
+
+    async def get_messages_after(self, after: str | None, limit: int) -> list[dict]: ...
+
+    async def get_all_messages_after(self, after: str | None, limit: int) -> list[dict]: ...
+
+    async def get_messages_by_ids(self, ids: list[str]) -> list[dict]: ...
+
+    async def get_summary(self) -> dict | None: ...
+
+    async def save_summary(self, content: str, covered_until: str) -> bool: ...
+
     async def archive_messages(self) -> tuple[int, str]: ...
 
     async def create_session(
         self, provider: str, model: str, context_messages: int, note: str | None
     ) -> dict: ...
 
-    async def get_sessions(self) -> list[dict]: ...
+    async def get_sessions(self, limit: int, cursor: str | None = None) -> dict: ...
 
     async def get_active_session_id(self) -> str | None: ...
 
     async def search_messages(
         self,
         limit: int,
-        offset: int,
+        offset: int = 0,
         role: str | None = None,
         query: str | None = None,
-    ) -> tuple[list[dict], int]: ...
+        sort: str = "recent",
+        cursor: str | None = None,
+        exact_total: bool = False,
+    ) -> dict: ...
 
     async def get_message_stats(self) -> dict: ...
 
+    async def get_daily_message_counts(self, since: str) -> list[dict]: ...
+
     async def init(self) -> None: ...
 
     async def close(self) -> None: ...
 
 
 class LLMClient(Protocol):
+    """A chat model. `system_context` is extra per-turn context (e.g. a running
+    summary of older history) appended to the client's system prompt, or sent
+    just before the new message by clients that cache the prompt prefix."""
+
     async def get_response(
-        self, message: str, history: list[dict] | None = None
-    ) -> str: ...
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> LLMResult: ...
+
+    def stream_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> AsyncIterator[str | LLMResult]:
+        """Yield text deltas as they arrive, then one final LLMResult."""
+        ...
+
+    async def init(self) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class Embedder(Protocol):
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        """Return one L2-normalized float32 row per text."""
+        ...
+
+    async def init(self) -> None: ...
+
+    async def close(self) -> None: ...
 
 
 class TraceStore(Protocol):
@@ -53,8 +133,19 @@ class TraceStore(Protocol):
         context_messages: list[dict] | None = None,
         trigger_message: dict | None = None,
         session_id: str | None = None,
+        ttft_ms: float | None = None,
+        load_ms: float | None = None,
+        prompt_eval_ms: float | None = None,
+        eval_ms: float | None = None,
+        cache_read_tokens: int | None = None,
+        cache_write_tokens: int | None = None,
+        prompt_reused_tokens: int | None = None,
+        hedge_loser_provider: str | None = None,
+        hedge_loser_latency_ms: float | None = None,
     ) -> str: ...
 
+    def save_traces(self, traces: list[dict]) -> None: ...
+
     def get_traces(
         self,
         limit: int = 50,
@@ -71,3 +162,11 @@ class TraceStore(Protocol):
     def init(self) -> None: ...
 
     def close(self) -> None: ...
+
+
+class TraceWriter(Protocol):
+    def submit(self, **fields) -> str | None: ...
+
+    def start(self) -> None: ...
+
+    async def stop(self) -> None: ...
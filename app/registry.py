@@ -0,0 +1,62 @@
+from app.protocols import LLMClient
+
+
+class LLMRegistry:
+    """Initialized LLM clients keyed by (provider, model), with one default.
+
+    Every client is built and initialized at startup, so switching the model
+    for a single request never pays for client construction or a cold
+    connection pool.
+    """
+
+    def __init__(self):
+        self._clients: dict[tuple[str, str], LLMClient] = {}
+        self._default: tuple[str, str] | None = None
+
+    def register(self, provider: str, model: str, client: LLMClient, default: bool = False) -> None:
+        self._clients[(provider, model)] = client
+        if default or self._default is None:
+            self._default = (provider, model)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._clients
+
+    @property
+    def default(self) -> tuple[str, str]:
+        assert self._default is not None, "LLMRegistry has no clients"
+        return self._default
+
+    def entries(self) -> list[tuple[str, str]]:
+        """Registered (provider, model) pairs, in registration order."""
+        return list(self._clients)
+
+    def resolve(
+        self, provider: str | None = None, model: str | None = None
+    ) -> tuple[LLMClient, str, str]:
+        """Pick the client for a request's overrides.
+
+        A missing provider means the default provider; a missing model means the
+        default model when the provider is the default one, otherwise the first
+        model registered for that provider. Raises LookupError if nothing matches.
+
+        Returns (client, provider, model).
+        """
+        default_provider, default_model = self.default
+        provider = provider or default_provider
+        if model is None:
+            if provider == default_provider:
+                model = default_model
+            else:
+                model = next((m for p, m in self._clients if p == provider), "")
+        client = self._clients.get((provider, model))
+        if client is None:
+            raise LookupError(f"No client registered for {provider}/{model}")
+        return client, provider, model
+
+    async def init(self) -> None:
+        for client in self._clients.values():
+            await client.init()
+
+    async def close(self) -> None:
+        for client in self._clients.values():
+            await client.close()
@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+import anthropic
+import httpx
+from google.genai import errors as genai_errors
+
+from app.protocols import LLMClient, LLMResult
+
+logger = logging.getLogger(__name__)
+
+# Loop-time deadline of the request being served. Tasks copy it when they are
+# created, so every hedge leg and retry of one request sees the same value.
+_request_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+def _now() -> float:
+    return asyncio.get_running_loop().time()
+
+
+@contextmanager
+def request_deadline(seconds: float) -> Iterator[None]:
+    """Bound every LLM call made in this context, hedges and retries included, by one deadline.
+
+    A nested deadline never extends the one already in force.
+    """
+    deadline = _now() + seconds
+    current = _request_deadline.get()
+    token = _request_deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+class CircuitOpen(Exception):
+    """A provider's circuit is open after repeated failures; retry after `retry_after` seconds."""
+
+    def __init__(self, provider: str, retry_after: int):
+        super().__init__(f"{provider} is unavailable, retry in {retry_after}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(TimeoutError):
+    """An LLM call, including its retries, ran past the request deadline."""
+
+    def __init__(self, provider: str, deadline_s: float):
+        super().__init__(f"{provider} did not respond within {deadline_s:g}s")
+        self.provider = provider
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether `exc` signals a provider-side failure worth retrying.
+
+    Connection errors, timeouts, 429s and 5xx responses are transient; other
+    4xx responses mean the request itself is wrong and would fail again.
+    """
+    if isinstance(exc, (TimeoutError, httpx.TransportError, anthropic.APIConnectionError)):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+    elif isinstance(exc, anthropic.APIStatusError):
+        status = exc.status_code
+    elif isinstance(exc, genai_errors.APIError):
+        status = exc.code
+    else:
+        return False
+    return status == 429 or status >= 500
+
+
+class CircuitBreaker:
+    """Per-provider circuit breaker.
+
+    After `failure_threshold` consecutive transient failures the circuit opens
+    and calls fail fast with CircuitOpen. Once `reset_after_s` has passed, one
+    probe call is let through (half-open): success closes the circuit, failure
+    opens it again. Recent state transitions are kept for /admin/circuits.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_after_s: float = 30.0,
+        max_transitions: int = 50,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_after_s = reset_after_s
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.transitions: deque[dict] = deque(maxlen=max_transitions)
+
+    def _transition(self, state: str, reason: str) -> None:
+        logger.warning(f"[circuit] {self.name}: {self.state} -> {state} ({reason})")
+        self.transitions.append({
+            "at": datetime.now(timezone.utc).isoformat(),
+            "from_state": self.state,
+            "to_state": state,
+            "reason": reason,
+        })
+        self.state = state
+
+    def _retry_after(self) -> int:
+        remaining = self.reset_after_s - (time.monotonic() - self._opened_at)
+        return max(1, math.ceil(remaining))
+
+    def before_call(self) -> None:
+        """Raise CircuitOpen unless a call may go through now."""
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_after_s:
+                self.rejected += 1
+                raise CircuitOpen(self.name, self._retry_after())
+            self._transition("half_open", "reset timeout elapsed")
+        if self.state == "half_open":
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpen(self.name, 1)
+            self._probing = True
+
+    def record_success(self) -> None:
+        self._probing = False
+        self.consecutive_failures = 0
+        if self.state != "closed":
+            self._transition("closed", "probe succeeded")
+
+    def record_failure(self, exc: BaseException) -> None:
+        self._probing = False
+        self.consecutive_failures += 1
+        if self.state == "half_open" or (
+            self.state == "closed" and self.consecutive_failures >= self.failure_threshold
+        ):
+            self._opened_at = time.monotonic()
+            self._transition(
+                "open", f"{self.consecutive_failures} consecutive failures: {type(exc).__name__}"
+            )
+
+    def release(self) -> None:
+        """End a call that neither succeeded nor failed on the provider's side."""
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_after_s": self.reset_after_s,
+            "rejected": self.rejected,
+            "transitions": list(self.transitions),
+        }
+
+
+class ResilientLLMClient:
+    """Adds a deadline, retries and a circuit breaker around `inner`.
+
+    Calls made inside `request_deadline()` share the request's deadline, so
+    hedge legs and their retries together stay within it; any other call gets
+    `deadline_s` of its own. The deadline covers queueing, all attempts and
+    the backoff between them. Transient failures are retried up to
+    `max_attempts` times with full-jitter exponential backoff, but only while
+    the next attempt could still start before the deadline. A stream is only
+    retried before its first chunk; after that the deadline no longer applies
+    and errors propagate, since the caller has already seen partial output.
+    Only transient failures (see `is_transient`) count towards the breaker.
+    """
+
+    def __init__(
+        self,
+        inner: LLMClient,
+        breaker: CircuitBreaker,
+        deadline_s: float = 60.0,
+        max_attempts: int = 3,
+        base_delay_ms: float = 250.0,
+        max_delay_ms: float = 4000.0,
+    ):
+        self.inner = inner
+        self._breaker = breaker
+        self._deadline_s = deadline_s
+        self._max_attempts = max_attempts
+        self._base_delay_s = base_delay_ms / 1000
+        self._max_delay_s = max_delay_ms / 1000
+
+    async def init(self) -> None:
+        await self.inner.init()
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+    def _deadline(self) -> float:
+        """The current request's deadline, or a fresh one for a call outside a request."""
+        shared = _request_deadline.get()
+        return shared if shared is not None else _now() + self._deadline_s
+
+    def _backoff(self, attempt: int, deadline: float, exc: BaseException) -> float | None:
+        """Seconds to sleep before retrying after failed `attempt`, or None to give up."""
+        if attempt >= self._max_attempts or not is_transient(exc):
+            return None
+        delay = random.uniform(0, min(self._max_delay_s, self._base_delay_s * 2 ** (attempt - 1)))
+        if _now() + delay >= deadline:
+            return None
+        logger.warning(
+            f"[retry] {self._breaker.name} attempt {attempt} failed ({type(exc).__name__}), "
+            f"retrying in {delay * 1000:.0f}ms"
+        )
+        return delay
+
+    async def _attempt(self, fn, deadline: float):
+        """Run one call under the circuit breaker, bounded by the remaining deadline."""
+        self._breaker.before_call()
+        try:
+            async with asyncio.timeout_at(deadline) as timeout:
+                return await fn()
+        except TimeoutError as exc:
+            self._breaker.record_failure(exc)
+            if timeout.expired():
+                raise DeadlineExceeded(self._breaker.name, self._deadline_s) from exc
+            raise
+        except BaseException as exc:
+            if is_transient(exc):
+                self._breaker.record_failure(exc)
+            else:
+                self._breaker.release()
+            raise
+
+    async def get_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> LLMResult:
+        deadline = self._deadline()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = await self._attempt(
+                    lambda: self.inner.get_response(message, history, system_context), deadline
+                )
+            except DeadlineExceeded:
+                raise
+            except Exception as exc:
+                delay = self._backoff(attempt, deadline, exc)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self._breaker.record_success()
+            return result
+
+    async def stream_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> AsyncIterator[str | LLMResult]:
+        deadline = self._deadline()
+        attempt = 0
+        while True:
+            attempt += 1
+            stream = self.inner.stream_response(message, history, system_context)
+            try:
+                first = await self._attempt(lambda: anext(stream, None), deadline)
+            except DeadlineExceeded:
+                await stream.aclose()
+                raise
+            except Exception as exc:
+                await stream.aclose()
+                delay = self._backoff(attempt, deadline, exc)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            break
+
+        # A first chunk shows the provider is up, even if the stream fails later
+        self._breaker.record_success()
+        try:
+            if first is not None:
+                yield first
+                async for chunk in stream:
+                    yield chunk
+        except Exception as exc:
+            if is_transient(exc):
+                self._breaker.record_failure(exc)
+            raise
+        finally:
+            await stream.aclose()
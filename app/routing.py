@@ -0,0 +1,180 @@
+import asyncio
+import dataclasses
+import logging
+import time
+from collections.abc import AsyncIterator, Callable
+
+from app.protocols import LLMClient, LLMResult
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class _Leg:
+    """One provider's attempt within a hedged call."""
+
+    provider: str
+    model: str
+    started_at: float
+    finished_at: float | None = None
+
+    def latency_ms(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return (end - self.started_at) * 1000
+
+
+class HedgedLLMClient:
+    """Routes calls to a primary client, hedging to a secondary one when it is slow.
+
+    If the primary hasn't answered (or, when streaming, produced its first
+    chunk) within `hedge_after_ms`, the same request is sent to the secondary
+    and whichever succeeds first wins; the other is cancelled. A primary that
+    fails before the threshold triggers the secondary immediately. Results are
+    stamped with the winning provider/model and, when a hedge was sent, with
+    the loser and how long it ran before failing or being cancelled.
+    """
+
+    def __init__(
+        self,
+        primary: LLMClient,
+        primary_provider: str,
+        primary_model: str,
+        secondary: LLMClient,
+        secondary_provider: str,
+        secondary_model: str,
+        hedge_after_ms: float = 2000.0,
+    ):
+        self.primary = primary
+        self.secondary = secondary
+        self._primary_name = (primary_provider, primary_model)
+        self._secondary_name = (secondary_provider, secondary_model)
+        self._hedge_after = hedge_after_ms / 1000
+
+    async def init(self) -> None:
+        await self.primary.init()
+        await self.secondary.init()
+
+    async def close(self) -> None:
+        await self.primary.close()
+        await self.secondary.close()
+
+    @staticmethod
+    def _launch(name: tuple[str, str], coro) -> tuple[asyncio.Future, _Leg]:
+        leg = _Leg(provider=name[0], model=name[1], started_at=time.perf_counter())
+        fut = asyncio.ensure_future(coro)
+        fut.add_done_callback(lambda _: setattr(leg, "finished_at", time.perf_counter()))
+        return fut, leg
+
+    async def _race(
+        self,
+        first: tuple[asyncio.Future, _Leg],
+        start_second: Callable[[], tuple[asyncio.Future, _Leg]],
+    ) -> tuple[asyncio.Future, _Leg, _Leg | None]:
+        """Wait for `first`, starting the hedge via `start_second()` if it is slow or fails.
+
+        Returns (winning_future, winning_leg, losing_leg_or_None). Every other
+        future is cancelled on the way out. Raises the primary's error if both
+        legs fail.
+        """
+        legs = dict([first])
+        winner: asyncio.Future | None = None
+        try:
+            done, _ = await asyncio.wait(legs, timeout=self._hedge_after)
+            if done and first[0].exception() is None:
+                winner = first[0]
+                return winner, first[1], None
+
+            if done:
+                logger.warning(
+                    f"[hedge] {first[1].provider} failed, hedging: {first[0].exception()!r}"
+                )
+            else:
+                logger.info(
+                    f"[hedge] {first[1].provider} slower than "
+                    f"{self._hedge_after * 1000:.0f}ms, hedging"
+                )
+            second = start_second()
+            legs[second[0]] = second[1]
+
+            pending = {f for f in legs if not f.done()}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    if fut.exception() is None:
+                        winner = fut
+                        loser = next(f for f in legs if f is not fut)
+                        # Stop the loser's clock now rather than when its cancellation lands
+                        legs[loser].finished_at = legs[loser].finished_at or time.perf_counter()
+                        return fut, legs[fut], legs[loser]
+            raise first[0].exception()
+        finally:
+            for fut in legs:
+                if fut is not winner and not fut.done():
+                    fut.cancel()
+
+    @staticmethod
+    def _stamp(result: LLMResult, winner: _Leg, loser: _Leg | None) -> LLMResult:
+        return dataclasses.replace(
+            result,
+            provider=winner.provider,
+            model=winner.model,
+            hedge_loser_provider=loser.provider if loser else None,
+            hedge_loser_latency_ms=loser.latency_ms() if loser else None,
+        )
+
+    async def get_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> LLMResult:
+        fut, winner, loser = await self._race(
+            self._launch(
+                self._primary_name,
+                self.primary.get_response(message, history, system_context),
+            ),
+            lambda: self._launch(
+                self._secondary_name,
+                self.secondary.get_response(message, history, system_context),
+            ),
+        )
+        return self._stamp(fut.result(), winner, loser)
+
+    async def stream_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> AsyncIterator[str | LLMResult]:
+        streams: dict[asyncio.Future, AsyncIterator[str | LLMResult]] = {}
+
+        def start(client: LLMClient, name: tuple[str, str]) -> tuple[asyncio.Future, _Leg]:
+            stream = client.stream_response(message, history, system_context)
+            # The race is decided by whichever stream yields its first chunk first
+            fut, leg = self._launch(name, anext(stream))
+            streams[fut] = stream
+            return fut, leg
+
+        async def discard(keep: asyncio.Future | None) -> None:
+            for fut, stream in streams.items():
+                if fut is keep:
+                    continue
+                # Let the cancelled first-chunk read unwind before closing its generator
+                await asyncio.gather(fut, return_exceptions=True)
+                await stream.aclose()
+
+        try:
+            fut, winner, loser = await self._race(
+                start(self.primary, self._primary_name),
+                lambda: start(self.secondary, self._secondary_name),
+            )
+        except BaseException:
+            await discard(None)
+            raise
+        await discard(fut)
+
+        stream = streams[fut]
+        chunk = fut.result()
+        try:
+            while True:
+                yield self._stamp(chunk, winner, loser) if isinstance(chunk, LLMResult) else chunk
+                try:
+                    chunk = await anext(stream)
+                except StopAsyncIteration:
+                    return
+        finally:
+            await stream.aclose()
@@ -1,15 +1,22 @@
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, Field
 
 
 class ChatRequest(BaseModel):
     message: str
+    # Retries carrying the same key (and message) get the stored response
+    idempotency_key: str | None = Field(default=None, max_length=255)
+    # Route this request to another registered client (see GET /admin/models)
+    provider: str | None = None
+    model: str | None = None
 
 
 class ChatResponse(BaseModel):
     id: str
     response: str
     timestamp: str
-    trace_id: str
+    trace_id: str | None = None  # None when the trace queue was full and it was dropped
 
 
 class HistoryMessage(BaseModel):
@@ -49,8 +56,17 @@ class Trace(BaseModel):
     raw_messages_in: list[TraceMessage]
     response_out: str
     latency_ms: float
+    ttft_ms: float | None
+    load_ms: float | None
+    prompt_eval_ms: float | None
+    eval_ms: float | None
     prompt_tokens: int | None
     completion_tokens: int | None
+    cache_read_tokens: int | None
+    cache_write_tokens: int | None
+    prompt_reused_tokens: int | None  # Estimated, from Ollama prefix reuse
+    hedge_loser_provider: str | None
+    hedge_loser_latency_ms: float | None
     rating_score: int | None
     rating_note: str | None
     session_id: str | None
@@ -110,6 +126,75 @@ class Session(BaseModel):
 
 class SessionsResponse(BaseModel):
     sessions: list[Session]
+    next_cursor: str | None = None  # Pass as `cursor` for the next page
+
+
+# --- Ollama ---
+
+
+class OllamaStatus(BaseModel):
+    model: str
+    resident: bool
+    size_bytes: int | None
+    size_vram_bytes: int | None
+    expires_at: str | None
+    keep_alive: str
+
+
+# --- Models ---
+
+
+class ModelInfo(BaseModel):
+    provider: str
+    model: str
+    default: bool
+
+
+class ModelsResponse(BaseModel):
+    models: list[ModelInfo]
+
+
+# --- Limits ---
+
+
+class LimiterStats(BaseModel):
+    provider: str
+    max_concurrent: int
+    max_queue: int
+    in_flight: int
+    queued: int
+    admitted: int
+    rejected: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class LimitsResponse(BaseModel):
+    limits: list[LimiterStats]
+
+
+# --- Circuits ---
+
+
+class CircuitTransition(BaseModel):
+    at: str
+    from_state: str
+    to_state: str
+    reason: str
+
+
+class CircuitStats(BaseModel):
+    provider: str
+    state: Literal["closed", "open", "half_open"]
+    consecutive_failures: int
+    failure_threshold: int
+    reset_after_s: float
+    rejected: int
+    transitions: list[CircuitTransition]
+
+
+class CircuitsResponse(BaseModel):
+    circuits: list[CircuitStats]
 
 
 # --- Admin Stats ---
@@ -124,10 +209,22 @@ class MessageStats(BaseModel):
     last_message_at: str | None
 
 
+class DailyMessageCount(BaseModel):
+    day: str  # YYYY-MM-DD, UTC
+    user_messages: int
+    assistant_messages: int
+    total_messages: int
+
+
+class DailyMessageStats(BaseModel):
+    days: list[DailyMessageCount]  # Oldest first, one entry per day
+
+
 class ProviderStats(BaseModel):
     calls: int
     avg_latency_ms: float
     avg_rating: float | None
+    avg_tokens_per_sec: float | None
 
 
 class PerformanceStats(BaseModel):
@@ -136,6 +233,8 @@ class PerformanceStats(BaseModel):
     avg_tokens_per_sec: float | None
     total_prompt_tokens: int
     total_completion_tokens: int
+    total_cache_read_tokens: int
+    total_cache_write_tokens: int
     avg_rating: float | None
     by_provider: dict[str, ProviderStats]
 
@@ -149,8 +248,13 @@ class AdminMessage(BaseModel):
     content: str
     timestamp: str
     session_id: str | None
+    source: Literal["active", "session", "archived"] = "active"
+    # Matching excerpt with hits wrapped in **, for full-text searches
+    snippet: str | None = None
 
 
 class AdminMessagesResponse(BaseModel):
     messages: list[AdminMessage]
     total: int
+    total_exact: bool = True  # False when total is a recently cached count
+    next_cursor: str | None = None  # Pass as `cursor` for the next page
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+
+from app.protocols import LLMClient, MessageStore
+
+logger = logging.getLogger(__name__)
+
+_SUMMARY_PROMPT = """You are updating the long-term memory notes for an ongoing conversation.
+
+Current notes:
+{summary}
+
+New messages since the notes were written:
+{transcript}
+
+Rewrite the notes so they also cover the new messages. Keep names, facts, \
+decisions, goals and open questions; drop small talk. Write plain prose in \
+the third person, at most {max_words} words. Reply with the notes only."""
+
+
+class Summarizer:
+    """Folds active messages that have aged out of the context window into a running summary.
+
+    Runs as a background task woken by `notify()` after each saved exchange, so
+    summarization never adds latency to a chat turn. Messages older than the
+    newest `keep_recent` are folded in batches of `batch_messages`; so are
+    messages older than the window the last turn actually sent, which the token
+    budget can cut shorter than `keep_recent`. The summary is stored by the
+    MessageStore and reset with the conversation.
+    """
+
+    def __init__(
+        self,
+        store: MessageStore,
+        llm: LLMClient,
+        keep_recent: int = 20,
+        batch_messages: int = 20,
+        max_summary_words: int = 250,
+    ):
+        self._store = store
+        self._llm = llm
+        self._keep_recent = keep_recent
+        self._batch_messages = batch_messages
+        self._max_summary_words = max_summary_words
+        self._window_start: str | None = None
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def notify(self, window_start: str | None = None) -> None:
+        """Signal that new messages were saved; a no-op unless started.
+
+        `window_start` is the timestamp of the oldest message the turn sent to
+        the model; anything older must be covered by the summary.
+        """
+        if self._task is not None:
+            self._window_start = window_start
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            try:
+                await self.compact(self._window_start)
+            except Exception:
+                logger.exception("[summary] Compaction failed")
+
+    async def compact(self, window_start: str | None = None) -> int:
+        """Fold every full batch of aged-out messages into the summary.
+
+        Messages older than `window_start` are folded without waiting for a
+        full batch, so none is left out of both the history and the summary.
+        Returns the number of messages folded.
+        """
+        folded = 0
+        while True:
+            summary = await self._store.get_summary()
+            after = summary["covered_until"] if summary else None
+            rows = await self._store.get_messages_after(
+                after, self._keep_recent + self._batch_messages
+            )
+            aged = rows[: max(len(rows) - self._keep_recent, 0)]
+            if len(aged) < self._batch_messages:
+                # Whatever the last turn no longer sent can't wait for a full batch;
+                # what it still sent stays out of the summary
+                aged = [r for r in rows if window_start and r["timestamp"] < window_start]
+                aged = aged[: self._batch_messages]
+                if not aged:
+                    return folded
+
+            start_time = time.perf_counter()
+            result = await self._llm.get_response(self._build_prompt(summary, aged))
+            if not await self._store.save_summary(result.text.strip(), aged[-1]["timestamp"]):
+                # The conversation was archived or moved to a session meanwhile
+                return folded
+            folded += len(aged)
+            logger.info(
+                f"[summary] Folded {len(aged)} msgs in "
+                f"{(time.perf_counter() - start_time) * 1000:.0f}ms"
+            )
+
+    def _build_prompt(self, summary: dict | None, messages: list[dict]) -> str:
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        return _SUMMARY_PROMPT.format(
+            summary=summary["content"] if summary else "(none yet)",
+            transcript=transcript,
+            max_words=self._max_summary_words,
+        )
@@ -0,0 +1,53 @@
+import math
+
+# Fixed per-message cost for role markers and turn separators in chat templates
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheaply estimate how many tokens `text` uses, without a tokenizer.
+
+    Takes the larger of ~4 characters per token and ~0.75 words per token,
+    which tracks BPE tokenizers closely enough for English prose and errs
+    high for code and non-Latin text.
+    """
+    if not text:
+        return 0
+    return math.ceil(max(len(text) / 4, len(text.split()) * 4 / 3))
+
+
+def estimate_message_tokens(content: str) -> int:
+    """Estimated prompt cost of one chat message, including template overhead."""
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def fit_token_budget(messages: list[dict], token_budget: int) -> list[dict]:
+    """Keep the newest messages whose `token_count`s fit within `token_budget`.
+
+    `messages` must be ordered newest first; the window stops at the first
+    message that would overflow, so the result is always a contiguous suffix
+    of the conversation.
+    """
+    selected = []
+    used = 0
+    for msg in messages:
+        used += msg["token_count"]
+        if used > token_budget:
+            break
+        selected.append(msg)
+    return selected
+
+
+def step_window(window: list[dict], total: int, step: int) -> list[dict]:
+    """Trim a newest-first `window` so its oldest message sits on a multiple of `step`.
+
+    `total` is the length of the conversation the window ends. As the
+    conversation grows the window's start then jumps `step` messages at a
+    time instead of moving every turn, so consecutive prompts share a long
+    prefix that providers can cache. Never trims more than half the window.
+    """
+    if step <= 1:
+        return window
+    start = total - len(window)
+    stepped = total - -(-start // step) * step
+    return window[:stepped] if stepped * 2 >= len(window) else window
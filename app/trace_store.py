@@ -30,7 +30,16 @@ class DuckDBTraceStore:
                 completion_tokens INTEGER,
                 rating_score INTEGER,
                 rating_note VARCHAR,
-                session_id VARCHAR
+                session_id VARCHAR,
+                ttft_ms DOUBLE,
+                load_ms DOUBLE,
+                prompt_eval_ms DOUBLE,
+                eval_ms DOUBLE,
+                cache_read_tokens INTEGER,
+                cache_write_tokens INTEGER,
+                hedge_loser_provider VARCHAR,
+                hedge_loser_latency_ms DOUBLE,
+                prompt_reused_tokens INTEGER
             )
         """)
         self._conn.execute("""
@@ -42,11 +51,23 @@ class DuckDBTraceStore:
                 avg_latency_ms DOUBLE,
                 total_prompt_tokens BIGINT,
                 total_completion_tokens BIGINT,
+                total_generation_ms DOUBLE DEFAULT 0,
                 avg_tokens_per_sec DOUBLE,
                 avg_rating DOUBLE,
                 PRIMARY KEY (period_start, provider, model)
             )
         """)
+        rollup_cols = {
+            row[0]
+            for row in self._conn.execute(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_name = 'trace_rollups'"
+            ).fetchall()
+        }
+        if "total_generation_ms" not in rollup_cols:
+            self._conn.execute(
+                "ALTER TABLE trace_rollups ADD COLUMN total_generation_ms DOUBLE DEFAULT 0"
+            )
         # Migrate: if old schema has messages_in but not raw_messages_in, rename it
         cols = {
             row[0]
@@ -66,6 +87,15 @@ class DuckDBTraceStore:
             ("rating_score", "INTEGER"),
             ("rating_note", "VARCHAR"),
             ("session_id", "VARCHAR"),
+            ("ttft_ms", "DOUBLE"),
+            ("load_ms", "DOUBLE"),
+            ("prompt_eval_ms", "DOUBLE"),
+            ("eval_ms", "DOUBLE"),
+            ("cache_read_tokens", "INTEGER"),
+            ("cache_write_tokens", "INTEGER"),
+            ("hedge_loser_provider", "VARCHAR"),
+            ("hedge_loser_latency_ms", "DOUBLE"),
+            ("prompt_reused_tokens", "INTEGER"),
         ]:
             if col not in cols:
                 self._conn.execute(f"ALTER TABLE traces ADD COLUMN {col} {typ}")
@@ -75,39 +105,58 @@ class DuckDBTraceStore:
             self._conn.close()
             self._conn = None
 
-    def _update_rollup(
-        self,
-        timestamp: datetime,
-        provider: str,
-        model: str,
-        latency_ms: float,
-        prompt_tokens: int | None,
-        completion_tokens: int | None,
-    ) -> None:
-        """Upsert hourly rollup row."""
-        assert self._conn is not None
-        # Truncate to hour
-        period_start = timestamp.replace(minute=0, second=0, microsecond=0)
-        self._conn.execute(
+    def _update_rollups(self, conn: duckdb.DuckDBPyConnection, traces: list[dict]) -> None:
+        """Upsert hourly rollup rows, one statement per (hour, provider, model) in the batch."""
+        groups: dict[tuple, dict] = {}
+        for t in traces:
+            # Truncate to hour
+            period_start = t["timestamp"].replace(minute=0, second=0, microsecond=0)
+            g = groups.setdefault(
+                (period_start, t["provider"], t["model"]),
+                {"calls": 0, "latency": 0.0, "prompt": 0, "completion": 0, "generation_ms": 0.0},
+            )
+            completion_tokens = t.get("completion_tokens")
+            g["calls"] += 1
+            g["latency"] += t["latency_ms"]
+            g["prompt"] += t.get("prompt_tokens") or 0
+            g["completion"] += completion_tokens or 0
+            # Throughput is measured over provider-reported generation time when
+            # available, otherwise over the end-to-end latency of the call
+            if completion_tokens:
+                g["generation_ms"] += t.get("eval_ms") or t["latency_ms"]
+
+        conn.executemany(
             """
             INSERT INTO trace_rollups (
                 period_start, provider, model, call_count,
                 avg_latency_ms, total_prompt_tokens, total_completion_tokens,
-                avg_tokens_per_sec, avg_rating
-            ) VALUES (?, ?, ?, 1, ?, ?, ?, NULL, NULL)
+                total_generation_ms, avg_tokens_per_sec, avg_rating
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)
             ON CONFLICT (period_start, provider, model) DO UPDATE SET
-                call_count = trace_rollups.call_count + 1,
-                avg_latency_ms = (trace_rollups.avg_latency_ms * trace_rollups.call_count + excluded.avg_latency_ms) / (trace_rollups.call_count + 1),
+                call_count = trace_rollups.call_count + excluded.call_count,
+                avg_latency_ms = (trace_rollups.avg_latency_ms * trace_rollups.call_count + excluded.avg_latency_ms * excluded.call_count) / (trace_rollups.call_count + excluded.call_count),
                 total_prompt_tokens = trace_rollups.total_prompt_tokens + excluded.total_prompt_tokens,
-                total_completion_tokens = trace_rollups.total_completion_tokens + excluded.total_completion_tokens
+                total_completion_tokens = trace_rollups.total_completion_tokens + excluded.total_completion_tokens,
+                total_generation_ms = coalesce(trace_rollups.total_generation_ms, 0) + excluded.total_generation_ms,
+                avg_tokens_per_sec = CASE
+                    WHEN coalesce(trace_rollups.total_generation_ms, 0) + excluded.total_generation_ms > 0
+                    THEN (trace_rollups.total_completion_tokens + excluded.total_completion_tokens)
+                        / ((coalesce(trace_rollups.total_generation_ms, 0) + excluded.total_generation_ms) / 1000.0)
+                END
             """,
             [
-                period_start,
-                provider,
-                model,
-                latency_ms,
-                prompt_tokens or 0,
-                completion_tokens or 0,
+                [
+                    period_start,
+                    provider,
+                    model,
+                    g["calls"],
+                    g["latency"] / g["calls"],
+                    g["prompt"],
+                    g["completion"],
+                    g["generation_ms"],
+                    g["completion"] / (g["generation_ms"] / 1000) if g["generation_ms"] else None,
+                ]
+                for (period_start, provider, model), g in groups.items()
             ],
         )
 
@@ -124,44 +173,105 @@ class DuckDBTraceStore:
         context_messages: list[dict] | None = None,
         trigger_message: dict | None = None,
         session_id: str | None = None,
+        ttft_ms: float | None = None,
+        load_ms: float | None = None,
+        prompt_eval_ms: float | None = None,
+        eval_ms: float | None = None,
+        cache_read_tokens: int | None = None,
+        cache_write_tokens: int | None = None,
+        prompt_reused_tokens: int | None = None,
+        hedge_loser_provider: str | None = None,
+        hedge_loser_latency_ms: float | None = None,
     ) -> str:
-        if not self._conn:
-            raise RuntimeError("TraceStore not initialized")
-
         trace_id = uuid4().hex
-        timestamp = datetime.now(timezone.utc)
+        self.save_traces([
+            {
+                "id": trace_id,
+                "timestamp": datetime.now(timezone.utc),
+                "provider": provider,
+                "model": model,
+                "messages_in": messages_in,
+                "response_out": response_out,
+                "latency_ms": latency_ms,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "system_prompt": system_prompt,
+                "context_messages": context_messages,
+                "trigger_message": trigger_message,
+                "session_id": session_id,
+                "ttft_ms": ttft_ms,
+                "load_ms": load_ms,
+                "prompt_eval_ms": prompt_eval_ms,
+                "eval_ms": eval_ms,
+                "cache_read_tokens": cache_read_tokens,
+                "cache_write_tokens": cache_write_tokens,
+                "prompt_reused_tokens": prompt_reused_tokens,
+                "hedge_loser_provider": hedge_loser_provider,
+                "hedge_loser_latency_ms": hedge_loser_latency_ms,
+            }
+        ])
+        return trace_id
 
-        self._conn.execute(
-            """
-            INSERT INTO traces (
-                id, timestamp, provider, model, system_prompt,
-                context_messages, trigger_message, raw_messages_in,
-                response_out, latency_ms, prompt_tokens, completion_tokens,
-                session_id
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            [
-                trace_id,
-                timestamp,
-                provider,
-                model,
-                system_prompt,
-                json.dumps(context_messages) if context_messages else None,
-                json.dumps(trigger_message) if trigger_message else None,
-                json.dumps(messages_in),
-                response_out,
-                latency_ms,
-                prompt_tokens,
-                completion_tokens,
-                session_id,
-            ],
-        )
+    def save_traces(self, traces: list[dict]) -> None:
+        """Insert a batch of traces and update rollups in a single transaction.
 
-        self._update_rollup(
-            timestamp, provider, model, latency_ms, prompt_tokens, completion_tokens
-        )
+        Each dict carries the save_trace fields plus a pre-assigned `id` and
+        `timestamp`. Safe to call from a worker thread: it uses its own cursor.
+        """
+        if not self._conn:
+            raise RuntimeError("TraceStore not initialized")
+        if not traces:
+            return
 
-        return trace_id
+        conn = self._conn.cursor()
+        try:
+            conn.execute("BEGIN TRANSACTION")
+            conn.executemany(
+                """
+                INSERT INTO traces (
+                    id, timestamp, provider, model, system_prompt,
+                    context_messages, trigger_message, raw_messages_in,
+                    response_out, latency_ms, prompt_tokens, completion_tokens,
+                    session_id, ttft_ms, load_ms, prompt_eval_ms, eval_ms,
+                    cache_read_tokens, cache_write_tokens,
+                    hedge_loser_provider, hedge_loser_latency_ms, prompt_reused_tokens
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    [
+                        t["id"],
+                        t["timestamp"],
+                        t["provider"],
+                        t["model"],
+                        t.get("system_prompt"),
+                        json.dumps(t["context_messages"]) if t.get("context_messages") else None,
+                        json.dumps(t["trigger_message"]) if t.get("trigger_message") else None,
+                        json.dumps(t["messages_in"]),
+                        t["response_out"],
+                        t["latency_ms"],
+                        t.get("prompt_tokens"),
+                        t.get("completion_tokens"),
+                        t.get("session_id"),
+                        t.get("ttft_ms"),
+                        t.get("load_ms"),
+                        t.get("prompt_eval_ms"),
+                        t.get("eval_ms"),
+                        t.get("cache_read_tokens"),
+                        t.get("cache_write_tokens"),
+                        t.get("hedge_loser_provider"),
+                        t.get("hedge_loser_latency_ms"),
+                        t.get("prompt_reused_tokens"),
+                    ]
+                    for t in traces
+                ],
+            )
+            self._update_rollups(conn, traces)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
 
     def get_traces(
         self, limit: int = 50, offset: int = 0, session_id: str | None = None
@@ -176,7 +286,9 @@ class DuckDBTraceStore:
                     id, timestamp, provider, model, system_prompt,
                     context_messages, trigger_message, raw_messages_in,
                     response_out, latency_ms, prompt_tokens, completion_tokens,
-                    rating_score, rating_note, session_id
+                    rating_score, rating_note, session_id, ttft_ms, load_ms,
+                    prompt_eval_ms, eval_ms, cache_read_tokens, cache_write_tokens,
+                    hedge_loser_provider, hedge_loser_latency_ms, prompt_reused_tokens
                 FROM traces
                 WHERE session_id = ?
                 ORDER BY timestamp DESC
@@ -191,7 +303,9 @@ class DuckDBTraceStore:
                     id, timestamp, provider, model, system_prompt,
                     context_messages, trigger_message, raw_messages_in,
                     response_out, latency_ms, prompt_tokens, completion_tokens,
-                    rating_score, rating_note, session_id
+                    rating_score, rating_note, session_id, ttft_ms, load_ms,
+                    prompt_eval_ms, eval_ms, cache_read_tokens, cache_write_tokens,
+                    hedge_loser_provider, hedge_loser_latency_ms, prompt_reused_tokens
                 FROM traces
                 ORDER BY timestamp DESC
                 LIMIT ? OFFSET ?
@@ -216,6 +330,15 @@ class DuckDBTraceStore:
                 "rating_score": row[12],
                 "rating_note": row[13],
                 "session_id": row[14],
+                "ttft_ms": row[15],
+                "load_ms": row[16],
+                "prompt_eval_ms": row[17],
+                "eval_ms": row[18],
+                "cache_read_tokens": row[19],
+                "cache_write_tokens": row[20],
+                "hedge_loser_provider": row[21],
+                "hedge_loser_latency_ms": row[22],
+                "prompt_reused_tokens": row[23],
             }
             for row in result
         ]
@@ -249,7 +372,9 @@ class DuckDBTraceStore:
                 avg(latency_ms) as avg_latency,
                 sum(prompt_tokens) as total_prompt,
                 sum(completion_tokens) as total_completion,
-                avg(rating_score) as avg_rating
+                avg(rating_score) as avg_rating,
+                sum(cache_read_tokens) as total_cache_read,
+                sum(cache_write_tokens) as total_cache_write
             FROM traces
         """).fetchone()
 
@@ -258,25 +383,30 @@ class DuckDBTraceStore:
         total_prompt = int(row[2]) if row and row[2] else 0
         total_completion = int(row[3]) if row and row[3] else 0
         avg_rating = round(row[4], 2) if row and row[4] else None
+        total_cache_read = int(row[5]) if row and row[5] else 0
+        total_cache_write = int(row[6]) if row and row[6] else 0
 
-        # Compute avg tokens/sec where we have token + latency data
-        tps_row = self._conn.execute("""
-            SELECT avg(
-                CASE WHEN latency_ms > 0 AND completion_tokens IS NOT NULL
-                THEN completion_tokens / (latency_ms / 1000.0)
+        # Compute avg tokens/sec where we have token data, preferring the
+        # provider-reported generation time over end-to-end latency
+        tps_expr = """
+            avg(
+                CASE WHEN completion_tokens IS NOT NULL
+                    AND coalesce(nullif(eval_ms, 0), latency_ms) > 0
+                THEN completion_tokens / (coalesce(nullif(eval_ms, 0), latency_ms) / 1000.0)
                 END
             )
-            FROM traces
-        """).fetchone()
+        """
+        tps_row = self._conn.execute(f"SELECT {tps_expr} FROM traces").fetchone()
         avg_tps = round(tps_row[0], 2) if tps_row and tps_row[0] else None
 
         # Per-provider breakdown
-        provider_rows = self._conn.execute("""
+        provider_rows = self._conn.execute(f"""
             SELECT
                 provider,
                 count(*) as calls,
                 avg(latency_ms) as avg_latency,
-                avg(rating_score) as avg_rating
+                avg(rating_score) as avg_rating,
+                {tps_expr} as avg_tps
             FROM traces
             GROUP BY provider
         """).fetchall()
@@ -287,6 +417,7 @@ class DuckDBTraceStore:
                 "calls": pr[1],
                 "avg_latency_ms": round(pr[2], 2) if pr[2] else 0.0,
                 "avg_rating": round(pr[3], 2) if pr[3] else None,
+                "avg_tokens_per_sec": round(pr[4], 2) if pr[4] else None,
             }
 
         return {
@@ -295,6 +426,8 @@ class DuckDBTraceStore:
             "avg_tokens_per_sec": avg_tps,
             "total_prompt_tokens": total_prompt,
             "total_completion_tokens": total_completion,
+            "total_cache_read_tokens": total_cache_read,
+            "total_cache_write_tokens": total_cache_write,
             "avg_rating": avg_rating,
             "by_provider": by_provider,
         }
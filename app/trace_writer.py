@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from app.protocols import TraceStore
+
+logger = logging.getLogger(__name__)
+
+# Queue marker telling the drain loop to flush what it has and exit
+_STOP = object()
+
+
+class BatchingTraceWriter:
+    """Buffers traces in a bounded queue and persists them in batches off the event loop.
+
+    A background task drains the queue, handing everything that accumulated
+    while the previous batch was being written to `TraceStore.save_traces` in a
+    worker thread. When the queue is full new traces are dropped (and counted)
+    rather than blocking the chat response. Before `start()` or after `stop()`
+    traces are written through synchronously.
+    """
+
+    def __init__(self, store: TraceStore, max_queue: int = 1000, batch_size: int = 100):
+        self._store = store
+        self._batch_size = batch_size
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: asyncio.Task | None = None
+        self.dropped = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush every pending trace, then stop the background task."""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    def submit(self, **fields) -> str | None:
+        """Queue a trace (same fields as `TraceStore.save_trace`) and return its id.
+
+        Returns None when the queue is full and the trace is dropped.
+        """
+        trace = {"id": uuid4().hex, "timestamp": datetime.now(timezone.utc), **fields}
+        if self._task is None:
+            self._store.save_traces([trace])
+            return trace["id"]
+        try:
+            self._queue.put_nowait(trace)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"[traces] Queue full, dropped trace {trace['id']} ({self.dropped} total)")
+            return None
+        return trace["id"]
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self._batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            stopping = any(t is _STOP for t in batch)
+            await self._write([t for t in batch if t is not _STOP])
+            if stopping:
+                # Anything submitted after stop() was requested is flushed too
+                remaining = []
+                while not self._queue.empty():
+                    remaining.append(self._queue.get_nowait())
+                await self._write(remaining)
+                return
+
+    async def _write(self, batch: list[dict]) -> None:
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self._store.save_traces, batch)
+        except Exception:
+            logger.exception(f"[traces] Failed to write batch of {len(batch)} traces")
@@ -1,11 +1,71 @@
+import asyncio
+from collections.abc import AsyncIterator
 from datetime import datetime, timezone
 from uuid import uuid4
 
+import aiosqlite
 import pytest
 from httpx import ASGITransport, AsyncClient
 
-from app.dependencies import set_llm_client, set_message_store, set_trace_store
+from app.coalescing import SingleFlight
+from app.config import settings
+from app.cursors import decode_cursor, encode_cursor
+from app.dependencies import (
+    set_breakers,
+    set_chat_flights,
+    set_limiters,
+    set_llm_client,
+    set_llm_registry,
+    set_memory_index,
+    set_message_store,
+    set_summarizer,
+    set_trace_store,
+    set_trace_writer,
+)
+from app.embeddings import HashingEmbedder
 from app.main import app
+from app.memory_index import VectorMemoryIndex
+from app.protocols import LLMResult
+from app.registry import LLMRegistry
+from app.summarizer import Summarizer
+from app.tokens import estimate_message_tokens, estimate_tokens, fit_token_budget, step_window
+from app.trace_writer import BatchingTraceWriter
+
+# The message schema as first shipped, before any of SqliteMessageStore's migrations
+LEGACY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS messages (
+        id TEXT PRIMARY KEY,
+        role TEXT NOT NULL CHECK(role IN ('user', 'assistant')),
+        content TEXT NOT NULL,
+        timestamp TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp DESC);
+    CREATE TABLE IF NOT EXISTS archived_messages (
+        id TEXT PRIMARY KEY,
+        role TEXT NOT NULL CHECK(role IN ('user', 'assistant')),
+        content TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        archived_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        started_at TEXT NOT NULL,
+        ended_at TEXT,
+        note TEXT,
+        provider TEXT NOT NULL,
+        model TEXT NOT NULL,
+        context_messages INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS session_history (
+        id TEXT PRIMARY KEY,
+        session_id TEXT NOT NULL,
+        role TEXT NOT NULL CHECK(role IN ('user', 'assistant')),
+        content TEXT NOT NULL,
+        timestamp TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_session_history_session
+    ON session_history(session_id, timestamp DESC);
+"""
 
 
 class FakeMessageStore:
@@ -15,6 +75,7 @@ class FakeMessageStore:
         self.sessions: list[dict] = []
         self.session_history: list[dict] = []
         self._active_session_id: str | None = None
+        self.summary: dict | None = None
 
     async def init(self) -> None:
         pass
@@ -31,29 +92,85 @@ class FakeMessageStore:
                 "role": role,
                 "content": content,
                 "timestamp": timestamp,
+                "token_count": estimate_message_tokens(content),
             }
         )
         return msg_id, timestamp
 
+    async def save_exchange(
+        self, user_content: str, assistant_content: str
+    ) -> tuple[tuple[str, str], tuple[str, str]]:
+        user = await self.save_message("user", user_content)
+        assistant = await self.save_message("assistant", assistant_content)
+        return user, assistant
+
     async def get_history(
-        self, limit: int, before: str | None
+        self,
+        limit: int,
+        before: tuple[str, str] | None = None,
+        session_id: str | None = None,
     ) -> list[dict]:
+        source = self.messages
+        if session_id is not None and session_id != self._active_session_id:
+            source = [m for m in self.session_history if m["session_id"] == session_id]
         # Sort newest first
         sorted_msgs = sorted(
-            self.messages, key=lambda m: m["timestamp"], reverse=True
+            source, key=lambda m: (m["timestamp"], m["id"]), reverse=True
         )
         if before:
             sorted_msgs = [
-                m for m in sorted_msgs if m["timestamp"] < before
+                m for m in sorted_msgs if (m["timestamp"], m["id"]) < before
             ]
         return sorted_msgs[:limit]
 
+    async def get_context(
+        self, token_budget: int, max_messages: int, step: int = 1
+    ) -> list[dict]:
+        newest = await self.get_history(max_messages, before=None)
+        return step_window(fit_token_budget(newest, token_budget), len(self.messages), step)
+
+    async def get_messages_after(self, after: str | None, limit: int) -> list[dict]:
+        oldest = sorted(self.messages, key=lambda m: m["timestamp"])
+        return [m for m in oldest if m["timestamp"] > (after or "")][:limit]
+
+    async def get_all_messages_after(self, after: str | None, limit: int) -> list[dict]:
+        everything = sorted(
+            self.messages + self.archived + self.session_history, key=lambda m: m["timestamp"]
+        )
+        return [
+            {k: m[k] for k in ("id", "role", "content", "timestamp")}
+            for m in everything
+            if m["timestamp"] > (after or "")
+        ][:limit]
+
+    async def get_messages_by_ids(self, ids: list[str]) -> list[dict]:
+        wanted = set(ids)
+        return [
+            {k: m[k] for k in ("id", "role", "content", "timestamp")}
+            for m in self.messages + self.archived + self.session_history
+            if m["id"] in wanted
+        ]
+
+    async def get_summary(self) -> dict | None:
+        return dict(self.summary) if self.summary else None
+
+    async def save_summary(self, content: str, covered_until: str) -> bool:
+        if not any(m["timestamp"] == covered_until for m in self.messages):
+            return False
+        self.summary = {
+            "content": content,
+            "covered_until": covered_until,
+            "token_count": estimate_tokens(content),
+        }
+        return True
+
     async def archive_messages(self) -> tuple[int, str]:
         count = len(self.messages)
         archived_at = datetime.now(timezone.utc).isoformat()
         for msg in self.messages:
             self.archived.append({**msg, "archived_at": archived_at})
         self.messages.clear()
+        self.summary = None
         return count, archived_at
 
     async def create_session(
@@ -76,6 +193,7 @@ class FakeMessageStore:
                         {**msg, "session_id": prev["id"]}
                     )
                 self.messages.clear()
+                self.summary = None
                 ended_session = {
                     "id": prev["id"],
                     "message_count": msg_count,
@@ -104,9 +222,14 @@ class FakeMessageStore:
             },
         }
 
-    async def get_sessions(self) -> list[dict]:
+    async def get_sessions(self, limit: int, cursor: str | None = None) -> dict:
+        ordered = sorted(self.sessions, key=lambda x: (x["started_at"], x["id"]), reverse=True)
+        if cursor:
+            key = tuple(decode_cursor(cursor, str, str))
+            ordered = [s for s in ordered if (s["started_at"], s["id"]) < key]
+        page = ordered[:limit]
         result = []
-        for s in sorted(self.sessions, key=lambda x: x["started_at"], reverse=True):
+        for s in page:
             is_active = s["ended_at"] is None
             if is_active:
                 msg_count = len(self.messages)
@@ -127,7 +250,10 @@ class FakeMessageStore:
                 "message_count": msg_count,
                 "is_active": is_active,
             })
-        return result
+        next_cursor = None
+        if len(ordered) > limit:
+            next_cursor = encode_cursor(page[-1]["started_at"], page[-1]["id"])
+        return {"sessions": result, "next_cursor": next_cursor}
 
     async def get_active_session_id(self) -> str | None:
         return self._active_session_id
@@ -135,24 +261,43 @@ class FakeMessageStore:
     async def search_messages(
         self,
         limit: int,
-        offset: int,
+        offset: int = 0,
         role: str | None = None,
         query: str | None = None,
-    ) -> tuple[list[dict], int]:
-        # Combine active + session history
-        all_msgs = [
-            {**m, "session_id": None} for m in self.messages
-        ] + [
-            {"id": sh["id"], "role": sh["role"], "content": sh["content"], "timestamp": sh["timestamp"], "session_id": sh["session_id"]}
-            for sh in self.session_history
-        ]
+        sort: str = "recent",
+        cursor: str | None = None,
+        exact_total: bool = False,
+    ) -> dict:
+        # Combine active, session history and archived messages
+        all_msgs = (
+            [{**m, "session_id": None, "source": "active"} for m in self.messages]
+            + [
+                {"id": sh["id"], "role": sh["role"], "content": sh["content"], "timestamp": sh["timestamp"], "session_id": sh["session_id"], "source": "session"}
+                for sh in self.session_history
+            ]
+            + [
+                {"id": a["id"], "role": a["role"], "content": a["content"], "timestamp": a["timestamp"], "session_id": None, "source": "archived"}
+                for a in self.archived
+            ]
+        )
         if role:
             all_msgs = [m for m in all_msgs if m["role"] == role]
         if query:
             all_msgs = [m for m in all_msgs if query.lower() in m["content"].lower()]
-        all_msgs.sort(key=lambda m: m["timestamp"], reverse=True)
+        all_msgs.sort(key=lambda m: (m["timestamp"], m["id"]), reverse=True)
         total = len(all_msgs)
-        return all_msgs[offset : offset + limit], total
+        if cursor:
+            after = tuple(decode_cursor(cursor, str, str))
+            all_msgs = [m for m in all_msgs if (m["timestamp"], m["id"]) < after]
+            offset = 0
+        page = all_msgs[offset : offset + limit]
+        has_more = len(all_msgs) > offset + limit
+        return {
+            "messages": page,
+            "total": total,
+            "total_exact": True,
+            "next_cursor": encode_cursor(page[-1]["timestamp"], page[-1]["id"]) if has_more else None,
+        }
 
     async def get_message_stats(self) -> dict:
         all_msgs = list(self.messages) + [
@@ -163,33 +308,74 @@ class FakeMessageStore:
         user_count = len([m for m in all_msgs if m["role"] == "user"])
         assistant_count = len([m for m in all_msgs if m["role"] == "assistant"])
         timestamps = [m["timestamp"] for m in all_msgs]
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
         return {
             "total_messages": total,
             "user_messages": user_count,
             "assistant_messages": assistant_count,
-            "messages_today": len(self.messages),
+            "messages_today": len([t for t in timestamps if t[:10] == today]),
             "first_message_at": min(timestamps) if timestamps else None,
             "last_message_at": max(timestamps) if timestamps else None,
         }
 
+    async def get_daily_message_counts(self, since: str) -> list[dict]:
+        days: dict[str, dict] = {}
+        for m in self.messages + self.session_history:
+            day = m["timestamp"][:10]
+            if day >= since:
+                c = days.setdefault(day, {"day": day, "user_messages": 0, "assistant_messages": 0})
+                c[f"{m['role']}_messages"] += 1
+        return [days[d] for d in sorted(days)]
+
 
 class FakeLLMClient:
     def __init__(self, canned_response: str = "I am Future Asif."):
         self.canned_response = canned_response
         self.last_message: str | None = None
         self.last_history: list[dict] | None = None
+        self.last_system_context: str | None = None
+        self.calls = 0
+        self.delay = 0.0  # Seconds each call takes, for concurrency tests
+
+    async def init(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def _result(self, message: str) -> LLMResult:
+        return LLMResult(
+            text=self.canned_response,
+            prompt_tokens=len(message.split()),
+            completion_tokens=len(self.canned_response.split()),
+        )
 
     async def get_response(
-        self, message: str, history: list[dict] | None = None
-    ) -> str:
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> LLMResult:
+        self.last_message = message
+        self.last_history = history
+        self.last_system_context = system_context
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self._result(message)
+
+    async def stream_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> AsyncIterator[str | LLMResult]:
         self.last_message = message
         self.last_history = history
-        return self.canned_response
+        self.last_system_context = system_context
+        self.calls += 1
+        for word in self.canned_response.split(" "):
+            yield word + " "
+        yield self._result(message)
 
 
 class FakeTraceStore:
     def __init__(self):
         self.traces: list[dict] = []
+        self.batches: list[int] = []
 
     def init(self) -> None:
         pass
@@ -210,28 +396,70 @@ class FakeTraceStore:
         context_messages: list[dict] | None = None,
         trigger_message: dict | None = None,
         session_id: str | None = None,
+        ttft_ms: float | None = None,
+        load_ms: float | None = None,
+        prompt_eval_ms: float | None = None,
+        eval_ms: float | None = None,
+        cache_read_tokens: int | None = None,
+        cache_write_tokens: int | None = None,
+        prompt_reused_tokens: int | None = None,
+        hedge_loser_provider: str | None = None,
+        hedge_loser_latency_ms: float | None = None,
     ) -> str:
         trace_id = uuid4().hex
-        timestamp = datetime.now(timezone.utc).isoformat()
-        self.traces.append({
+        self.save_traces([{
             "id": trace_id,
-            "timestamp": timestamp,
+            "timestamp": datetime.now(timezone.utc),
             "provider": provider,
             "model": model,
             "system_prompt": system_prompt,
             "context_messages": context_messages,
             "trigger_message": trigger_message,
-            "raw_messages_in": messages_in,
+            "messages_in": messages_in,
             "response_out": response_out,
             "latency_ms": latency_ms,
+            "ttft_ms": ttft_ms,
+            "load_ms": load_ms,
+            "prompt_eval_ms": prompt_eval_ms,
+            "eval_ms": eval_ms,
+            "cache_read_tokens": cache_read_tokens,
+            "cache_write_tokens": cache_write_tokens,
+            "prompt_reused_tokens": prompt_reused_tokens,
+            "hedge_loser_provider": hedge_loser_provider,
+            "hedge_loser_latency_ms": hedge_loser_latency_ms,
             "prompt_tokens": prompt_tokens,
             "completion_tokens": completion_tokens,
-            "rating_score": None,
-            "rating_note": None,
             "session_id": session_id,
-        })
+        }])
         return trace_id
 
+    def save_traces(self, traces: list[dict]) -> None:
+        self.batches.append(len(traces))
+        for t in traces:
+            fields = {k: v for k, v in t.items() if k != "messages_in"}
+            self.traces.append({
+                "system_prompt": None,
+                "context_messages": None,
+                "trigger_message": None,
+                "ttft_ms": None,
+                "load_ms": None,
+                "prompt_eval_ms": None,
+                "eval_ms": None,
+                "cache_read_tokens": None,
+                "cache_write_tokens": None,
+                "prompt_reused_tokens": None,
+                "hedge_loser_provider": None,
+                "hedge_loser_latency_ms": None,
+                "prompt_tokens": None,
+                "completion_tokens": None,
+                "session_id": None,
+                **fields,
+                "timestamp": t["timestamp"].isoformat(),
+                "raw_messages_in": t["messages_in"],
+                "rating_score": None,
+                "rating_note": None,
+            })
+
     def get_traces(
         self, limit: int = 50, offset: int = 0, session_id: str | None = None
     ) -> list[dict]:
@@ -259,6 +487,8 @@ class FakeTraceStore:
                 "avg_tokens_per_sec": None,
                 "total_prompt_tokens": 0,
                 "total_completion_tokens": 0,
+                "total_cache_read_tokens": 0,
+                "total_cache_write_tokens": 0,
                 "avg_rating": None,
                 "by_provider": {},
             }
@@ -266,15 +496,26 @@ class FakeTraceStore:
         ratings = [t["rating_score"] for t in self.traces if t["rating_score"] is not None]
         avg_rating = round(sum(ratings) / len(ratings), 2) if ratings else None
 
+        def tps(t: dict) -> float | None:
+            gen_ms = t.get("eval_ms") or t["latency_ms"]
+            if t.get("completion_tokens") is None or gen_ms <= 0:
+                return None
+            return t["completion_tokens"] / (gen_ms / 1000)
+
+        def avg(values: list[float]) -> float | None:
+            return round(sum(values) / len(values), 2) if values else None
+
         by_provider: dict[str, dict] = {}
         for t in self.traces:
             p = t["provider"]
             if p not in by_provider:
-                by_provider[p] = {"calls": 0, "latency_sum": 0.0, "ratings": []}
+                by_provider[p] = {"calls": 0, "latency_sum": 0.0, "ratings": [], "tps": []}
             by_provider[p]["calls"] += 1
             by_provider[p]["latency_sum"] += t["latency_ms"]
             if t["rating_score"] is not None:
                 by_provider[p]["ratings"].append(t["rating_score"])
+            if tps(t) is not None:
+                by_provider[p]["tps"].append(tps(t))
 
         by_provider_out = {}
         for p, data in by_provider.items():
@@ -283,14 +524,17 @@ class FakeTraceStore:
                 "calls": data["calls"],
                 "avg_latency_ms": data["latency_sum"] / data["calls"],
                 "avg_rating": round(sum(r) / len(r), 2) if r else None,
+                "avg_tokens_per_sec": avg(data["tps"]),
             }
 
         return {
             "total_calls": total,
             "avg_latency_ms": avg_latency,
-            "avg_tokens_per_sec": None,
+            "avg_tokens_per_sec": avg([v for t in self.traces if (v := tps(t)) is not None]),
             "total_prompt_tokens": sum(t.get("prompt_tokens") or 0 for t in self.traces),
             "total_completion_tokens": sum(t.get("completion_tokens") or 0 for t in self.traces),
+            "total_cache_read_tokens": sum(t.get("cache_read_tokens") or 0 for t in self.traces),
+            "total_cache_write_tokens": sum(t.get("cache_write_tokens") or 0 for t in self.traces),
             "avg_rating": avg_rating,
             "by_provider": by_provider_out,
         }
@@ -306,16 +550,40 @@ def fake_llm():
     return FakeLLMClient()
 
 
+@pytest.fixture
+def legacy_db(tmp_path):
+    """Build a database with LEGACY_SCHEMA, seeded by the given SQL; returns its path."""
+    path = str(tmp_path / "legacy.db")
+
+    async def build(seed: str = "") -> str:
+        async with aiosqlite.connect(path) as conn:
+            await conn.executescript(LEGACY_SCHEMA + seed)
+        return path
+
+    return build
+
+
 @pytest.fixture
 def fake_traces():
     return FakeTraceStore()
 
 
 @pytest.fixture
-async def client(fake_store, fake_llm, fake_traces):
+async def client(fake_store, fake_llm, fake_traces, tmp_path):
     set_message_store(fake_store)
     set_llm_client(fake_llm)
+    registry = LLMRegistry()
+    registry.register(settings.llm_provider, settings.model_for(settings.llm_provider), fake_llm)
+    set_llm_registry(registry)
     set_trace_store(fake_traces)
+    # Not started, so traces are written through synchronously
+    set_trace_writer(BatchingTraceWriter(fake_traces))
+    set_chat_flights(SingleFlight())
+    set_limiters({})
+    set_breakers({})
+    # Not started, so notify() is a no-op and tests run compaction explicitly
+    set_summarizer(Summarizer(fake_store, fake_llm))
+    set_memory_index(VectorMemoryIndex(str(tmp_path / "memory.npz"), fake_store, HashingEmbedder()))
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as c:
         yield c
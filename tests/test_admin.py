@@ -1,5 +1,10 @@
 import pytest
 
+from app.config import settings
+from app.dependencies import get_breakers, get_limiters
+from app.limiter import ConcurrencyLimiter
+from app.resilience import CircuitBreaker
+
 
 @pytest.mark.asyncio
 async def test_admin_messages_returns_all(client):
@@ -98,6 +103,21 @@ async def test_message_stats(client):
     assert data["last_message_at"] is not None
 
 
+@pytest.mark.asyncio
+async def test_daily_message_stats_are_zero_filled(client, fake_store):
+    await client.post("/chat", json={"message": "Hello"})
+    await fake_store.save_message("user", "Long ago")
+    fake_store.messages[-1]["timestamp"] = "2001-01-01T00:00:00+00:00"
+
+    response = await client.get("/admin/stats/messages/daily?days=3")
+
+    assert response.status_code == 200
+    days = response.json()["days"]
+    assert len(days) == 3
+    assert [d["total_messages"] for d in days] == [0, 0, 2]
+    assert days[-1]["user_messages"] == days[-1]["assistant_messages"] == 1
+
+
 @pytest.mark.asyncio
 async def test_performance_stats_empty(client):
     response = await client.get("/admin/stats/performance")
@@ -114,3 +134,79 @@ async def test_performance_stats_with_traces(client):
     data = response.json()
     assert data["total_calls"] == 1
     assert data["avg_latency_ms"] > 0
+
+
+@pytest.mark.asyncio
+async def test_ollama_status_requires_ollama_provider(client):
+    response = await client.get("/admin/ollama/status")
+    assert response.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_models_lists_registered_clients(client):
+    response = await client.get("/admin/models")
+
+    assert response.status_code == 200
+    assert response.json()["models"] == [
+        {
+            "provider": settings.llm_provider,
+            "model": settings.model_for(settings.llm_provider),
+            "default": True,
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_limits_reports_limiter_stats(client):
+    limiter = ConcurrencyLimiter("ollama", max_concurrent=2, max_queue=4)
+    get_limiters()["ollama"] = limiter
+    async with limiter.slot():
+        response = await client.get("/admin/limits")
+
+    [stats] = response.json()["limits"]
+    assert stats["provider"] == "ollama"
+    assert (stats["max_concurrent"], stats["in_flight"], stats["admitted"]) == (2, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_circuits_reports_state_transitions(client):
+    breaker = CircuitBreaker("gemini", failure_threshold=1)
+    get_breakers()["gemini"] = breaker
+    breaker.record_failure(TimeoutError())
+
+    response = await client.get("/admin/circuits")
+
+    [circuit] = response.json()["circuits"]
+    assert (circuit["provider"], circuit["state"]) == ("gemini", "open")
+    assert circuit["transitions"][0]["to_state"] == "open"
+
+
+@pytest.mark.asyncio
+async def test_admin_messages_include_archived(client):
+    await client.post("/chat", json={"message": "Archived thought"})
+    await client.post("/admin/archive")
+
+    response = await client.get("/admin/messages?q=archived&sort=recent")
+
+    [message] = response.json()["messages"]
+    assert (message["content"], message["source"]) == ("Archived thought", "archived")
+
+
+@pytest.mark.asyncio
+async def test_admin_messages_cursor_pagination(client):
+    for i in range(3):
+        await client.post("/chat", json={"message": f"msg {i}"})
+
+    first = (await client.get("/admin/messages?limit=4")).json()
+    second = (await client.get(f"/admin/messages?limit=4&cursor={first['next_cursor']}")).json()
+
+    assert len(first["messages"]) == 4 and len(second["messages"]) == 2
+    assert second["next_cursor"] is None
+    assert not {m["id"] for m in first["messages"]} & {m["id"] for m in second["messages"]}
+
+
+@pytest.mark.asyncio
+async def test_admin_messages_bad_cursor_returns_400(client):
+    response = await client.get("/admin/messages?cursor=garbage")
+
+    assert response.status_code == 400
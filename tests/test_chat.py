@@ -1,5 +1,15 @@
+import asyncio
+import json
+
 import pytest
 
+from app.config import settings
+from app.dependencies import get_breakers, get_limiters, get_llm_registry, get_memory_index
+from app.limiter import ConcurrencyLimiter, LimitedLLMClient
+from app.protocols import LLMResult
+from app.resilience import CircuitBreaker, ResilientLLMClient
+from tests.conftest import FakeLLMClient
+
 
 @pytest.mark.asyncio
 async def test_chat_returns_response_with_id_and_timestamp(client, fake_llm):
@@ -39,3 +49,280 @@ async def test_chat_empty_message_returns_422(client):
     # For now, empty string is technically valid per schema
     # This test documents current behavior - update if we add min_length
     assert response.status_code in (200, 422)
+
+
+def _parse_sse(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_emits_tokens_then_done(client, fake_llm):
+    fake_llm.canned_response = "Keep going steadily."
+
+    response = await client.post("/chat/stream", json={"message": "Any advice?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+    tokens = [data["content"] for event, data in events if event == "token"]
+    assert "".join(tokens).strip() == "Keep going steadily."
+    event, done = events[-1]
+    assert event == "done"
+    assert done["response"].strip() == "Keep going steadily."
+    assert done["trace_id"]
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_saves_messages_and_trace_with_ttft(client, fake_store, fake_traces):
+    await client.post("/chat/stream", json={"message": "Stream this"})
+
+    assert [m["role"] for m in fake_store.messages] == ["user", "assistant"]
+    assert fake_store.messages[0]["content"] == "Stream this"
+    assert len(fake_traces.traces) == 1
+    trace = fake_traces.traces[0]
+    assert trace["ttft_ms"] is not None
+    assert trace["ttft_ms"] <= trace["latency_ms"]
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_error_emits_error_event_and_saves_nothing(
+    client, fake_llm, fake_store, fake_traces
+):
+    async def failing_stream(message, history=None, system_context=None):
+        yield "partial"
+        raise RuntimeError("provider went away")
+
+    fake_llm.stream_response = failing_stream
+
+    response = await client.post("/chat/stream", json={"message": "Hello"})
+
+    events = _parse_sse(response.text)
+    assert events[-1][0] == "error"
+    assert fake_store.messages == []
+    assert fake_traces.traces == []
+
+
+@pytest.mark.asyncio
+async def test_chat_context_is_windowed_by_token_budget(client, fake_store, fake_llm, monkeypatch):
+    await fake_store.save_message("user", "old " * 400)
+    await fake_store.save_message("assistant", "short reply")
+    await fake_store.save_message("user", "recent question")
+    monkeypatch.setattr(settings, f"{settings.llm_provider}_context_tokens", 200)
+
+    await client.post("/chat", json={"message": "And now?"})
+
+    assert [m["content"] for m in fake_llm.last_history] == ["short reply", "recent question"]
+
+
+@pytest.mark.asyncio
+async def test_chat_retry_with_idempotency_key_returns_stored_response(
+    client, fake_llm, fake_store, fake_traces
+):
+    body = {"message": "Hello", "idempotency_key": "abc-123"}
+
+    first = await client.post("/chat", json=body)
+    second = await client.post("/chat", json=body)
+
+    assert second.json() == first.json()
+    assert fake_llm.calls == 1
+    assert len(fake_store.messages) == 2
+    assert len(fake_traces.traces) == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_idempotency_key_is_scoped_to_message(client, fake_llm):
+    await client.post("/chat", json={"message": "Hello", "idempotency_key": "k"})
+    await client.post("/chat", json={"message": "Goodbye", "idempotency_key": "k"})
+
+    assert fake_llm.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_chat_without_key_is_not_replayed(client, fake_llm):
+    await client.post("/chat", json={"message": "Hello"})
+    await client.post("/chat", json={"message": "Hello"})
+
+    assert fake_llm.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_chats_share_one_call(client, fake_llm, fake_store):
+    fake_llm.delay = 0.05
+
+    responses = await asyncio.gather(
+        *(client.post("/chat", json={"message": "Same question"}) for _ in range(3))
+    )
+
+    assert fake_llm.calls == 1
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert len(fake_store.messages) == 2
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_retry_replays_stored_response(client, fake_llm, fake_store):
+    fake_llm.canned_response = "Keep going."
+    body = {"message": "Any advice?", "idempotency_key": "stream-1"}
+
+    first = _parse_sse((await client.post("/chat/stream", json=body)).text)
+    second = _parse_sse((await client.post("/chat/stream", json=body)).text)
+
+    assert fake_llm.calls == 1
+    assert second[-1] == first[-1]
+    assert second[0] == ("token", {"content": "Keep going."})
+    assert len(fake_store.messages) == 2
+
+
+@pytest.mark.asyncio
+async def test_chat_trace_records_hedge_winner(client, fake_llm, fake_traces):
+    async def hedged_response(message, history=None, system_context=None):
+        return LLMResult(
+            text="From the fallback.",
+            provider="gemini",
+            model="gemini-2.0-flash",
+            hedge_loser_provider="ollama",
+            hedge_loser_latency_ms=2100.0,
+        )
+
+    fake_llm.get_response = hedged_response
+
+    await client.post("/chat", json={"message": "Hello"})
+
+    trace = fake_traces.traces[0]
+    assert (trace["provider"], trace["model"]) == ("gemini", "gemini-2.0-flash")
+    assert trace["hedge_loser_provider"] == "ollama"
+    assert trace["hedge_loser_latency_ms"] == 2100.0
+
+
+@pytest.fixture
+def second_llm(client):
+    llm = FakeLLMClient("I am the other model.")
+    get_llm_registry().register("ollama", "qwen2.5:7b", llm)
+    return llm
+
+
+@pytest.mark.asyncio
+async def test_chat_routes_to_requested_model_and_traces_it(
+    client, fake_llm, second_llm, fake_traces
+):
+    response = await client.post(
+        "/chat", json={"message": "Hello", "provider": "ollama", "model": "qwen2.5:7b"}
+    )
+
+    assert response.json()["response"] == "I am the other model."
+    assert (second_llm.calls, fake_llm.calls) == (1, 0)
+    trace = fake_traces.traces[0]
+    assert (trace["provider"], trace["model"]) == ("ollama", "qwen2.5:7b")
+
+
+@pytest.mark.asyncio
+async def test_chat_provider_override_uses_its_registered_model(client, second_llm):
+    response = await client.post("/chat", json={"message": "Hello", "provider": "ollama"})
+
+    assert response.json()["response"] == "I am the other model."
+
+
+@pytest.mark.asyncio
+async def test_chat_unknown_model_returns_400(client, fake_llm):
+    response = await client.post("/chat", json={"message": "Hello", "model": "nope"})
+
+    assert response.status_code == 400
+    assert fake_llm.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_sends_running_summary_as_system_context(
+    client, fake_store, fake_llm, fake_traces
+):
+    _, (_, covered_until) = await fake_store.save_exchange("I moved to Lisbon.", "Exciting!")
+    await fake_store.save_summary("User moved to Lisbon.", covered_until)
+
+    await client.post("/chat", json={"message": "Where do I live?"})
+
+    assert "User moved to Lisbon." in fake_llm.last_system_context
+    assert "User moved to Lisbon." in fake_traces.traces[0]["system_prompt"]
+
+
+@pytest.mark.asyncio
+async def test_chat_recalls_relevant_archived_messages(client, fake_store, fake_llm):
+    await fake_store.save_exchange("I adopted a dog named Biscuit.", "Biscuit is lucky.")
+    await fake_store.archive_messages()
+    await get_memory_index().backfill()
+
+    await client.post("/chat", json={"message": "How is my dog Biscuit doing?"})
+
+    assert "I adopted a dog named Biscuit." in fake_llm.last_system_context
+    assert fake_llm.last_history is None
+
+
+@pytest.fixture
+def limited_llm(client, fake_llm):
+    limiter = ConcurrencyLimiter(settings.llm_provider, max_concurrent=1, max_queue=0)
+    get_limiters()[settings.llm_provider] = limiter
+    get_llm_registry().register(
+        settings.llm_provider,
+        settings.model_for(settings.llm_provider),
+        LimitedLLMClient(fake_llm, limiter),
+    )
+    return limiter
+
+
+@pytest.mark.asyncio
+async def test_chat_over_capacity_returns_429(client, fake_llm, limited_llm):
+    async with limited_llm.slot():
+        rejected = await client.post("/chat", json={"message": "Second"})
+    accepted = await client.post("/chat", json={"message": "Second"})
+
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert accepted.status_code == 200
+    assert fake_llm.calls == 1
+    assert limited_llm.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_over_capacity_returns_429(client, fake_llm, limited_llm):
+    async with limited_llm.slot():
+        response = await client.post("/chat/stream", json={"message": "Hello"})
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert fake_llm.calls == 0
+
+
+@pytest.fixture
+def breaker(client, fake_llm, monkeypatch):
+    monkeypatch.setattr(settings, "llm_deadline_seconds", 0.05)
+    breaker = CircuitBreaker(settings.llm_provider, failure_threshold=1, reset_after_s=60)
+    get_breakers()[settings.llm_provider] = breaker
+    get_llm_registry().register(
+        settings.llm_provider,
+        settings.model_for(settings.llm_provider),
+        ResilientLLMClient(fake_llm, breaker, deadline_s=0.05, max_attempts=1),
+    )
+    return breaker
+
+
+@pytest.mark.asyncio
+async def test_chat_past_deadline_returns_504_and_opens_circuit(client, fake_llm, breaker):
+    fake_llm.delay = 1.0
+
+    response = await client.post("/chat", json={"message": "Hello"})
+
+    assert response.status_code == 504
+    assert breaker.state == "open"
+
+
+@pytest.mark.asyncio
+async def test_chat_with_open_circuit_fails_fast_with_503(client, fake_llm, breaker):
+    breaker.record_failure(TimeoutError())
+
+    response = await client.post("/chat", json={"message": "Hello"})
+    stream_response = await client.post("/chat/stream", json={"message": "Hello"})
+
+    assert response.status_code == stream_response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert fake_llm.calls == 0
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import pytest
+
+from app.coalescing import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_failed_call_is_not_remembered():
+    flights = SingleFlight()
+    calls = 0
+
+    async def flaky():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("boom")
+        return "ok"
+
+    with pytest.raises(RuntimeError):
+        await flights.do("k", flaky, remember=True)
+    assert await flights.do("k", flaky, remember=True) == "ok"
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    flights = SingleFlight()
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.create_task(flights.do("k", slow, remember=True))
+    await started.wait()
+    second = asyncio.create_task(flights.do("k", slow, remember=True))
+    first.cancel()
+
+    assert await second == "done"
+    assert flights.get("k") == "done"
+
+
+@pytest.mark.asyncio
+async def test_remembered_results_expire_and_are_bounded(monkeypatch):
+    flights = SingleFlight(ttl_seconds=10, max_entries=2)
+    flights.put("a", 1)
+    flights.put("b", 2)
+    flights.put("c", 3)
+
+    assert flights.get("a") is None
+    assert flights.get("c") == 3
+
+    now = time.monotonic()
+    monkeypatch.setattr("app.coalescing.time.monotonic", lambda: now + 11)
+    assert flights.get("c") is None
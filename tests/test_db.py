@@ -0,0 +1,574 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.db import SqliteMessageStore
+
+
+@pytest.fixture
+async def store(tmp_path):
+    s = SqliteMessageStore(str(tmp_path / "messages.db"))
+    await s.init()
+    yield s
+    await s.close()
+
+
+@pytest.mark.asyncio
+async def test_save_exchange_writes_both_messages_in_order(store):
+    (user_id, user_ts), (assistant_id, assistant_ts) = await store.save_exchange(
+        "How do I start?", "One small step."
+    )
+
+    assert user_ts < assistant_ts
+    rows = await store.get_history(10, before=None)
+    assert [r["id"] for r in rows] == [assistant_id, user_id]
+    assert [r["role"] for r in rows] == ["assistant", "user"]
+
+
+@pytest.mark.asyncio
+async def test_save_exchange_is_atomic(store):
+    with pytest.raises(Exception):
+        # The assistant row violates NOT NULL, so the user row must roll back too
+        await store.save_exchange("Orphan?", None)
+
+    assert await store.get_history(10, before=None) == []
+
+
+class _NoQueries:
+    """Stands in for the connection to prove a call never touches the database."""
+
+    async def execute(self, *args, **kwargs):
+        raise AssertionError("unexpected database query")
+
+
+@pytest.mark.asyncio
+async def test_context_reads_are_served_from_cache(store):
+    await store.create_session("ollama", "llama3.2:8b", 20, None)
+    for i in range(3):
+        await store.save_exchange(f"question {i}", f"answer {i}")
+    session = await store.create_session("ollama", "llama3.2:8b", 20, None)
+    await store.save_exchange("latest", "reply")
+
+    conn, store._conn = store._conn, _NoQueries()
+    try:
+        rows = await store.get_history(5, before=None)
+        session_id = await store.get_active_session_id()
+    finally:
+        store._conn = conn
+
+    assert [r["content"] for r in rows] == ["reply", "latest"]
+    assert session_id == session["session_id"]
+
+
+@pytest.mark.asyncio
+async def test_cache_is_rebuilt_from_disk_on_init(tmp_path):
+    path = str(tmp_path / "messages.db")
+    first = SqliteMessageStore(path, cache_size=4)
+    await first.init()
+    for i in range(5):
+        await first.save_exchange(f"q{i}", f"a{i}")
+    await first.close()
+
+    second = SqliteMessageStore(path, cache_size=4)
+    await second.init()
+    try:
+        cached = await second.get_history(4, before=None)
+        # Beyond the cache size the store falls back to SQLite
+        full = await second.get_history(10, before=None)
+    finally:
+        await second.close()
+
+    assert [r["content"] for r in cached] == ["a4", "q4", "a3", "q3"]
+    assert len(full) == 10
+
+
+@pytest.mark.asyncio
+async def test_archive_invalidates_cache(store):
+    await store.save_exchange("keep?", "no")
+
+    await store.archive_messages()
+
+    assert await store.get_history(10, before=None) == []
+
+
+@pytest.mark.asyncio
+async def test_get_context_fills_token_budget_newest_first(store):
+    await store.save_exchange("a " * 300, "long answer " * 100)
+    await store.save_exchange("short", "reply")
+
+    rows = await store.get_context(token_budget=100, max_messages=20)
+
+    assert [r["content"] for r in rows] == ["reply", "short"]
+    assert all(r["token_count"] > 0 for r in rows)
+
+
+@pytest.mark.asyncio
+async def test_get_context_falls_back_to_sql_past_the_cache(tmp_path):
+    s = SqliteMessageStore(str(tmp_path / "messages.db"), cache_size=2)
+    await s.init()
+    try:
+        for i in range(3):
+            await s.save_exchange(f"q{i}", f"a{i}")
+
+        rows = await s.get_context(token_budget=10_000, max_messages=5)
+    finally:
+        await s.close()
+
+    assert [r["content"] for r in rows] == ["a2", "q2", "a1", "q1", "a0"]
+
+
+@pytest.mark.asyncio
+async def test_token_counts_are_backfilled_for_existing_databases(legacy_db):
+    path = await legacy_db(
+        "INSERT INTO messages VALUES ('m1', 'user', 'hello there', '2025-01-01T00:00:00');"
+    )
+
+    s = SqliteMessageStore(path)
+    await s.init()
+    try:
+        rows = await s.get_history(10, before=None)
+    finally:
+        await s.close()
+
+    assert rows[0]["token_count"] > 0
+
+
+@pytest.mark.asyncio
+async def test_summary_persists_and_resets_on_archive(tmp_path):
+    path = str(tmp_path / "messages.db")
+    first = SqliteMessageStore(path)
+    await first.init()
+    _, (_, covered_until) = await first.save_exchange("I moved to Lisbon.", "Exciting!")
+    assert await first.save_summary("User moved to Lisbon.", covered_until)
+    await first.close()
+
+    store = SqliteMessageStore(path)
+    await store.init()
+    assert (await store.get_summary())["content"] == "User moved to Lisbon."
+
+    await store.archive_messages()
+    assert await store.get_summary() is None
+    # A compaction that started before the archive must not bring the summary back
+    assert not await store.save_summary("Stale.", covered_until)
+    assert await store.get_summary() is None
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_get_context_moves_window_start_in_steps(store):
+    for i in range(5):
+        await store.save_exchange(f"q{i}", f"a{i}")
+
+    first = await store.get_context(token_budget=10_000, max_messages=8, step=4)
+    await store.save_exchange("q5", "a5")
+    second = await store.get_context(token_budget=10_000, max_messages=8, step=4)
+    await store.save_exchange("q6", "a6")
+    third = await store.get_context(token_budget=10_000, max_messages=8, step=4)
+
+    # The start stays on message 4 until the window is full, then jumps to 8
+    assert first[-1]["content"] == second[-1]["content"] == "q2"
+    assert (len(first), len(second)) == (6, 8)
+    assert third[-1]["content"] == "q4"
+
+
+@pytest.mark.asyncio
+async def test_get_messages_after_is_oldest_first(store):
+    (first_id, first_ts), (second_id, _) = await store.save_exchange("a", "b")
+    (third_id, _), _ = await store.save_exchange("c", "d")
+
+    rows = await store.get_messages_after(first_ts, limit=2)
+
+    assert [r["id"] for r in rows] == [second_id, third_id]
+
+
+@pytest.mark.asyncio
+async def test_get_messages_by_ids_reads_every_table(store):
+    (archived_id, _), _ = await store.save_exchange("Archived question", "a")
+    await store.archive_messages()
+    (active_id, _), _ = await store.save_exchange("Active question", "b")
+
+    rows = await store.get_messages_by_ids([archived_id, active_id, "missing"])
+
+    assert sorted(r["content"] for r in rows) == ["Active question", "Archived question"]
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_matches_across_all_tables(store):
+    await store.save_exchange("My dog Biscuit chewed a shoe.", "Dogs will be dogs.")
+    await store.archive_messages()
+    await store.create_session("gemini", "flash", 20, None)
+    await store.save_exchange("Biscuit, Biscuit, Biscuit!", "Still about Biscuit?")
+    await store.create_session("gemini", "flash", 20, None)
+    await store.save_exchange("Unrelated note.", "Okay.")
+
+    result = await store.search_messages(10, 0, query="biscuit", sort="relevance")
+    messages = result["messages"]
+
+    assert result["total"] == 3
+    assert messages[0]["content"] == "Biscuit, Biscuit, Biscuit!"
+    assert messages[0]["source"] == "session"
+    assert {m["source"] for m in messages} == {"session", "archived"}
+    assert "**Biscuit**" in messages[0]["snippet"]
+
+
+@pytest.mark.asyncio
+async def test_search_relevance_ranks_within_each_source(store):
+    await store.save_exchange("Biscuit, Biscuit, Biscuit!", "Archived.")
+    await store.archive_messages()
+    await store.save_exchange("A long note that mentions Biscuit once among many words", "Ok.")
+
+    result = await store.search_messages(10, 0, query="biscuit", sort="relevance")
+
+    # bm25 scores from separate indexes aren't compared: active comes first
+    assert [m["source"] for m in result["messages"]] == ["active", "archived"]
+
+
+@pytest.mark.asyncio
+async def test_search_matches_prefixes_and_tolerates_fts_syntax(store):
+    await store.save_exchange("Learning Python generators", "Nice.")
+
+    by_prefix = await store.search_messages(10, 0, query="gener")
+    odd_input = await store.search_messages(10, 0, query='python" (gen')
+    nothing = await store.search_messages(10, 0, query="***")
+
+    assert [m["content"] for m in by_prefix["messages"]] == ["Learning Python generators"]
+    assert [m["content"] for m in odd_input["messages"]] == ["Learning Python generators"]
+    assert (nothing["messages"], nothing["total"]) == ([], 0)
+
+
+@pytest.mark.asyncio
+async def test_search_total_survives_an_empty_page(store):
+    for i in range(3):
+        await store.save_exchange(f"walk {i}", "ok")
+
+    result = await store.search_messages(10, 5, query="walk")
+
+    assert (result["messages"], result["total"]) == ([], 3)
+
+
+@pytest.mark.asyncio
+async def test_search_index_is_backfilled_for_existing_databases(legacy_db):
+    path = await legacy_db(
+        "INSERT INTO messages VALUES ('m1', 'user', 'hello there', '2025-01-01T00:00:00');"
+    )
+
+    s = SqliteMessageStore(path)
+    await s.init()
+    try:
+        result = await s.search_messages(10, 0, query="hello")
+    finally:
+        await s.close()
+
+    assert [m["id"] for m in result["messages"]] == ["m1"]
+
+
+@pytest.mark.asyncio
+async def test_migrated_message_tables_keep_rowids_stable_for_search(legacy_db):
+    path = await legacy_db("""
+        INSERT INTO archived_messages VALUES
+            ('a1', 'user', 'alpha note', '2025-01-01T00:00:01', '2025-02-01'),
+            ('a2', 'user', 'beta note', '2025-01-01T00:00:02', '2025-02-01'),
+            ('a3', 'user', 'gamma note', '2025-01-01T00:00:03', '2025-02-01');
+    """)
+    s = SqliteMessageStore(path)
+    await s.init()
+    await s.close()
+    # VACUUM may renumber rowids, which the index points at, unless they alias
+    # an INTEGER PRIMARY KEY
+    with sqlite3.connect(path) as conn:
+        pk = [r[1] for r in conn.execute("PRAGMA table_info(archived_messages)") if r[5]]
+        conn.execute("DELETE FROM archived_messages WHERE id = 'a1'")
+    sqlite3.connect(path, isolation_level=None).execute("VACUUM").connection.close()
+
+    s = SqliteMessageStore(path)
+    await s.init()
+    try:
+        result = await s.search_messages(10, 0, query="gamma")
+    finally:
+        await s.close()
+
+    assert pk == ["seq"]
+    assert [m["id"] for m in result["messages"]] == ["a3"]
+    assert "**gamma**" in result["messages"][0]["snippet"]
+
+
+async def _walk_pages(store, **kwargs) -> list[str]:
+    ids, cursor = [], None
+    while True:
+        result = await store.search_messages(3, cursor=cursor, **kwargs)
+        ids += [m["id"] for m in result["messages"]]
+        cursor = result["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.asyncio
+async def test_search_cursor_pages_match_offset_pages(store):
+    for i in range(4):
+        await store.save_exchange(f"note {i}", f"reply {i}")
+    await store.archive_messages()
+    for i in range(3):
+        await store.save_exchange(f"note {i + 4}", f"reply {i + 4}")
+
+    everything = await store.search_messages(100)
+    by_cursor = await _walk_pages(store)
+    by_relevance = await _walk_pages(store, query="note", sort="relevance")
+
+    assert by_cursor == [m["id"] for m in everything["messages"]]
+    assert len(by_cursor) == 14
+    assert len(by_relevance) == len(set(by_relevance)) == 7
+
+
+@pytest.mark.asyncio
+async def test_search_total_is_cached_unless_exact(store):
+    await store.save_exchange("first", "reply")
+    assert (await store.search_messages(10))["total"] == 2
+
+    await store.save_exchange("second", "reply")
+    cached = await store.search_messages(10)
+    exact = await store.search_messages(10, exact_total=True)
+
+    assert (cached["total"], cached["total_exact"]) == (2, False)
+    assert (exact["total"], exact["total_exact"]) == (4, True)
+
+
+@pytest.mark.asyncio
+async def test_search_rejects_malformed_cursor(store):
+    with pytest.raises(ValueError):
+        await store.search_messages(10, cursor="not-a-cursor")
+
+
+async def _history_ids(store, limit: int, session_id: str | None = None) -> list[str]:
+    ids, before = [], None
+    while rows := await store.get_history(limit, before=before, session_id=session_id):
+        ids += [r["id"] for r in rows]
+        before = (rows[-1]["timestamp"], rows[-1]["id"])
+    return ids
+
+
+@pytest.mark.asyncio
+async def test_history_cursor_does_not_skip_shared_timestamps(legacy_db):
+    path = await legacy_db(
+        "INSERT INTO messages VALUES "
+        + ", ".join(f"('m{i}', 'user', 'same instant', '2025-01-01T00:00:00')" for i in range(5))
+        + ";"
+    )
+
+    # A small cache so later pages come from SQL rather than memory; opening
+    # the legacy database also swaps in the (timestamp, id) index
+    store = SqliteMessageStore(path, cache_size=2)
+    await store.init()
+    try:
+        ids = await _history_ids(store, limit=2)
+        plan = await store._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM messages WHERE (timestamp, id) < (?, ?) "
+            "ORDER BY timestamp DESC, id DESC LIMIT 2",
+            ("2025-01-01T00:00:00", "m3"),
+        )
+        details = " ".join(row[3] for row in await plan.fetchall())
+    finally:
+        await store.close()
+
+    assert ids == ["m4", "m3", "m2", "m1", "m0"]
+    assert "idx_messages_timestamp_id" in details and "TEMP B-TREE" not in details
+
+
+@pytest.mark.asyncio
+async def test_history_pages_through_an_ended_session(store):
+    first = await store.create_session("gemini", "flash", 20, None)
+    for i in range(3):
+        await store.save_exchange(f"q{i}", f"a{i}")
+    await store.create_session("gemini", "flash", 20, None)
+    await store.save_exchange("new", "session")
+
+    ids = await _history_ids(store, limit=4, session_id=first["session_id"])
+
+    assert len(ids) == len(set(ids)) == 6
+    assert [r["content"] for r in await store.get_history(2)] == ["session", "new"]
+
+
+@pytest.mark.asyncio
+async def test_sessions_page_with_stored_counts(store):
+    for i in range(3):
+        await store.create_session("gemini", "flash", 20, f"s{i}")
+        for _ in range(i):
+            await store.save_exchange("q", "a")
+
+    first = await store.get_sessions(limit=2)
+    second = await store.get_sessions(limit=2, cursor=first["next_cursor"])
+    sessions = first["sessions"] + second["sessions"]
+
+    assert [s["note"] for s in sessions] == ["s2", "s1", "s0"]
+    assert [s["message_count"] for s in sessions] == [4, 2, 0]
+    assert [s["is_active"] for s in sessions] == [True, False, False]
+    assert second["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_session_counts_are_backfilled_for_existing_databases(legacy_db):
+    path = await legacy_db("""
+        INSERT INTO sessions VALUES
+            ('old', '2025-01-01', '2025-01-02', NULL, 'gemini', 'flash', 20);
+        INSERT INTO session_history VALUES
+            ('h1', 'old', 'user', 'hi', '2025-01-01T12:00:00'),
+            ('h2', 'old', 'user', 'hi', '2025-01-01T12:00:00'),
+            ('h3', 'old', 'user', 'hi', '2025-01-01T12:00:00');
+    """)
+
+    s = SqliteMessageStore(path)
+    await s.init()
+    try:
+        cur = await s._conn.execute("SELECT message_count FROM sessions WHERE id = 'old'")
+        stored = (await cur.fetchone())[0]
+        listed = (await s.get_sessions(limit=10))["sessions"]
+    finally:
+        await s.close()
+
+    assert stored == 3
+    assert listed[0]["message_count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_daily_counts_follow_rotation_and_archiving(store):
+    await store.create_session("gemini", "flash", 20, None)
+    await store.save_exchange("q", "a")
+    await store.create_session("gemini", "flash", 20, None)
+    await store.save_message("user", "still active")
+
+    stats = await store.get_message_stats()
+    (today,) = await store.get_daily_message_counts("2000-01-01")
+
+    assert (stats["total_messages"], stats["user_messages"], stats["messages_today"]) == (3, 2, 3)
+    assert (today["user_messages"], today["assistant_messages"]) == (2, 1)
+
+    await store.archive_messages()
+
+    assert (await store.get_message_stats())["total_messages"] == 2
+    assert (await store.get_daily_message_counts("2000-01-01"))[0]["user_messages"] == 1
+
+
+@pytest.mark.asyncio
+async def test_daily_counts_are_backfilled_for_existing_databases(legacy_db):
+    path = await legacy_db("""
+        INSERT INTO messages VALUES
+            ('m1', 'user', 'hi', '2025-01-01T09:00:00'),
+            ('m2', 'assistant', 'hi', '2025-01-01T09:00:01'),
+            ('m3', 'user', 'hi', '2025-01-03T09:00:00');
+    """)
+
+    s = SqliteMessageStore(path)
+    await s.init()
+    try:
+        stats = await s.get_message_stats()
+        days = await s.get_daily_message_counts("2025-01-01")
+    finally:
+        await s.close()
+
+    assert stats["total_messages"] == 3
+    assert stats["first_message_at"] == "2025-01-01T09:00:00"
+    assert stats["last_message_at"] == "2025-01-03T09:00:00"
+    assert [(d["day"], d["user_messages"], d["assistant_messages"]) for d in days] == [
+        ("2025-01-01", 1, 1),
+        ("2025-01-03", 1, 0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reads_use_read_only_pool_without_blocking_writes(tmp_path):
+    store = SqliteMessageStore(str(tmp_path / "messages.db"), cache_size=1, read_pool_size=1)
+    await store.init()
+    try:
+        async with store._reader() as reader:
+            assert reader is not store._conn
+            with pytest.raises(sqlite3.OperationalError, match="readonly"):
+                await reader.execute("DELETE FROM messages")
+            # The writer is free while the only reader is borrowed
+            await store.save_exchange("q", "a")
+
+        # Past the cache, history comes from the reader and sees the commit
+        assert [r["content"] for r in await store.get_history(5)] == ["a", "q"]
+    finally:
+        await store.close()
+
+
+@pytest.mark.asyncio
+async def test_reads_fall_back_to_writer_without_pool(tmp_path):
+    store = SqliteMessageStore(str(tmp_path / "messages.db"), read_pool_size=0)
+    await store.init()
+    try:
+        await store.save_exchange("q", "a")
+        async with store._reader() as reader:
+            assert reader is store._conn
+        assert (await store.get_message_stats())["total_messages"] == 2
+    finally:
+        await store.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_share_one_commit(tmp_path):
+    store = SqliteMessageStore(str(tmp_path / "messages.db"), commit_window_ms=50)
+    await store.init()
+    commits = 0
+    commit = store._conn.commit
+
+    async def counting_commit():
+        nonlocal commits
+        commits += 1
+        await commit()
+
+    store._conn.commit = counting_commit
+    try:
+        results = await asyncio.gather(
+            store.save_exchange("q1", "a1"),
+            store.save_exchange("q2", None),  # Violates NOT NULL
+            store.save_message("user", "q3"),
+            return_exceptions=True,
+        )
+        rows = await store.get_history(10)
+    finally:
+        await store.close()
+
+    assert commits == 1
+    assert isinstance(results[1], Exception)
+    # The failed exchange rolled back alone; its neighbours were committed
+    assert sorted(r["content"] for r in rows) == ["a1", "q1", "q3"]
+
+
+@pytest.mark.asyncio
+async def test_close_commits_queued_writes(tmp_path):
+    path = str(tmp_path / "messages.db")
+    store = SqliteMessageStore(path, commit_window_ms=1000)
+    await store.init()
+    pending = [
+        asyncio.create_task(store.save_message("user", text)) for text in ("last", "words")
+    ]
+    await asyncio.sleep(0.05)  # The writer is now lingering for more writes
+    await store.close()
+
+    reopened = SqliteMessageStore(path)
+    await reopened.init()
+    try:
+        rows = await reopened.get_history(5)
+    finally:
+        await reopened.close()
+
+    assert all(await asyncio.gather(*pending))
+    assert [r["content"] for r in rows] == ["words", "last"]
+
+
+@pytest.mark.asyncio
+async def test_writer_survives_a_failed_commit_and_rollback(store):
+    commit, rollback = store._conn.commit, store._conn.rollback
+
+    async def failing(*_):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    store._conn.commit = store._conn.rollback = failing
+    with pytest.raises(sqlite3.OperationalError):
+        await asyncio.wait_for(store.save_message("user", "lost"), timeout=5)
+    store._conn.commit, store._conn.rollback = commit, rollback
+
+    await asyncio.wait_for(store.save_message("user", "kept"), timeout=5)
+
+    assert [r["content"] for r in await store.get_history(5)] == ["kept"]
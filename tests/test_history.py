@@ -70,3 +70,53 @@ async def test_history_empty_returns_empty_list(client):
     data = response.json()
     assert data["messages"] == []
     assert data["has_more"] is False
+
+
+@pytest.mark.asyncio
+async def test_history_cursor_keeps_messages_sharing_a_timestamp(client, fake_store):
+    for i in range(5):
+        await fake_store.save_message("user", f"Message {i}")
+    for msg in fake_store.messages:
+        msg["timestamp"] = "2025-01-01T00:00:00+00:00"
+
+    seen, cursor = [], None
+    while True:
+        url = "/chat/history?limit=2" + (f"&before={cursor}" if cursor else "")
+        data = (await client.get(url)).json()
+        seen += [m["id"] for m in data["messages"]]
+        if not (cursor := data["next_cursor"]):
+            break
+
+    assert sorted(seen) == sorted(m["id"] for m in fake_store.messages)
+
+
+@pytest.mark.asyncio
+async def test_history_accepts_legacy_timestamp_cursor(client, fake_store):
+    await fake_store.save_message("user", "Older")
+    _, newer_ts = await fake_store.save_message("user", "Newer")
+
+    response = await client.get("/chat/history", params={"before": newer_ts})
+
+    assert [m["content"] for m in response.json()["messages"]] == ["Older"]
+
+
+@pytest.mark.asyncio
+async def test_history_rejects_cursor_with_wrong_value_types(client, fake_store):
+    await fake_store.save_message("user", "Hello")
+
+    # Decodes to [1, 2]: well-formed, but not a (timestamp, id) pair
+    response = await client.get("/chat/history", params={"before": "WzEsMl0"})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_history_reads_an_ended_session(client, fake_store):
+    first = await fake_store.create_session("gemini", "flash", 20, None)
+    await fake_store.save_message("user", "Before the break")
+    await fake_store.create_session("gemini", "flash", 20, None)
+    await fake_store.save_message("user", "After the break")
+
+    response = await client.get("/chat/history", params={"session_id": first["session_id"]})
+
+    assert [m["content"] for m in response.json()["messages"]] == ["Before the break"]
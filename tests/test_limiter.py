@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.limiter import ConcurrencyLimiter, LimitedLLMClient, ProviderOverloaded
+from tests.test_routing import ScriptedClient
+
+
+@pytest.mark.asyncio
+async def test_callers_beyond_capacity_wait_their_turn():
+    limiter = ConcurrencyLimiter("ollama", max_concurrent=1, max_queue=4)
+    client = LimitedLLMClient(ScriptedClient("ok", delay=0.02), limiter)
+
+    results = await asyncio.gather(*(client.get_response(f"q{i}") for i in range(3)))
+
+    assert [r.text for r in results] == ["ok"] * 3
+    stats = limiter.stats()
+    assert (stats["admitted"], stats["rejected"], stats["in_flight"]) == (3, 0, 0)
+    assert stats["max_wait_ms"] >= 20
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_with_retry_after():
+    limiter = ConcurrencyLimiter("gemini", max_concurrent=1, max_queue=1)
+    client = LimitedLLMClient(ScriptedClient("ok", delay=0.05), limiter)
+
+    results = await asyncio.gather(
+        *(client.get_response(f"q{i}") for i in range(3)), return_exceptions=True
+    )
+
+    [rejected] = [r for r in results if isinstance(r, ProviderOverloaded)]
+    assert rejected.provider == "gemini"
+    assert rejected.retry_after >= 1
+    assert limiter.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_holds_its_slot_until_finished():
+    limiter = ConcurrencyLimiter("anthropic", max_concurrent=1, max_queue=0)
+    client = LimitedLLMClient(ScriptedClient("one two"), limiter)
+
+    stream = client.stream_response("hi")
+    assert await anext(stream) == "one"
+    assert limiter.in_flight == 1
+    with pytest.raises(ProviderOverloaded):
+        await client.get_response("hi")
+
+    _ = [c async for c in stream]
+    assert limiter.in_flight == 0
@@ -0,0 +1,121 @@
+import httpx
+import numpy as np
+import pytest
+
+from app.embeddings import HashingEmbedder, OllamaEmbedder
+from app.memory_index import VectorMemoryIndex
+
+
+def _msg(i: int, content: str, role: str = "user") -> dict:
+    return {
+        "id": f"m{i}",
+        "role": role,
+        "content": content,
+        "timestamp": f"2025-01-01T00:00:{i:02d}",
+    }
+
+
+def _stored(store, messages: list[dict]) -> list[dict]:
+    """Save messages in the fake store, which the index reads hit content from."""
+    store.messages.extend(messages)
+    return messages
+
+
+@pytest.fixture
+def index(tmp_path, fake_store):
+    return VectorMemoryIndex(str(tmp_path / "memory.npz"), fake_store, HashingEmbedder(dim=256))
+
+
+@pytest.mark.asyncio
+async def test_hashing_embedder_is_normalized_and_stable():
+    embedder = HashingEmbedder(dim=64)
+
+    first = await embedder.embed(["Training for the Lisbon marathon"])
+    second = await HashingEmbedder(dim=64).embed(["Training for the Lisbon marathon"])
+
+    assert first.shape == (1, 64)
+    assert abs(float((first[0] ** 2).sum()) - 1.0) < 1e-5
+    assert (first == second).all()
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_relevant_messages_first(index, fake_store):
+    await index.add(_stored(fake_store, [
+        _msg(1, "I adopted a dog named Biscuit"),
+        _msg(2, "My marathon training plan starts in March"),
+        _msg(3, "Quarterly taxes are due next week"),
+    ]))
+
+    hits = await index.search("how is the marathon training going", k=2)
+
+    assert hits[0]["id"] == "m2"
+    assert hits[0]["content"] == "My marathon training plan starts in March"
+    assert hits[0]["score"] > hits[1]["score"]
+
+
+@pytest.mark.asyncio
+async def test_search_skips_excluded_and_low_scoring_messages(index, fake_store):
+    await index.add(
+        _stored(fake_store, [_msg(1, "marathon training"), _msg(2, "marathon training plan")])
+    )
+
+    hits = await index.search("marathon training", k=5, min_score=0.1, exclude_ids={"m1"})
+
+    assert [h["id"] for h in hits] == ["m2"]
+    assert await index.search("completely unrelated words", k=5, min_score=0.5) == []
+
+
+@pytest.mark.asyncio
+async def test_add_is_idempotent_and_grows_past_initial_capacity(index):
+    messages = [_msg(i % 60, f"note number {i}") for i in range(300)]
+    for i, m in enumerate(messages):
+        m["id"] = f"m{i}"
+
+    assert await index.add(messages) == 300
+    assert await index.add(messages[:10]) == 0
+    assert len(index) == 300
+
+
+@pytest.mark.asyncio
+async def test_stop_persists_and_load_restores(tmp_path, fake_store):
+    path = str(tmp_path / "memory.npz")
+    index = VectorMemoryIndex(path, fake_store, HashingEmbedder(dim=256))
+    index.start()
+    index.submit(_stored(fake_store, [_msg(1, "I adopted a dog named Biscuit")]))
+    await index.stop()
+
+    # Only ids and vectors are persisted; content stays in the message store
+    with np.load(path) as data:
+        assert sorted(data.files) == ["ids", "indexed_until", "vectors"]
+
+    restored = VectorMemoryIndex(path, fake_store, HashingEmbedder(dim=256))
+    restored.load()
+
+    assert len(restored) == 1
+    assert (await restored.search("dog named Biscuit", k=1))[0]["id"] == "m1"
+
+
+@pytest.mark.asyncio
+async def test_backfill_indexes_every_stored_message(index, fake_store):
+    await fake_store.save_exchange("I adopted a dog", "Congratulations!")
+    await fake_store.archive_messages()
+    await fake_store.save_exchange("Back to work", "Good luck.")
+
+    assert await index.backfill() == 4
+    assert await index.backfill() == 0
+
+
+@pytest.mark.asyncio
+async def test_ollama_embedder_normalizes_api_vectors():
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/embed"
+        return httpx.Response(200, json={"embeddings": [[3.0, 4.0]]})
+
+    embedder = OllamaEmbedder(
+        "nomic-embed-text", "http://ollama", transport=httpx.MockTransport(handler)
+    )
+    await embedder.init()
+    vectors = await embedder.embed(["hello"])
+    await embedder.close()
+
+    assert vectors.tolist() == [[pytest.approx(0.6), pytest.approx(0.8)]]
@@ -0,0 +1,183 @@
+import json
+
+import httpx
+import pytest
+
+from app.ollama_client import OllamaClient
+from app.protocols import LLMResult
+from app.tokens import estimate_message_tokens
+
+
+def _chat_reply(content: str, **metrics) -> dict:
+    return {"message": {"role": "assistant", "content": content}, "done": True, **metrics}
+
+
+@pytest.fixture
+async def ollama():
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path == "/api/ps":
+            return httpx.Response(
+                200,
+                json={"models": [{"name": "llama3.2:8b", "size": 5_000, "size_vram": 4_000}]},
+            )
+        body = json.loads(request.content)
+        if body.get("messages") == []:
+            return httpx.Response(200, json={"done": True, "load_duration": 2_500_000_000})
+        if body.get("stream"):
+            lines = [
+                json.dumps({"message": {"content": "Hello "}, "done": False}),
+                json.dumps({"message": {"content": "there"}, "done": False}),
+                json.dumps(
+                    {"message": {"content": ""}, "done": True, "eval_count": 2, "prompt_eval_count": 9}
+                ),
+            ]
+            return httpx.Response(200, content="\n".join(lines).encode())
+        return httpx.Response(
+            200,
+            json=_chat_reply(
+                "Hello there",
+                prompt_eval_count=9,
+                eval_count=2,
+                load_duration=1_000_000,
+                prompt_eval_duration=30_000_000,
+                eval_duration=40_000_000,
+            ),
+        )
+
+    client = OllamaClient(
+        "llama3.2:8b",
+        "http://ollama.test",
+        "Be wise.",
+        keep_alive="1h",
+        transport=httpx.MockTransport(handler),
+    )
+    await client.init()
+    client.requests = requests
+    yield client
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_ollama_reuses_one_pooled_client(ollama):
+    http = ollama._http
+
+    await ollama.get_response("Hi")
+    await ollama.get_running_models()
+
+    assert ollama._http is http
+    assert [r.url.path for r in ollama.requests] == ["/api/chat", "/api/ps"]
+
+
+@pytest.mark.asyncio
+async def test_ollama_stream_yields_deltas(ollama):
+    chunks = [c async for c in ollama.stream_response("Hi")]
+
+    assert "".join(c for c in chunks if isinstance(c, str)) == "Hello there"
+    final = chunks[-1]
+    assert isinstance(final, LLMResult)
+    assert final.text == "Hello there"
+    assert (final.prompt_tokens, final.completion_tokens) == (9, 2)
+
+
+@pytest.mark.asyncio
+async def test_ollama_close_releases_client(ollama):
+    await ollama.close()
+
+    assert ollama._http is None
+
+
+@pytest.mark.asyncio
+async def test_ollama_sends_keep_alive_on_every_request(ollama):
+    await ollama.get_response("Hi")
+    _ = [c async for c in ollama.stream_response("Hi")]
+
+    bodies = [json.loads(r.content) for r in ollama.requests]
+    assert all(b["keep_alive"] == "1h" for b in bodies)
+
+
+@pytest.mark.asyncio
+async def test_ollama_warm_up_returns_load_time(ollama):
+    load_ms = await ollama.warm_up()
+
+    assert load_ms == 2500.0
+    assert json.loads(ollama.requests[0].content)["messages"] == []
+
+
+@pytest.mark.asyncio
+async def test_ollama_result_carries_usage_and_timings(ollama):
+    result = await ollama.get_response("Hi")
+
+    assert result.text == "Hello there"
+    assert (result.prompt_tokens, result.completion_tokens) == (9, 2)
+    assert (result.load_ms, result.prompt_eval_ms, result.eval_ms) == (1.0, 30.0, 40.0)
+
+
+@pytest.mark.asyncio
+async def test_ollama_model_status_reports_residency(ollama):
+    status = await ollama.get_model_status()
+
+    assert status["resident"] is True
+    assert status["size_vram_bytes"] == 4_000
+    assert status["keep_alive"] == "1h"
+
+
+@pytest.mark.asyncio
+async def test_ollama_puts_system_context_after_history(ollama):
+    history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+
+    await ollama.get_response("How am I?", history, system_context="User likes tea.")
+
+    messages = json.loads(ollama.requests[0].content)["messages"]
+    assert messages[0] == {"role": "system", "content": "Be wise."}
+    assert messages[-2:] == [
+        {"role": "system", "content": "User likes tea."},
+        {"role": "user", "content": "How am I?"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ollama_reports_prefix_shared_with_previous_turn(ollama):
+    earlier = [{"role": "user", "content": "I like tea."}, {"role": "assistant", "content": "Noted."}]
+    latest = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello there"}]
+
+    first = await ollama.get_response("Hi", earlier, system_context="Memories A")
+    second = await ollama.get_response("And now?", earlier + latest, system_context="Memories B")
+    diverged = await ollama.get_response("Fresh start")
+
+    assert first.prompt_reused_tokens == 0
+    # Only the previous turn's context message and exchange are re-evaluated
+    assert second.prompt_reused_tokens == sum(
+        estimate_message_tokens(t) for t in ["Be wise.", "I like tea.", "Noted."]
+    )
+    assert diverged.prompt_reused_tokens == estimate_message_tokens("Be wise.")
+    # An estimate, so it stays out of the provider-counted cache fields
+    assert {r.cache_read_tokens for r in (first, second, diverged)} == {None}
+
+
+@pytest.mark.asyncio
+async def test_ollama_stream_reports_prefix_shared_with_previous_turn(ollama):
+    earlier = [{"role": "user", "content": "I like tea."}, {"role": "assistant", "content": "Noted."}]
+    latest = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello there"}]
+    await ollama.get_response("Hi", earlier)
+
+    chunks = [c async for c in ollama.stream_response("And now?", earlier + latest)]
+
+    # The whole previous prompt and its reply are a shared prefix
+    assert chunks[-1].prompt_reused_tokens == sum(
+        estimate_message_tokens(t)
+        for t in ["Be wise.", "I like tea.", "Noted.", "Hi", "Hello there"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_ollama_without_prefix_reuse_keeps_context_in_system_prompt(ollama):
+    ollama._prefix_reuse = False
+
+    result = await ollama.get_response("Hi", system_context="Memories")
+
+    messages = json.loads(ollama.requests[0].content)["messages"]
+    assert messages[0]["content"] == "Be wise.\n\nMemories"
+    assert result.prompt_reused_tokens is None
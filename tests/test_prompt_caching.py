@@ -0,0 +1,196 @@
+from types import SimpleNamespace
+
+import pytest
+from anthropic.types import Usage
+from google.genai import errors
+
+from app.claude_client import ClaudeClient
+from app.gemini_client import GeminiClient
+
+HISTORY = [
+    {"role": "user", "content": "I want to run a marathon."},
+    {"role": "assistant", "content": "Start with a base of easy miles."},
+]
+
+
+def test_claude_marks_system_prompt_and_history_prefix_for_caching():
+    client = ClaudeClient("key", "claude-sonnet-4-20250514", "Be wise.")
+
+    system = client._build_system()
+    messages = client._build_messages("How many miles?", HISTORY)
+
+    assert system[0]["cache_control"] == {"type": "ephemeral"}
+    assert messages[1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert messages[-1] == {"role": "user", "content": "How many miles?"}
+
+
+def test_claude_system_context_follows_the_cached_history():
+    client = ClaudeClient("key", "claude-sonnet-4-20250514", "Be wise.")
+
+    system = client._build_system("Summary: training for a marathon.")
+    messages = client._build_messages(
+        "How many miles?", HISTORY, "Summary: training for a marathon."
+    )
+
+    assert [block["text"] for block in system] == ["Be wise."]
+    assert "cache_control" in messages[1]["content"][0]
+    assert messages[-1]["content"] == [
+        {"type": "text", "text": "Summary: training for a marathon."},
+        {"type": "text", "text": "How many miles?"},
+    ]
+
+
+def test_claude_result_reports_cache_usage():
+    usage = Usage(
+        input_tokens=20,
+        output_tokens=50,
+        cache_read_input_tokens=1000,
+        cache_creation_input_tokens=30,
+    )
+
+    result = ClaudeClient._to_result("Ten.", usage)
+
+    assert result.prompt_tokens == 1050
+    assert (result.cache_read_tokens, result.cache_write_tokens) == (1000, 30)
+
+
+class _FakeGenai:
+    def __init__(self):
+        self.created: list[list[dict]] = []
+        self.deleted: list[str] = []
+        self.generated: list[dict] = []
+
+        async def create(model, config):
+            self.created.append(config.contents)
+            return SimpleNamespace(
+                name=f"cachedContents/{len(self.created)}",
+                usage_metadata=SimpleNamespace(total_token_count=500),
+            )
+
+        async def delete(name):
+            self.deleted.append(name)
+
+        async def generate_content(model, contents, config):
+            self.generated.append({"contents": contents, "config": config})
+            return SimpleNamespace(
+                text="Ok.",
+                usage_metadata=SimpleNamespace(
+                    prompt_token_count=520,
+                    candidates_token_count=2,
+                    cached_content_token_count=500 if config.cached_content else None,
+                ),
+            )
+
+        async def aclose():
+            pass
+
+        self.aio = SimpleNamespace(
+            aclose=aclose,
+            caches=SimpleNamespace(create=create, delete=delete),
+            models=SimpleNamespace(generate_content=generate_content),
+        )
+
+
+@pytest.fixture
+def gemini():
+    client = GeminiClient("key", "gemini-2.0-flash", "Be wise.", cache_min_tokens=20)
+    client._client = _FakeGenai()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_gemini_caches_long_history_and_sends_only_the_tail(gemini):
+    result = await gemini.get_response("How many miles?", HISTORY)
+
+    fake = gemini._client
+    assert len(fake.created) == 1
+    sent = fake.generated[0]
+    assert sent["config"].cached_content == "cachedContents/1"
+    assert sent["config"].system_instruction is None
+    assert [c["parts"][0]["text"] for c in sent["contents"]] == ["How many miles?"]
+    assert (result.cache_read_tokens, result.cache_write_tokens) == (500, 500)
+
+
+@pytest.mark.asyncio
+async def test_gemini_reuses_cache_while_prefix_matches(gemini):
+    await gemini.get_response("How many miles?", HISTORY)
+    next_history = HISTORY + [
+        {"role": "user", "content": "How many miles?"},
+        {"role": "assistant", "content": "Ok."},
+    ]
+
+    result = await gemini.get_response("And after?", next_history)
+
+    fake = gemini._client
+    assert len(fake.created) == 1
+    assert len(fake.generated[1]["contents"]) == 3
+    assert result.cache_write_tokens is None
+
+
+@pytest.mark.asyncio
+async def test_gemini_keeps_cache_when_system_context_changes(gemini):
+    await gemini.get_response("How many miles?", HISTORY, "Memories: ran a 10k.")
+
+    await gemini.get_response("How many miles?", HISTORY, "Memories: hates hills.")
+
+    fake = gemini._client
+    assert len(fake.created) == 1
+    assert fake.generated[1]["contents"][-1]["parts"] == [
+        {"text": "Memories: hates hills."},
+        {"text": "How many miles?"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_gemini_recaches_when_history_diverges(gemini):
+    await gemini.get_response("How many miles?", HISTORY)
+
+    edited = [{"role": "user", "content": "I want to swim the channel."}] + HISTORY[1:]
+    await gemini.get_response("Something else", edited)
+
+    assert len(gemini._client.created) == 2
+
+
+@pytest.mark.asyncio
+async def test_gemini_reuses_cache_while_the_window_slides(fake_store):
+    client = GeminiClient("key", "gemini-2.0-flash", "Be wise.", cache_min_tokens=40)
+    client._client = fake = _FakeGenai()
+
+    for i in range(12):
+        rows = await fake_store.get_context(token_budget=10_000, max_messages=12, step=6)
+        await client.get_response(f"Question {i}", list(reversed(rows)) or None)
+        await fake_store.save_exchange(f"Question {i}", f"Answer {i}")
+    await client.close()
+
+    cached_turns = sum(1 for g in fake.generated if g["config"].cached_content)
+    assert cached_turns >= 9
+    # Each cache serves at least two turns, though the window's start keeps moving
+    assert 2 * len(fake.created) <= cached_turns
+    # Every superseded cache is deleted rather than left to its TTL
+    assert fake.deleted == [f"cachedContents/{n}" for n in range(1, len(fake.created))]
+
+
+@pytest.mark.asyncio
+async def test_gemini_backs_off_after_a_failed_cache_create(gemini):
+    async def failing_create(model, config):
+        raise errors.APIError(503, {"error": {"message": "busy", "status": "UNAVAILABLE"}})
+
+    gemini._client.aio.caches.create = failing_create
+
+    first = await gemini.get_response("How many miles?", HISTORY)
+    second = await gemini.get_response("And after?", HISTORY)
+
+    assert gemini._cache_failures == 1
+    assert (first.cache_write_tokens, second.cache_write_tokens) == (None, None)
+    assert all(g["config"].cached_content is None for g in gemini._client.generated)
+
+
+@pytest.mark.asyncio
+async def test_gemini_skips_cache_for_short_history():
+    client = GeminiClient("key", "gemini-2.0-flash", "Be wise.", cache_min_tokens=4096)
+    client._client = _FakeGenai()
+
+    await client.get_response("Hi", HISTORY)
+
+    assert client._client.created == []
+    assert client._client.generated[0]["config"].system_instruction == "Be wise."
@@ -0,0 +1,177 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+
+from app.protocols import LLMResult
+from app.resilience import (
+    CircuitBreaker,
+    CircuitOpen,
+    DeadlineExceeded,
+    ResilientLLMClient,
+    is_transient,
+    request_deadline,
+)
+from app.routing import HedgedLLMClient
+
+
+def _http_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://test/api/chat")
+    return httpx.HTTPStatusError(
+        "error", request=request, response=httpx.Response(status, request=request)
+    )
+
+
+class FlakyClient:
+    """Fails with each error in `errors` in turn, then answers."""
+
+    def __init__(self, errors: list[Exception], delay: float = 0.0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = 0
+
+    async def init(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def _attempt(self) -> None:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.errors:
+            raise self.errors.pop(0)
+
+    async def get_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> LLMResult:
+        await self._attempt()
+        return LLMResult(text="ok")
+
+    async def stream_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> AsyncIterator[str | LLMResult]:
+        await self._attempt()
+        yield "ok"
+        yield LLMResult(text="ok")
+
+
+def _resilient(inner, breaker=None, deadline_s=5.0, max_attempts=3):
+    return ResilientLLMClient(
+        inner,
+        breaker or CircuitBreaker("ollama"),
+        deadline_s=deadline_s,
+        max_attempts=max_attempts,
+        base_delay_ms=1,
+        max_delay_ms=5,
+    )
+
+
+def test_is_transient():
+    assert is_transient(_http_error(503))
+    assert is_transient(_http_error(429))
+    assert is_transient(httpx.ConnectError("refused"))
+    assert not is_transient(_http_error(400))
+    assert not is_transient(ValueError("bad"))
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried():
+    inner = FlakyClient([_http_error(503), httpx.ConnectError("refused")])
+
+    result = await _resilient(inner).get_response("hi")
+
+    assert result.text == "ok"
+    assert inner.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    inner = FlakyClient([_http_error(400)])
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await _resilient(inner).get_response("hi")
+
+    assert inner.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_attempts():
+    inner = FlakyClient([_http_error(500)] * 5)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await _resilient(inner, max_attempts=2).get_response("hi")
+
+    assert inner.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_a_hung_call():
+    inner = FlakyClient([], delay=1.0)
+
+    with pytest.raises(DeadlineExceeded):
+        await _resilient(inner, deadline_s=0.05).get_response("hi")
+
+
+@pytest.mark.asyncio
+async def test_hedge_legs_share_the_request_deadline():
+    primary = _resilient(FlakyClient([], delay=1.0), CircuitBreaker("ollama"))
+    secondary = _resilient(FlakyClient([], delay=1.0), CircuitBreaker("gemini"))
+    hedged = HedgedLLMClient(
+        primary, "ollama", "llama", secondary, "gemini", "flash", hedge_after_ms=50
+    )
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    with pytest.raises(DeadlineExceeded):
+        with request_deadline(0.1):
+            await hedged.get_response("hi")
+
+    # The hedge started 50ms in must not get a fresh 5s deadline of its own.
+    assert loop.time() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_then_recovers_through_a_probe():
+    breaker = CircuitBreaker("gemini", failure_threshold=2, reset_after_s=0.05)
+    client = _resilient(FlakyClient([_http_error(503)] * 2), breaker, max_attempts=1)
+
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.get_response("hi")
+    with pytest.raises(CircuitOpen):
+        await client.get_response("hi")
+
+    await asyncio.sleep(0.06)
+    assert (await client.get_response("hi")).text == "ok"
+    assert breaker.state == "closed"
+    assert [(t["from_state"], t["to_state"]) for t in breaker.transitions] == [
+        ("closed", "open"),
+        ("open", "half_open"),
+        ("half_open", "closed"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_the_circuit():
+    breaker = CircuitBreaker("gemini", failure_threshold=1, reset_after_s=0.01)
+    client = _resilient(FlakyClient([_http_error(503)] * 2), breaker, max_attempts=1)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.get_response("hi")
+    await asyncio.sleep(0.02)
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.get_response("hi")
+
+    assert breaker.state == "open"
+
+
+@pytest.mark.asyncio
+async def test_stream_retries_before_first_chunk():
+    inner = FlakyClient([_http_error(502)])
+
+    chunks = [c async for c in _resilient(inner).stream_response("hi")]
+
+    assert chunks[0] == "ok"
+    assert inner.calls == 2
@@ -0,0 +1,120 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+
+from app.protocols import LLMResult
+from app.routing import HedgedLLMClient
+
+
+class ScriptedClient:
+    def __init__(self, text: str, delay: float = 0.0, error: Exception | None = None):
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def init(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def _wait(self) -> None:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+
+    async def get_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> LLMResult:
+        await self._wait()
+        return LLMResult(text=self.text)
+
+    async def stream_response(
+        self, message: str, history: list[dict] | None = None, system_context: str | None = None
+    ) -> AsyncIterator[str | LLMResult]:
+        await self._wait()
+        for word in self.text.split(" "):
+            yield word
+        yield LLMResult(text=self.text)
+
+
+def _hedged(primary: ScriptedClient, secondary: ScriptedClient, hedge_after_ms: float = 20):
+    return HedgedLLMClient(
+        primary, "ollama", "llama", secondary, "gemini", "flash", hedge_after_ms=hedge_after_ms
+    )
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    primary, secondary = ScriptedClient("local"), ScriptedClient("remote")
+
+    result = await _hedged(primary, secondary).get_response("hi")
+
+    assert (result.text, result.provider, result.model) == ("local", "ollama", "llama")
+    assert result.hedge_loser_provider is None
+    assert secondary.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_cancelled():
+    primary, secondary = ScriptedClient("local", delay=1.0), ScriptedClient("remote")
+
+    result = await _hedged(primary, secondary).get_response("hi")
+    await asyncio.sleep(0)
+
+    assert (result.text, result.provider) == ("remote", "gemini")
+    assert result.hedge_loser_provider == "ollama"
+    assert result.hedge_loser_latency_ms >= 20
+    assert primary.cancelled
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_still_wins_if_it_answers_first():
+    primary = ScriptedClient("local", delay=0.04)
+    secondary = ScriptedClient("remote", delay=1.0)
+
+    result = await _hedged(primary, secondary).get_response("hi")
+
+    assert result.provider == "ollama"
+    assert result.hedge_loser_provider == "gemini"
+    assert secondary.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_failing_primary_hedges_immediately():
+    primary = ScriptedClient("local", error=RuntimeError("down"))
+    secondary = ScriptedClient("remote")
+
+    result = await _hedged(primary, secondary, hedge_after_ms=10_000).get_response("hi")
+
+    assert result.provider == "gemini"
+
+
+@pytest.mark.asyncio
+async def test_both_failing_raises_primary_error():
+    primary = ScriptedClient("local", error=RuntimeError("primary down"))
+    secondary = ScriptedClient("remote", error=RuntimeError("secondary down"))
+
+    with pytest.raises(RuntimeError, match="primary down"):
+        await _hedged(primary, secondary).get_response("hi")
+
+
+@pytest.mark.asyncio
+async def test_stream_hedges_on_first_chunk():
+    primary = ScriptedClient("slow local", delay=1.0)
+    secondary = ScriptedClient("fast remote")
+
+    chunks = [c async for c in _hedged(primary, secondary).stream_response("hi")]
+
+    assert chunks[:-1] == ["fast", "remote"]
+    assert chunks[-1].provider == "gemini"
+    assert chunks[-1].hedge_loser_provider == "ollama"
+    assert primary.cancelled
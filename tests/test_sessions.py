@@ -84,3 +84,23 @@ async def test_new_session_resets_llm_context(client, fake_store, fake_llm):
     # Next chat should have no history (clean slate)
     await client.post("/chat", json={"message": "Fresh message"})
     assert fake_llm.last_history is None
+
+
+@pytest.mark.asyncio
+async def test_list_sessions_paginates_with_cursor(client):
+    for note in ["First", "Second", "Third"]:
+        await client.post("/admin/sessions", json={"note": note})
+
+    page1 = (await client.get("/admin/sessions?limit=2")).json()
+    page2 = (await client.get(f"/admin/sessions?limit=2&cursor={page1['next_cursor']}")).json()
+
+    assert [s["note"] for s in page1["sessions"]] == ["Third", "Second"]
+    assert [s["note"] for s in page2["sessions"]] == ["First"]
+    assert page2["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_list_sessions_rejects_malformed_cursor(client):
+    response = await client.get("/admin/sessions?cursor=not-a-cursor")
+
+    assert response.status_code == 400
@@ -0,0 +1,80 @@
+import pytest
+
+from app.summarizer import Summarizer
+
+
+async def _fill(store, exchanges: int) -> None:
+    for i in range(exchanges):
+        await store.save_exchange(f"question {i}", f"answer {i}")
+
+
+@pytest.mark.asyncio
+async def test_compact_folds_only_messages_older_than_the_window(fake_store, fake_llm):
+    fake_llm.canned_response = "Notes so far."
+    await _fill(fake_store, 5)
+    summarizer = Summarizer(fake_store, fake_llm, keep_recent=4, batch_messages=3)
+
+    folded = await summarizer.compact()
+
+    # 10 messages, 4 kept verbatim: two batches of 3 fit in the remaining 6
+    assert folded == 6
+    summary = await fake_store.get_summary()
+    assert summary["content"] == "Notes so far."
+    assert summary["covered_until"] == fake_store.messages[5]["timestamp"]
+    assert "question 2" in fake_llm.last_message
+    assert "question 3" not in fake_llm.last_message
+
+
+@pytest.mark.asyncio
+async def test_compact_waits_for_a_full_batch(fake_store, fake_llm):
+    await _fill(fake_store, 3)
+    summarizer = Summarizer(fake_store, fake_llm, keep_recent=4, batch_messages=3)
+
+    assert await summarizer.compact() == 0
+    assert fake_llm.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_compact_builds_on_the_previous_summary(fake_store, fake_llm):
+    await _fill(fake_store, 4)
+    summarizer = Summarizer(fake_store, fake_llm, keep_recent=2, batch_messages=2)
+    fake_llm.canned_response = "First notes."
+    await summarizer.compact()
+
+    await _fill(fake_store, 1)
+    fake_llm.canned_response = "Second notes."
+    await summarizer.compact()
+
+    assert "First notes." in fake_llm.last_message
+    assert (await fake_store.get_summary())["content"] == "Second notes."
+
+
+@pytest.mark.asyncio
+async def test_compact_covers_messages_cut_by_the_token_budget(fake_store, fake_llm):
+    await _fill(fake_store, 5)
+    summarizer = Summarizer(fake_store, fake_llm, keep_recent=20, batch_messages=3)
+    # Only the newest few of the 20 kept messages fit the token budget
+    window = await fake_store.get_context(token_budget=12, max_messages=20)
+    window_start = window[-1]["timestamp"]
+    assert len(window) < len(fake_store.messages)
+
+    await summarizer.compact(window_start)
+
+    covered_until = (await fake_store.get_summary())["covered_until"]
+    sent = {m["id"] for m in window}
+    assert all(
+        m["id"] in sent or m["timestamp"] <= covered_until for m in fake_store.messages
+    )
+
+
+@pytest.mark.asyncio
+async def test_compact_leaves_messages_still_in_the_window_unsummarized(fake_store, fake_llm):
+    await _fill(fake_store, 3)
+    summarizer = Summarizer(fake_store, fake_llm, keep_recent=20, batch_messages=4)
+    # The window starts at the 3rd message, inside what a full batch would take
+    window_start = fake_store.messages[2]["timestamp"]
+
+    assert await summarizer.compact(window_start) == 2
+
+    assert (await fake_store.get_summary())["covered_until"] < window_start
+    assert "question 1" not in fake_llm.last_message
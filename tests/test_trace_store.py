@@ -0,0 +1,79 @@
+import pytest
+
+from app.trace_store import DuckDBTraceStore
+
+
+@pytest.fixture
+def trace_store(tmp_path):
+    store = DuckDBTraceStore(str(tmp_path / "traces.duckdb"))
+    store.init()
+    yield store
+    store.close()
+
+
+def _save(store: DuckDBTraceStore, **overrides) -> str:
+    fields = {
+        "provider": "ollama",
+        "model": "llama3.2:8b",
+        "messages_in": [{"role": "user", "content": "Hi"}],
+        "response_out": "Hello",
+        "latency_ms": 2000.0,
+    }
+    return store.save_trace(**{**fields, **overrides})
+
+
+def test_tokens_per_sec_prefers_provider_generation_time(trace_store):
+    _save(trace_store, completion_tokens=100, eval_ms=500.0)
+
+    stats = trace_store.get_performance_stats()
+
+    assert stats["avg_tokens_per_sec"] == 200.0
+    assert stats["by_provider"]["ollama"]["avg_tokens_per_sec"] == 200.0
+
+
+def test_tokens_per_sec_falls_back_to_latency(trace_store):
+    _save(trace_store, provider="anthropic", completion_tokens=100)
+
+    stats = trace_store.get_performance_stats()
+
+    assert stats["avg_tokens_per_sec"] == 50.0
+
+
+def test_rollup_accumulates_generation_throughput(trace_store):
+    _save(trace_store, prompt_tokens=10, completion_tokens=100, eval_ms=500.0)
+    _save(trace_store, prompt_tokens=10, completion_tokens=100, eval_ms=1500.0)
+
+    row = trace_store._conn.execute(
+        "SELECT call_count, total_prompt_tokens, total_generation_ms, avg_tokens_per_sec "
+        "FROM trace_rollups"
+    ).fetchone()
+
+    assert row == (2, 20, 2000.0, 100.0)
+
+
+def test_get_traces_returns_timings(trace_store):
+    _save(trace_store, ttft_ms=120.0, load_ms=5.0, prompt_eval_ms=30.0, eval_ms=400.0)
+
+    trace = trace_store.get_traces()[0]
+
+    assert (trace["ttft_ms"], trace["load_ms"]) == (120.0, 5.0)
+    assert (trace["prompt_eval_ms"], trace["eval_ms"]) == (30.0, 400.0)
+
+
+def test_hedge_loser_is_stored(trace_store):
+    _save(trace_store, provider="gemini", hedge_loser_provider="ollama", hedge_loser_latency_ms=2100.0)
+
+    trace = trace_store.get_traces()[0]
+
+    assert trace["provider"] == "gemini"
+    assert trace["hedge_loser_provider"] == "ollama"
+    assert trace["hedge_loser_latency_ms"] == 2100.0
+
+
+def test_prompt_reuse_is_stored_apart_from_cache_reads(trace_store):
+    _save(trace_store, provider="ollama", prompt_reused_tokens=850)
+
+    trace = trace_store.get_traces()[0]
+
+    assert trace["prompt_reused_tokens"] == 850
+    assert trace["cache_read_tokens"] is None
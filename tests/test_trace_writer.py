@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from app.trace_writer import BatchingTraceWriter
+
+
+def _fields(i: int) -> dict:
+    return {
+        "provider": "ollama",
+        "model": "llama3.2:8b",
+        "messages_in": [{"role": "user", "content": f"msg {i}"}],
+        "response_out": "ok",
+        "latency_ms": 10.0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_submit_returns_id_without_waiting_for_write(fake_traces):
+    writer = BatchingTraceWriter(fake_traces)
+    writer.start()
+
+    trace_id = writer.submit(**_fields(0))
+
+    assert trace_id
+    assert fake_traces.traces == []
+    await writer.stop()
+    assert [t["id"] for t in fake_traces.traces] == [trace_id]
+
+
+@pytest.mark.asyncio
+async def test_queued_traces_are_written_in_batches(fake_traces):
+    writer = BatchingTraceWriter(fake_traces, batch_size=10)
+    writer.start()
+
+    for i in range(25):
+        writer.submit(**_fields(i))
+    await writer.stop()
+
+    assert len(fake_traces.traces) == 25
+    assert fake_traces.batches == [10, 10, 5]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_instead_of_blocking(fake_traces):
+    writer = BatchingTraceWriter(fake_traces, max_queue=2)
+    writer.start()
+
+    ids = [writer.submit(**_fields(i)) for i in range(5)]
+    await writer.stop()
+
+    assert ids[2:] == [None, None, None]
+    assert writer.dropped == 3
+    assert len(fake_traces.traces) == 2
+
+
+@pytest.mark.asyncio
+async def test_write_failure_does_not_stop_the_writer(fake_traces):
+    calls = 0
+    original = fake_traces.save_traces
+
+    def flaky(traces):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("disk full")
+        original(traces)
+
+    fake_traces.save_traces = flaky
+    writer = BatchingTraceWriter(fake_traces)
+    writer.start()
+
+    writer.submit(**_fields(0))
+    await asyncio.sleep(0.05)
+    writer.submit(**_fields(1))
+    await writer.stop()
+
+    assert len(fake_traces.traces) == 1
@@ -1,5 +1,7 @@
 import pytest
 
+from app.dependencies import set_trace_writer
+
 
 @pytest.mark.asyncio
 async def test_chat_returns_trace_id(client):
@@ -11,6 +13,23 @@ async def test_chat_returns_trace_id(client):
     assert len(data["trace_id"]) > 0
 
 
+class _FullTraceWriter:
+    """A trace writer whose queue is always full."""
+
+    def submit(self, **fields) -> None:
+        return None
+
+
+@pytest.mark.asyncio
+async def test_chat_omits_trace_id_when_trace_is_dropped(client):
+    set_trace_writer(_FullTraceWriter())
+
+    response = await client.post("/chat", json={"message": "Hello"})
+
+    assert response.status_code == 200
+    assert response.json()["trace_id"] is None
+
+
 @pytest.mark.asyncio
 async def test_trace_stores_normalized_fields(client, fake_traces):
     await client.post("/chat", json={"message": "What is life?"})
@@ -94,3 +113,25 @@ async def test_get_traces_filter_by_session(client, fake_traces, fake_store):
     data = response.json()
     assert data["count"] == 1
     assert data["traces"][0]["session_id"] == session_id
+
+
+@pytest.mark.asyncio
+async def test_trace_records_token_usage(client, fake_llm, fake_traces):
+    fake_llm.canned_response = "Three word reply"
+
+    await client.post("/chat", json={"message": "How are things"})
+
+    trace = fake_traces.traces[0]
+    assert trace["prompt_tokens"] == 3
+    assert trace["completion_tokens"] == 3
+
+
+@pytest.mark.asyncio
+async def test_performance_stats_report_tokens_per_sec(client):
+    await client.post("/chat", json={"message": "Hello"})
+
+    response = await client.get("/admin/stats/performance")
+    data = response.json()
+    assert data["total_completion_tokens"] > 0
+    assert data["avg_tokens_per_sec"] is not None
+    assert all(p["avg_tokens_per_sec"] is not None for p in data["by_provider"].values())
@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { getPerformanceStats, getSessions, getTraces } from "@/lib/api";
+import { getAllSessions, getPerformanceStats, getTraces } from "@/lib/api";
 import type { PerformanceStats, Session, Trace } from "@/lib/types";
 
 type Mode = "provider" | "session";
@@ -139,7 +139,7 @@ function SessionCompare() {
   const [rightTraces, setRightTraces] = useState<Trace[]>([]);
 
   useEffect(() => {
-    getSessions().then((data) => setSessions(data.sessions));
+    getAllSessions().then(setSessions);
   }, []);
 
   useEffect(() => {
@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { getSessions, getTraces } from "@/lib/api";
+import { getAllSessions, getTraces } from "@/lib/api";
 import type { Session, Trace } from "@/lib/types";
 import { TraceCard } from "@/components/trace-card";
 
@@ -14,8 +14,8 @@ export default function TracesPage() {
   const [expandedId, setExpandedId] = useState<string | null>(null);
 
   useEffect(() => {
-    getSessions()
-      .then((data) => setSessions(data.sessions))
+    getAllSessions()
+      .then(setSessions)
       .catch(() => {});
   }, []);
 
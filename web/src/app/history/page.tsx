@@ -9,16 +9,29 @@ export default function HistoryPage() {
   const [perfStats, setPerfStats] = useState<PerformanceStats | null>(null);
   const [messages, setMessages] = useState<AdminMessage[]>([]);
   const [total, setTotal] = useState(0);
-  const [offset, setOffset] = useState(0);
+  const [totalExact, setTotalExact] = useState(true);
+  // Keyset paging: `cursor` loads the current page, `prevCursors` holds the
+  // cursors of the pages before it and `nextCursor` comes from the response.
+  const [cursor, setCursor] = useState<string | undefined>();
+  const [prevCursors, setPrevCursors] = useState<(string | undefined)[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [roleFilter, setRoleFilter] = useState<string | undefined>();
   const [query, setQuery] = useState("");
   const [debouncedQuery, setDebouncedQuery] = useState("");
   const [expandedId, setExpandedId] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
 
+  const resetPaging = () => {
+    setCursor(undefined);
+    setPrevCursors([]);
+  };
+
   // Debounce search query
   useEffect(() => {
-    const timer = setTimeout(() => setDebouncedQuery(query), 300);
+    const timer = setTimeout(() => {
+      setDebouncedQuery(query);
+      resetPaging();
+    }, 300);
     return () => clearTimeout(timer);
   }, [query]);
 
@@ -38,25 +51,36 @@ export default function HistoryPage() {
     try {
       const data: AdminMessagesResponse = await getAdminMessages({
         limit: 50,
-        offset,
+        cursor,
         role: roleFilter,
         q: debouncedQuery || undefined,
       });
       setMessages(data.messages);
       setTotal(data.total);
+      setTotalExact(data.total_exact);
+      setNextCursor(data.next_cursor);
     } finally {
       setLoading(false);
     }
-  }, [offset, roleFilter, debouncedQuery]);
+  }, [cursor, roleFilter, debouncedQuery]);
 
   useEffect(() => {
     fetchAdminMessages();
   }, [fetchAdminMessages]);
 
-  // Reset offset when filters change
-  useEffect(() => {
-    setOffset(0);
-  }, [roleFilter, debouncedQuery]);
+  const goNext = () => {
+    if (!nextCursor) return;
+    setPrevCursors([...prevCursors, cursor]);
+    setCursor(nextCursor);
+  };
+
+  const goPrevious = () => {
+    if (prevCursors.length === 0) return;
+    setCursor(prevCursors[prevCursors.length - 1]);
+    setPrevCursors(prevCursors.slice(0, -1));
+  };
+
+  const pageStart = prevCursors.length * 50 + 1;
 
   // Group messages by day
   const grouped = groupByDay(messages);
@@ -105,7 +129,10 @@ export default function HistoryPage() {
             {(["all", "user", "assistant"] as const).map((r) => (
               <button
                 key={r}
-                onClick={() => setRoleFilter(r === "all" ? undefined : r)}
+                onClick={() => {
+                  setRoleFilter(r === "all" ? undefined : r);
+                  resetPaging();
+                }}
                 className={`px-3 py-1.5 rounded-full text-xs font-medium transition-colors ${
                   (r === "all" && !roleFilter) || roleFilter === r
                     ? "text-blue-600 bg-blue-50 border border-blue-200"
@@ -117,7 +144,7 @@ export default function HistoryPage() {
             ))}
           </div>
           <span className="text-xs text-gray-400 ml-auto">
-            {total} messages
+            {totalExact ? "" : "~"}{total} messages
           </span>
         </div>
 
@@ -181,21 +208,21 @@ export default function HistoryPage() {
         )}
 
         {/* Pagination */}
-        {total > 50 && (
+        {(prevCursors.length > 0 || nextCursor) && (
           <div className="flex justify-center gap-3 mt-8">
             <button
-              onClick={() => setOffset(Math.max(0, offset - 50))}
-              disabled={offset === 0}
+              onClick={goPrevious}
+              disabled={prevCursors.length === 0 || loading}
               className="px-4 py-2 rounded-lg text-sm font-medium text-gray-700 bg-white border border-gray-200 hover:bg-gray-50 hover:border-gray-300 transition-colors disabled:text-gray-300 disabled:hover:bg-white disabled:hover:border-gray-200"
             >
               Previous
             </button>
             <span className="text-sm text-gray-400 py-2">
-              {offset + 1}–{Math.min(offset + 50, total)} of {total}
+              {pageStart}–{pageStart + messages.length - 1}
             </span>
             <button
-              onClick={() => setOffset(offset + 50)}
-              disabled={offset + 50 >= total}
+              onClick={goNext}
+              disabled={!nextCursor || loading}
               className="px-4 py-2 rounded-lg text-sm font-medium text-gray-700 bg-white border border-gray-200 hover:bg-gray-50 hover:border-gray-300 transition-colors disabled:text-gray-300 disabled:hover:bg-white disabled:hover:border-gray-200"
             >
               Next
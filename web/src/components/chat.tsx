@@ -75,7 +75,10 @@ export function Chat() {
           },
         ];
       });
-      setTraceIds((prev) => new Map(prev).set(response.id, response.trace_id));
+      if (response.trace_id) {
+        const traceId = response.trace_id;
+        setTraceIds((prev) => new Map(prev).set(response.id, traceId));
+      }
     } catch (err) {
       setError(err instanceof Error ? err.message : "Failed to send message");
       // Remove temp message on error
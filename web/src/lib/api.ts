@@ -1,10 +1,15 @@
 import type {
   AdminMessagesResponse,
   ChatResponse,
+  CircuitsResponse,
+  DailyMessageStats,
   HistoryResponse,
+  LimitsResponse,
   MessageStats,
+  ModelsResponse,
   PerformanceStats,
   RateResponse,
+  Session,
   SessionResponse,
   SessionsResponse,
   TracesResponse,
@@ -12,11 +17,14 @@ import type {
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
-export async function sendMessage(message: string): Promise<ChatResponse> {
+export async function sendMessage(
+  message: string,
+  target?: { provider?: string; model?: string }
+): Promise<ChatResponse> {
   const res = await fetch(`${API_URL}/chat`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ message }),
+    body: JSON.stringify({ message, ...target }),
   });
   if (!res.ok) {
     throw new Error(`Failed to send message: ${res.status}`);
@@ -26,12 +34,16 @@ export async function sendMessage(message: string): Promise<ChatResponse> {
 
 export async function getHistory(
   limit = 20,
-  before?: string
+  before?: string,
+  sessionId?: string
 ): Promise<HistoryResponse> {
   const params = new URLSearchParams({ limit: String(limit) });
   if (before) {
     params.set("before", before);
   }
+  if (sessionId) {
+    params.set("session_id", sessionId);
+  }
   const res = await fetch(`${API_URL}/chat/history?${params}`);
   if (!res.ok) {
     throw new Error(`Failed to fetch history: ${res.status}`);
@@ -88,25 +100,50 @@ export async function createSession(
   return res.json();
 }
 
-export async function getSessions(): Promise<SessionsResponse> {
-  const res = await fetch(`${API_URL}/admin/sessions`);
+export async function getSessions(
+  limit = 50,
+  cursor?: string
+): Promise<SessionsResponse> {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (cursor) {
+    params.set("cursor", cursor);
+  }
+  const res = await fetch(`${API_URL}/admin/sessions?${params}`);
   if (!res.ok) {
     throw new Error(`Failed to fetch sessions: ${res.status}`);
   }
   return res.json();
 }
 
+// Follows next_cursor to the end, for pickers that list every session
+export async function getAllSessions(): Promise<Session[]> {
+  const sessions: Session[] = [];
+  let cursor: string | undefined;
+  do {
+    const page = await getSessions(500, cursor);
+    sessions.push(...page.sessions);
+    cursor = page.next_cursor ?? undefined;
+  } while (cursor);
+  return sessions;
+}
+
 export async function getAdminMessages(opts: {
   limit?: number;
   offset?: number;
   role?: string;
   q?: string;
+  sort?: "relevance" | "recent";
+  cursor?: string;
+  exactTotal?: boolean;
 } = {}): Promise<AdminMessagesResponse> {
   const params = new URLSearchParams();
   if (opts.limit) params.set("limit", String(opts.limit));
   if (opts.offset) params.set("offset", String(opts.offset));
   if (opts.role) params.set("role", opts.role);
   if (opts.q) params.set("q", opts.q);
+  if (opts.sort) params.set("sort", opts.sort);
+  if (opts.cursor) params.set("cursor", opts.cursor);
+  if (opts.exactTotal) params.set("exact_total", "true");
   const res = await fetch(`${API_URL}/admin/messages?${params}`);
   if (!res.ok) {
     throw new Error(`Failed to fetch messages: ${res.status}`);
@@ -122,6 +159,16 @@ export async function getMessageStats(): Promise<MessageStats> {
   return res.json();
 }
 
+export async function getDailyMessageStats(
+  days = 30
+): Promise<DailyMessageStats> {
+  const res = await fetch(`${API_URL}/admin/stats/messages/daily?days=${days}`);
+  if (!res.ok) {
+    throw new Error(`Failed to fetch daily message stats: ${res.status}`);
+  }
+  return res.json();
+}
+
 export async function getPerformanceStats(): Promise<PerformanceStats> {
   const res = await fetch(`${API_URL}/admin/stats/performance`);
   if (!res.ok) {
@@ -129,3 +176,27 @@ export async function getPerformanceStats(): Promise<PerformanceStats> {
   }
   return res.json();
 }
+
+export async function getModels(): Promise<ModelsResponse> {
+  const res = await fetch(`${API_URL}/admin/models`);
+  if (!res.ok) {
+    throw new Error(`Failed to fetch models: ${res.status}`);
+  }
+  return res.json();
+}
+
+export async function getLimits(): Promise<LimitsResponse> {
+  const res = await fetch(`${API_URL}/admin/limits`);
+  if (!res.ok) {
+    throw new Error(`Failed to fetch limits: ${res.status}`);
+  }
+  return res.json();
+}
+
+export async function getCircuits(): Promise<CircuitsResponse> {
+  const res = await fetch(`${API_URL}/admin/circuits`);
+  if (!res.ok) {
+    throw new Error(`Failed to fetch circuits: ${res.status}`);
+  }
+  return res.json();
+}
@@ -9,7 +9,7 @@ export interface ChatResponse {
   id: string;
   response: string;
   timestamp: string;
-  trace_id: string;
+  trace_id: string | null;
 }
 
 export interface HistoryResponse {
@@ -39,8 +39,17 @@ export interface Trace {
   raw_messages_in: TraceMessage[];
   response_out: string;
   latency_ms: number;
+  ttft_ms: number | null;
+  load_ms: number | null;
+  prompt_eval_ms: number | null;
+  eval_ms: number | null;
   prompt_tokens: number | null;
   completion_tokens: number | null;
+  cache_read_tokens: number | null;
+  cache_write_tokens: number | null;
+  prompt_reused_tokens: number | null;
+  hedge_loser_provider: string | null;
+  hedge_loser_latency_ms: number | null;
   rating_score: number | null;
   rating_note: string | null;
   session_id: string | null;
@@ -93,6 +102,7 @@ export interface Session {
 
 export interface SessionsResponse {
   sessions: Session[];
+  next_cursor: string | null;
 }
 
 export interface MessageStats {
@@ -104,10 +114,22 @@ export interface MessageStats {
   last_message_at: string | null;
 }
 
+export interface DailyMessageCount {
+  day: string;
+  user_messages: number;
+  assistant_messages: number;
+  total_messages: number;
+}
+
+export interface DailyMessageStats {
+  days: DailyMessageCount[];
+}
+
 export interface ProviderStats {
   calls: number;
   avg_latency_ms: number;
   avg_rating: number | null;
+  avg_tokens_per_sec: number | null;
 }
 
 export interface PerformanceStats {
@@ -116,6 +138,8 @@ export interface PerformanceStats {
   avg_tokens_per_sec: number | null;
   total_prompt_tokens: number;
   total_completion_tokens: number;
+  total_cache_read_tokens: number;
+  total_cache_write_tokens: number;
   avg_rating: number | null;
   by_provider: Record<string, ProviderStats>;
 }
@@ -126,9 +150,60 @@ export interface AdminMessage {
   content: string;
   timestamp: string;
   session_id: string | null;
+  source: "active" | "session" | "archived";
+  snippet: string | null;
 }
 
 export interface AdminMessagesResponse {
   messages: AdminMessage[];
   total: number;
+  total_exact: boolean;
+  next_cursor: string | null;
+}
+
+export interface ModelInfo {
+  provider: string;
+  model: string;
+  default: boolean;
+}
+
+export interface ModelsResponse {
+  models: ModelInfo[];
+}
+
+export interface LimiterStats {
+  provider: string;
+  max_concurrent: number;
+  max_queue: number;
+  in_flight: number;
+  queued: number;
+  admitted: number;
+  rejected: number;
+  avg_wait_ms: number;
+  max_wait_ms: number;
+}
+
+export interface LimitsResponse {
+  limits: LimiterStats[];
+}
+
+export interface CircuitTransition {
+  at: string;
+  from_state: string;
+  to_state: string;
+  reason: string;
+}
+
+export interface CircuitStats {
+  provider: string;
+  state: "closed" | "open" | "half_open";
+  consecutive_failures: number;
+  failure_threshold: number;
+  reset_after_s: number;
+  rejected: number;
+  transitions: CircuitTransition[];
+}
+
+export interface CircuitsResponse {
+  circuits: CircuitStats[];
 }